@@ -0,0 +1,104 @@
+import argparse
+import asyncio
+import json
+import aiohttp
+import BAC0
+from source.arguments import positive_float
+from source.device.schema import load_device_type
+from source.simulation.bacnet_loadgen import READ_SERVICES, BacnetReadLoadGenerator, client_timeout, discover, scrape_tick_lag, tick_lag_between
+
+
+def print_tick_lag(label: str, lag: dict):
+    print(f"{label}: {lag['ticks']} ticks, tick lag mean {1000 * lag['mean']:.2f} ms, p50 <= {1000 * lag['p50_below']:g} ms, "
+          f"p99 <= {1000 * lag['p99_below']:g} ms, overruns {lag['overruns']}")
+
+
+def print_report(report: dict, services: tuple[str, ...]):
+    print(f"Target {report['target_rate']:,.0f} req/s on {report['devices']} devices x {report['points']} points "
+          f"for {report['duration']:.0f} s: skipped {report['skipped_requests']}, "
+          f"max dispatch lag {1000 * report['max_dispatch_lag']:.1f} ms")
+    print(f"{'service':23} {'responses/s':>11} {'values/s':>9} {'timeouts':>8} {'errors':>6} "
+          f"{'p50':>8} {'p90':>8} {'p99':>8} {'p99.9':>8} {'max':>8}  (response time, ms)")
+    for service in services:
+        result = report[service]
+        latency = result["response_time"]
+        print(f"{service:23} {result['responses_per_second']:11,.1f} {result['values_per_second']:9,.0f} "
+              f"{result['timeouts']:8} {result['errors']:6} "
+              + " ".join(f"{1000 * latency[key]:8.2f}" for key in ("p50", "p90", "p99", "p99.9", "max")))
+
+
+async def main(ip: str, first_port: int, count: int, client_port: int, client_id: int, device_type: str, rates: list[float],
+               duration: float, warmup: float, services: tuple[str, ...], timeout: float, max_in_flight: int,
+               metrics_url: str | None, idle: float, output: str | None):
+    client = BAC0.connect(ip=ip, port=client_port, deviceId=client_id, localObjName="BacnetLoadClient")
+    app = client.this_application.app
+    client_timeout(app, timeout)
+    host = ip.split("/")[0]
+    try:
+        devices = await discover(app, host, list(range(first_port, first_port + count)))
+        if not devices:
+            raise SystemExit(f"No device answered a Who-Is on {host}:{first_port}-{first_port + count - 1}")
+        print(f"Discovered devices {sorted(devices)}")
+        compiled_type = load_device_type(device_type)
+        reports = []
+
+        async with aiohttp.ClientSession() as session:
+            if metrics_url and idle > 0:
+                before = await scrape_tick_lag(session, metrics_url)
+                await asyncio.sleep(idle)
+                print_tick_lag("Without BACnet load", tick_lag_between(before, await scrape_tick_lag(session, metrics_url)))
+
+            for rate in rates:
+                generator = BacnetReadLoadGenerator(app, devices, compiled_type, rate, services=services, max_in_flight=max_in_flight)
+                before = await scrape_tick_lag(session, metrics_url) if metrics_url else None
+                report = await generator.run(duration, warmup)
+                if metrics_url:
+                    # Covers the warmup too, the simulator sees the same load during it
+                    report["tick_lag"] = tick_lag_between(before, await scrape_tick_lag(session, metrics_url))
+                print_report(report, services)
+                if metrics_url:
+                    print_tick_lag("Simulator under load", report["tick_lag"])
+                reports.append(report)
+    finally:
+        client.disconnect()
+
+    if output:
+        with open(output, "w") as output_file:
+            json.dump(reports, output_file, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Open-loop BACnet read load against simulated devices, with the tick lag it causes")
+    parser.add_argument("--ip", type=str, default="127.0.0.1/24", help="Address with mask of the simulated devices, also used by the client (default: 127.0.0.1/24)")
+    parser.add_argument("--first_port", type=int, default=47808, help="Port of the first simulated device (default: 47808)")
+    parser.add_argument("--count", type=int, default=1, help="Consecutive ports a Who-Is is sent to (default: 1)")
+    parser.add_argument("--client_port", type=int, default=47999, help="Port of the load client (default: 47999)")
+    parser.add_argument("--client_id", type=int, default=4194000, help="Device ID of the load client (default: 4194000)")
+    parser.add_argument("--device_type", type=str, default="boiler", help="Device type whose points are read (default: boiler)")
+    parser.add_argument("--rate", type=positive_float, nargs="+", default=[100], help="Requests per second, several values run one after the other (default: 100)")
+    parser.add_argument("--duration", type=positive_float, default=20, help="Measured seconds per rate (default: 20)")
+    parser.add_argument("--warmup", type=float, default=2, help="Seconds of load sent before each measure starts (default: 2)")
+    parser.add_argument("--service", choices=[*READ_SERVICES, "both"], default="both", help="Read service to use, both alternates them (default: both)")
+    parser.add_argument("--timeout", type=positive_float, default=3, help="Seconds after which a request counts as a timeout (default: 3)")
+    parser.add_argument("--max_in_flight", type=int, default=1000, help="Pending requests above which new ones are skipped and counted (default: 1000)")
+    parser.add_argument("--metrics_url", type=str, default=None, help="Metrics of the simulator, e.g. http://127.0.0.1:9100/metrics, to report its tick lag")
+    parser.add_argument("--idle", type=float, default=5, help="Seconds of tick lag measured without load before the first rate (default: 5)")
+    parser.add_argument("--output", type=str, default=None, help="Optional JSON file for the full reports")
+
+    args = parser.parse_args()
+    asyncio.run(main(
+        ip=args.ip,
+        first_port=args.first_port,
+        count=args.count,
+        client_port=args.client_port,
+        client_id=args.client_id,
+        device_type=args.device_type,
+        rates=args.rate,
+        duration=args.duration,
+        warmup=args.warmup,
+        services=READ_SERVICES if args.service == "both" else (args.service,),
+        timeout=args.timeout,
+        max_in_flight=args.max_in_flight,
+        metrics_url=args.metrics_url,
+        idle=args.idle,
+        output=args.output
+    ))
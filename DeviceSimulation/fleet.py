@@ -0,0 +1,102 @@
+import asyncio
+import argparse
+from source.arguments import deadband, positive_float
+from source.simulation.deadband import DEFAULT_DEADBANDS, DEFAULT_HEARTBEAT, DeadbandPolicy
+from source.simulation.scheduler import OVERRUN_POLICIES, CATCH_UP
+from source.simulation import events, metrics
+from source.simulation.fleet import FleetSimulation, load_manifest
+from source.simulation.supervisor import STATS_INTERVAL, FleetSupervisor
+from source.simulation.uploader import WIRE_FORMATS
+
+async def main(manifest_path: str, speed_factor: float, report_interval: float, engine: str, tick_period: float, overrun_policy: str,
+               spool_path: str | None, checkpoint_path: str | None, checkpoint_interval: float, restore_path: str | None,
+               template_path: str | None, wire_format: str = "auto", deadband_policy: DeadbandPolicy | None = None):
+    fleet = FleetSimulation(load_manifest(manifest_path), report_interval, spool_path, checkpoint_path, checkpoint_interval,
+                            restore_path, template_path, wire_format, deadband_policy)
+    try:
+        await fleet.start()
+        await fleet.run(speed_factor, engine, tick_period, overrun_policy)
+    except KeyboardInterrupt:
+        print("Stopping fleet...")
+    finally:
+        await fleet.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Boiler fleet simulation parameters")
+    parser.add_argument("manifest", type=str, help="Path of the JSON device manifest")
+    parser.add_argument("--speed_factor", type=positive_float, default=1, help="Positive speed factor, fractions allowed (default: 1)")
+    parser.add_argument("--tick_period", type=positive_float, default=1, help="Wall-clock seconds between ticks, sub-second allowed (default: 1)")
+    parser.add_argument("--overrun_policy", choices=OVERRUN_POLICIES, default=CATCH_UP, help="What to do with ticks missed by an overrun (default: catch_up)")
+    parser.add_argument("--engine", choices=["scalar", "vectorized"], default="scalar", help="Per-device state objects or one NumPy step for the whole fleet (default: scalar)")
+    parser.add_argument("--report_interval", type=float, default=30, help="Seconds between resource usage reports, 0 disables them (default: 30)")
+    parser.add_argument("--spool_path", type=str, default=None, help="Optional file where samples are spooled while the Web Server is unreachable")
+    parser.add_argument("--wire_format", choices=WIRE_FORMATS, default="auto", help="Upload body format, auto switches to binary when the Web Server supports it (default: auto)")
+    parser.add_argument("--report_by_exception", action="store_true", help="Upload only the fields that moved past their deadband, as numbered delta frames")
+    parser.add_argument("--deadband", type=deadband, action="append", default=[], help="Deadband of a field as \"field=value\", repeatable (e.g. \"supply_temp=0.2\")")
+    parser.add_argument("--heartbeat", type=positive_float, default=DEFAULT_HEARTBEAT, help="Simulated seconds between full frames with --report_by_exception (default: 300)")
+    parser.add_argument("--event_log", type=str, default=None, help="Optional file for the JSON event log (default: stderr)")
+    parser.add_argument("--event_rate", type=positive_float, default=events.DEFAULT_RATE, help="Maximum events per second per device (default: 5)")
+    parser.add_argument("--trace_device", type=int, default=None, help="Optional device ID to log every tick of")
+    parser.add_argument("--checkpoint", type=str, default=None, help="Optional file where the fleet state is saved periodically and on exit")
+    parser.add_argument("--checkpoint_interval", type=float, default=300, help="Seconds between checkpoints, 0 saves only on exit (default: 300)")
+    parser.add_argument("--restore", type=str, default=None, help="Optional checkpoint each device resumes from")
+    parser.add_argument("--template", type=str, default=None, help="Optional checkpoint whose first device warm-starts every device not restored")
+    parser.add_argument("--metrics_port", type=int, default=None, help="Optional port serving Prometheus metrics on /metrics, worker i uses port + i")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes sharing the fleet, 1 runs it in this process (default: 1)")
+    parser.add_argument("--stats_interval", type=positive_float, default=STATS_INTERVAL, help="Seconds between the stats each worker sends to the supervisor (default: 5)")
+    parser.add_argument("--network_per_worker", type=int, default=None, help="Optional first virtual network number, worker i puts its devices without a network on this number + i")
+
+    args = parser.parse_args()
+    deadband_policy = DeadbandPolicy({**DEFAULT_DEADBANDS, **dict(args.deadband)}, args.heartbeat) if args.report_by_exception else None
+
+    event_listener = events.start_event_log(args.event_log, args.event_rate, trace_device=args.trace_device)
+    if args.workers > 1:
+        # Spool, checkpoint, event log and metrics port get a per-worker suffix, see source/simulation/supervisor.py
+        worker_options = {
+            "speed_factor": args.speed_factor,
+            "engine": args.engine,
+            "tick_period": args.tick_period,
+            "overrun_policy": args.overrun_policy,
+            "spool_path": args.spool_path,
+            "wire_format": args.wire_format,
+            "deadband": deadband_policy,
+            "checkpoint_path": args.checkpoint,
+            "checkpoint_interval": args.checkpoint_interval,
+            "restore_path": args.restore,
+            "template_path": args.template,
+            "event_log": args.event_log,
+            "event_rate": args.event_rate,
+            "trace_device": args.trace_device,
+            "metrics_port": args.metrics_port,
+            "stats_interval": args.stats_interval,
+        }
+        supervisor = FleetSupervisor(load_manifest(args.manifest), args.workers, worker_options, args.report_interval,
+                                     first_network=args.network_per_worker)
+        try:
+            supervisor.run()
+        except KeyboardInterrupt:
+            print("Stopping fleet workers...")
+        finally:
+            event_listener.stop()
+        raise SystemExit(0)
+
+    if args.metrics_port is not None:
+        metrics.start_metrics_server(args.metrics_port)
+    try:
+        asyncio.run(main(
+            manifest_path=args.manifest,
+            speed_factor=args.speed_factor,
+            report_interval=args.report_interval,
+            engine=args.engine,
+            tick_period=args.tick_period,
+            overrun_policy=args.overrun_policy,
+            spool_path=args.spool_path,
+            checkpoint_path=args.checkpoint,
+            checkpoint_interval=args.checkpoint_interval,
+            restore_path=args.restore,
+            template_path=args.template,
+            wire_format=args.wire_format,
+            deadband_policy=deadband_policy
+        ))
+    finally:
+        event_listener.stop()
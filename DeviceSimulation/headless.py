@@ -0,0 +1,67 @@
+import argparse
+import csv
+import time
+from source.arguments import positive_float
+from source.simulation import checkpoint, events
+from source.device.memory import InMemoryBoilerDevice
+from source.simulation.simulation import SimulationContext
+from source.simulation.states import INITIALIZE_STATE
+
+def main(device_id: int, simulation_mode: int, initial_setpoint: float, speed_factor: float | None, duration: float, output: str | None,
+         checkpoint_path: str | None, restore_path: str | None):
+    boiler = InMemoryBoilerDevice(device_id=device_id)
+    simulation_boiler = SimulationContext(boiler, INITIALIZE_STATE, simulation_mode, initial_setpoint)
+    if restore_path:
+        snapshot = checkpoint.load_checkpoint(restore_path, [device_id]).get(device_id) or checkpoint.load_template(restore_path)
+        checkpoint.restore(simulation_boiler, snapshot)
+
+    samples = []
+    start = time.perf_counter()
+    ticks = simulation_boiler.run_headless(duration, speed_factor, on_sample=samples.append)
+    elapsed = time.perf_counter() - start
+    if checkpoint_path:
+        checkpoint.save_checkpoint(checkpoint_path, [checkpoint.snapshot(simulation_boiler)])
+
+    if output:
+        with open(output, "w", newline="") as output_file:
+            writer = csv.DictWriter(output_file, fieldnames=list(simulation_boiler.collect_sample().keys()))
+            writer.writeheader()
+            writer.writerows(samples)
+
+    print(f"Simulated {duration:.0f} s in {ticks} ticks, {elapsed:.2f} s wall time "
+          f"({duration / max(elapsed, 1e-9):,.0f}x realtime), {len(samples)} samples")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless boiler simulation, no BACnet and no wall-clock sleep")
+    parser.add_argument("--deviceID", type=int, default=1, help="Optional device ID (default: 1)")
+    parser.add_argument("--initial_setpoint", type=float, default=70.0, help="Initial set point (default: 70)")
+    parser.add_argument("--simulation_mode", type=int, choices=[0, 1], default=0, help="Operation mode (default: 0)")
+    parser.add_argument("--speed_factor", type=positive_float, default=None, help="Optional maximum simulated seconds per tick (default: each tick jumps to the next sample)")
+    parser.add_argument("--duration", type=float, default=7 * 24 * 3600, help="Simulated seconds to run (default: one week)")
+    parser.add_argument("--output", type=str, default=None, help="Optional CSV file for the uploaded samples")
+    parser.add_argument("--checkpoint", type=str, default=None, help="Optional file where the final state is saved, e.g. as a warm fleet template")
+    parser.add_argument("--restore", type=str, default=None, help="Optional checkpoint to resume from")
+    parser.add_argument("--verbose", action="store_true", help="Write the event log to stderr, off by default to keep the run fast")
+    parser.add_argument("--event_log", type=str, default=None, help="Optional file for the JSON event log, enables it")
+    parser.add_argument("--event_rate", type=positive_float, default=events.DEFAULT_RATE, help="Maximum events per second per device (default: 5)")
+    parser.add_argument("--trace_device", type=int, default=None, help="Optional device ID to log every tick of, enables the event log")
+
+    args = parser.parse_args()
+
+    event_listener = None
+    if args.verbose or args.event_log or args.trace_device is not None:
+        event_listener = events.start_event_log(args.event_log, args.event_rate, trace_device=args.trace_device)
+    try:
+        main(
+            device_id=args.deviceID,
+            simulation_mode=args.simulation_mode,
+            initial_setpoint=args.initial_setpoint,
+            speed_factor=args.speed_factor,
+            duration=args.duration,
+            output=args.output,
+            checkpoint_path=args.checkpoint,
+            restore_path=args.restore
+        )
+    finally:
+        if event_listener is not None:
+            event_listener.stop()
@@ -0,0 +1,62 @@
+import argparse
+import asyncio
+import json
+import aiohttp
+from source.arguments import positive_float
+from source.simulation.loadgen import OpenLoopLoadGenerator
+from source.simulation.uploader import EXAMPLE_API_KEY
+
+
+def print_report(report: dict):
+    print(f"Target {report['target_rate']:,.0f} req/s x {report['batch_size']} {report['wire_format']} samples for {report['duration']:.0f} s: "
+          f"achieved {report['achieved_rate']:,.1f} req/s, {report['achieved_samples_per_second']:,.1f} samples/s")
+    print(f"Statuses {report['statuses']}, skipped {report['skipped_requests']}, "
+          f"max dispatch lag {1000 * report['max_dispatch_lag']:.1f} ms")
+    print(f"{'latency (ms)':14} {'p50':>8} {'p90':>8} {'p99':>8} {'p99.9':>8} {'p99.99':>8} {'max':>8}")
+    for label in ("response_time", "service_time"):
+        summary = report[label]
+        values = [summary[key] for key in ("p50", "p90", "p99", "p99.9", "p99.99", "max")]
+        print(f"{label:14} " + " ".join(f"{1000 * value:8.2f}" for value in values))
+
+
+async def main(url: str, rate: float, devices: int, duration: float, warmup: float, batch_size: int, connections: int,
+               max_in_flight: int, api_key: str, output: str | None, wire_format: str = "json"):
+    connector = aiohttp.TCPConnector(limit=connections)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        generator = OpenLoopLoadGenerator(session, url.rstrip("/"), rate, devices, batch_size=batch_size,
+                                          api_key=api_key, max_in_flight=max_in_flight, wire_format=wire_format)
+        report = await generator.run(duration, warmup)
+
+    print_report(report)
+    if output:
+        with open(output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Open-loop load generator for the ingestion server, synthetic samples at a fixed rate")
+    parser.add_argument("--url", type=str, default="http://localhost:8099", help="Base URL of the web server (default: http://localhost:8099)")
+    parser.add_argument("--rate", type=positive_float, default=1000, help="Requests per second, kept whatever the response time (default: 1000)")
+    parser.add_argument("--devices", type=int, default=1000, help="Virtual devices the samples come from (default: 1000)")
+    parser.add_argument("--duration", type=positive_float, default=30, help="Measured seconds (default: 30)")
+    parser.add_argument("--warmup", type=float, default=0, help="Seconds of load sent before the measure starts (default: 0)")
+    parser.add_argument("--batch_size", type=int, default=1, help="Samples per request, above 1 the batch endpoint is used (default: 1)")
+    parser.add_argument("--connections", type=int, default=100, help="Size of the HTTP connection pool (default: 100)")
+    parser.add_argument("--max_in_flight", type=int, default=10000, help="Pending requests above which new ones are skipped and counted (default: 10000)")
+    parser.add_argument("--wire_format", choices=["json", "binary"], default="json", help="Body format, binary always uses the batch endpoint (default: json)")
+    parser.add_argument("--api_key", type=str, default=EXAMPLE_API_KEY, help="API key sent in the Authorization header")
+    parser.add_argument("--output", type=str, default=None, help="Optional JSON file for the full report")
+
+    args = parser.parse_args()
+    asyncio.run(main(
+        url=args.url,
+        rate=args.rate,
+        devices=args.devices,
+        duration=args.duration,
+        warmup=args.warmup,
+        batch_size=args.batch_size,
+        connections=args.connections,
+        max_in_flight=args.max_in_flight,
+        api_key=args.api_key,
+        output=args.output,
+        wire_format=args.wire_format
+    ))
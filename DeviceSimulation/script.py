@@ -2,25 +2,41 @@ import asyncio
 import argparse
 from source.device.boiler import BoilerBacnetDevice
 from source.simulation.simulation import SimulationContext
-from source.simulation.states import InitializeState
+from source.simulation.states import INITIALIZE_STATE
+from source.simulation.scheduler import OVERRUN_POLICIES, CATCH_UP
+from source.simulation.uploader import WIRE_FORMATS
+from source.simulation import checkpoint, events, metrics
+from source.arguments import cov_increment, deadband, positive_float
+from source.simulation.deadband import DEFAULT_DEADBANDS, DEFAULT_HEARTBEAT, DeadbandPolicy
 
-def positive_int(value):
-    """Helper function for argparse to ensure the number is positive."""
-    num_value = int(value)
-    if num_value <= 0:
-        raise argparse.ArgumentTypeError(f"{value} is not a positive integer")
-    return num_value
-
-async def main(ip: str, port: int, device_id: int, simulation_mode: int, initial_setpoint: float, speed_factor: int):
-    boiler = BoilerBacnetDevice(name="Boiler1", ip=ip, port=port, device_id=device_id)
-    initial_state = InitializeState()
+async def main(ip: str, port: int, device_id: int, simulation_mode: int, initial_setpoint: float, speed_factor: float,
+               tick_period: float, overrun_policy: str, spool_path: str | None, checkpoint_path: str | None,
+               checkpoint_interval: float, restore_path: str | None, cov_increments: dict[str, float] | None = None,
+               wire_format: str = "auto", deadband_policy: DeadbandPolicy | None = None):
+    boiler = BoilerBacnetDevice(name="Boiler1", ip=ip, port=port, device_id=device_id, cov_increments=cov_increments)
+    initial_state = INITIALIZE_STATE
+    simulation_boiler = None
+    checkpoint_task = None
     try:
         await boiler.start()
         simulation_boiler = SimulationContext(boiler, initial_state, simulation_mode, initial_setpoint)
-        await simulation_boiler.run_simulation(speed_factor)
+        if restore_path:
+            # The snapshot of this device, or the first one of the file to clone another device
+            snapshot = checkpoint.load_checkpoint(restore_path, [device_id]).get(device_id) or checkpoint.load_template(restore_path)
+            checkpoint.restore(simulation_boiler, snapshot)
+        if checkpoint_path and checkpoint_interval > 0:
+            checkpoint_task = asyncio.create_task(checkpoint.checkpoint_periodically(
+                checkpoint_path, checkpoint_interval, lambda: [checkpoint.snapshot(simulation_boiler)]))
+        await simulation_boiler.run_simulation(speed_factor, tick_period=tick_period, overrun_policy=overrun_policy, spool_path=spool_path,
+                                               wire_format=wire_format, deadband=deadband_policy)
     except KeyboardInterrupt:
         print("Stopping boiler...")
         await boiler.stop()
+    finally:
+        if checkpoint_task is not None:
+            checkpoint_task.cancel()
+        if checkpoint_path and simulation_boiler is not None:
+            checkpoint.save_checkpoint(checkpoint_path, [checkpoint.snapshot(simulation_boiler)])
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Boiler simulation parameters")
@@ -29,15 +45,46 @@ if __name__ == "__main__":
     parser.add_argument("--deviceID", type=int, default=1, help="Optional device ID (default: 1)")
     parser.add_argument("--initial_setpoint", type=float, default=70.0, help="Initial set point (default: 70)")
     parser.add_argument("--simulation_mode", type=int, choices=[0, 1], default=0, help="Operation mode (default: 0)")
-    parser.add_argument("--speed_factor", type=positive_int, default=1, help="Positive integer speed factor (default: 1)")
+    parser.add_argument("--speed_factor", type=positive_float, default=1, help="Positive speed factor, fractions allowed (default: 1)")
+    parser.add_argument("--tick_period", type=positive_float, default=1, help="Wall-clock seconds between ticks, sub-second allowed (default: 1)")
+    parser.add_argument("--overrun_policy", choices=OVERRUN_POLICIES, default=CATCH_UP, help="What to do with ticks missed by an overrun (default: catch_up)")
+    parser.add_argument("--spool_path", type=str, default=None, help="Optional file where samples are spooled while the Web Server is unreachable")
+    parser.add_argument("--wire_format", choices=WIRE_FORMATS, default="auto", help="Upload body format, auto switches to binary when the Web Server supports it (default: auto)")
+    parser.add_argument("--report_by_exception", action="store_true", help="Upload only the fields that moved past their deadband, as numbered delta frames")
+    parser.add_argument("--deadband", type=deadband, action="append", default=[], help="Deadband of a field as \"field=value\", repeatable (e.g. \"supply_temp=0.2\")")
+    parser.add_argument("--heartbeat", type=positive_float, default=DEFAULT_HEARTBEAT, help="Simulated seconds between full frames with --report_by_exception (default: 300)")
+    parser.add_argument("--event_log", type=str, default=None, help="Optional file for the JSON event log (default: stderr)")
+    parser.add_argument("--event_rate", type=positive_float, default=events.DEFAULT_RATE, help="Maximum events per second per device (default: 5)")
+    parser.add_argument("--trace_device", type=int, default=None, help="Optional device ID to log every tick of")
+    parser.add_argument("--checkpoint", type=str, default=None, help="Optional file where the device state is saved periodically and on exit")
+    parser.add_argument("--checkpoint_interval", type=float, default=300, help="Seconds between checkpoints, 0 saves only on exit (default: 300)")
+    parser.add_argument("--restore", type=str, default=None, help="Optional checkpoint to resume from")
+    parser.add_argument("--metrics_port", type=int, default=None, help="Optional port serving Prometheus metrics on /metrics")
+    parser.add_argument("--cov_increment", type=cov_increment, action="append", default=[], help="COV increment of a point as \"name=value\", repeatable (e.g. \"Supply Temp=0.2\")")
 
     args = parser.parse_args()
+    deadband_policy = DeadbandPolicy({**DEFAULT_DEADBANDS, **dict(args.deadband)}, args.heartbeat) if args.report_by_exception else None
 
-    asyncio.run(main(
-        ip=args.deviceIP,
-        port=args.devicePort,
-        device_id=args.deviceID,
-        simulation_mode=args.simulation_mode,
-        initial_setpoint=args.initial_setpoint,
-        speed_factor=args.speed_factor
-    ))
+    event_listener = events.start_event_log(args.event_log, args.event_rate, trace_device=args.trace_device)
+    if args.metrics_port is not None:
+        metrics.start_metrics_server(args.metrics_port)
+    try:
+        asyncio.run(main(
+            ip=args.deviceIP,
+            port=args.devicePort,
+            device_id=args.deviceID,
+            simulation_mode=args.simulation_mode,
+            initial_setpoint=args.initial_setpoint,
+            speed_factor=args.speed_factor,
+            tick_period=args.tick_period,
+            overrun_policy=args.overrun_policy,
+            spool_path=args.spool_path,
+            checkpoint_path=args.checkpoint,
+            checkpoint_interval=args.checkpoint_interval,
+            restore_path=args.restore,
+            cov_increments=dict(args.cov_increment),
+            wire_format=args.wire_format,
+            deadband_policy=deadband_policy
+        ))
+    finally:
+        event_listener.stop()
@@ -0,0 +1,28 @@
+import argparse
+from .simulation.deadband import DEADBAND_FIELDS
+
+def positive_float(value):
+    """Helper function for argparse to ensure the number is positive, fractions allowed."""
+    num_value = float(value)
+    if num_value <= 0:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive number")
+    return num_value
+
+
+def cov_increment(value):
+    """Helper function for argparse parsing a "point name=increment" pair."""
+    name, separator, increment = value.rpartition("=")
+    if not separator or not name:
+        raise argparse.ArgumentTypeError(f"{value} is not in the form \"point name=increment\"")
+    return name.strip(), positive_float(increment)
+
+
+def deadband(value):
+    """Helper function for argparse parsing a "field=deadband" pair, 0 reports any change of the field."""
+    name, separator, band = value.rpartition("=")
+    if not separator or name.strip() not in DEADBAND_FIELDS:
+        raise argparse.ArgumentTypeError(f"{value} is not in the form \"field=deadband\" with field one of {', '.join(DEADBAND_FIELDS)}")
+    band = float(band)
+    if band < 0:
+        raise argparse.ArgumentTypeError(f"{value} has a negative deadband")
+    return name.strip(), band
@@ -0,0 +1,193 @@
+from collections import defaultdict
+from functools import cache, partial
+import BAC0
+from bacpypes3.basetypes import BinaryPV, EngineeringUnits
+from bacpypes3.local.analog import AnalogInputObject, AnalogOutputObject, AnalogValueObject
+from bacpypes3.local.binary import BinaryInputObject, BinaryValueObject
+from bacpypes3.local.cov import GenericCriteria
+from bacpypes3.local.multistate import MultiStateInputObject, MultiStateValueObject
+from bacpypes3.local.oos import OutOfService
+from bacpypes3.primitivedata import CharacterString
+from .cov import enable_cov_property
+from .schema import ANALOG_OBJECTS, BINARY_OBJECTS, DeviceType, PointSpec
+
+class MonitoredWrites:
+    """
+    Routes network writes of presentValue through __setattr__. bacpypes3 otherwise stores them directly
+    and the property monitors (point image, COV) never see them; commandable objects already go through
+    __setattr__ when their priority array changes.
+    """
+
+    async def write_property(self, attr, value, index=None, priority=None):
+        if isinstance(attr, int):
+            attr = self._property_identifier_class(attr).attr
+        if attr == "presentValue" and index is None:
+            setattr(self, attr, value)
+        else:
+            await super().write_property(attr, value, index, priority)
+
+
+# Same classes the BAC0 object factory uses: inputs only accept network writes while out of service
+OBJECT_CLASSES = {
+    "analogInput": type("AnalogInputObjectOOS", (OutOfService, MonitoredWrites, AnalogInputObject), {}),
+    "analogOutput": AnalogOutputObject,
+    "analogValue": type("AnalogValueObjectMW", (MonitoredWrites, AnalogValueObject), {}),
+    "binaryInput": type("BinaryInputObjectOOS", (OutOfService, MonitoredWrites, BinaryInputObject), {}),
+    "binaryValue": type("BinaryValueObjectMW", (MonitoredWrites, BinaryValueObject), {}),
+    "multiStateInput": type("MultiStateInputObjectOOS", (OutOfService, MonitoredWrites, MultiStateInputObject), {}),
+    "multiStateValue": type("MultiStateValueObjectMW", (MonitoredWrites, MultiStateValueObject), {}),
+}
+
+
+# --- PROTOTYPES ----
+def _build_object(point: PointSpec):
+    properties = {
+        "objectIdentifier": (point.object_type, point.instance),
+        "objectName": point.name,
+        "description": CharacterString(point.description),
+        "statusFlags": [0, 0, 0, 0],
+    }
+    if point.object_type in ANALOG_OBJECTS:
+        # Without an increment every change is notified
+        properties.update(presentValue=point.default, units=EngineeringUnits(point.units),
+                          covIncrement=point.cov_increment if point.cov_increment is not None else 0.0)
+    elif point.object_type in BINARY_OBJECTS:
+        properties.update(presentValue="active" if point.default else "inactive",
+                          activeText=point.active_text, inactiveText=point.inactive_text)
+    else:
+        properties.update(presentValue=point.default, stateText=list(point.states), numberOfStates=len(point.states))
+    obj = OBJECT_CLASSES[point.object_type](**properties)
+    if point.object_type not in ANALOG_OBJECTS:
+        # Multistate objects have no covIncrement, binary and multistate points notify every change of state
+        obj._cov_criteria = GenericCriteria
+    return obj
+
+
+@cache
+def object_prototypes(device_type: DeviceType) -> tuple:
+    """(point name, object) for every point of the type, built and type-checked by bacpypes3 once per process."""
+    return tuple((point.name, _build_object(point)) for point in device_type.points)
+
+
+def clone_object(prototype):
+    """
+    Copy of a prototype object for another device: arrays are copied, the other property values are
+    immutable and shared, monitors and application binding are per instance. Skips the casting of every
+    property that constructing a bacpypes3 object does, which dominates the startup of a device.
+    """
+    clone = object.__new__(type(prototype))
+    attributes = dict(vars(prototype))
+    for key, value in attributes.items():
+        if isinstance(value, list):
+            value = type(value)(value)
+            if hasattr(value, "_obj"):
+                # The priority array of a commandable object recomputes the present value of its owner
+                value._obj = clone
+            attributes[key] = value
+    attributes["_property_monitors"] = defaultdict(list)
+    attributes["_app"] = None
+    vars(clone).update(attributes)
+    return clone
+
+
+# --- DEVICE ----
+class BacnetDevice:
+    """
+    BACnet device of any compiled device type, with a point image: object handles resolved once,
+    present values read once and then kept current by property monitors, so a tick reads plain
+    Python values and commit() writes back only the points that changed.
+    """
+    __slots__ = ("_type", "_name", "_ip", "_port", "_device_id", "_network_number", "_cov_increments", "_device",
+                 "_objects", "_image", "_dirty", "_command_listener")
+
+    def __init__(self, device_type: DeviceType, name: str, ip: str, port: int, device_id: int,
+                 network_number: int | None = None, cov_increments: dict[str, float] | None = None):
+        unknown = set(cov_increments or {}) - set(device_type.cov_increments)
+        if unknown:
+            raise ValueError(f"No COV increment for points {sorted(unknown)}")
+        self._type = device_type
+        self._name = name
+        self._ip = ip
+        self._port = port
+        self._device_id = device_id
+        self._network_number = network_number
+        self._cov_increments = dict(cov_increments or {})
+        self._device = None
+
+        self._objects = {}
+        self._image = {}
+        self._dirty = set()
+        self._command_listener = None
+
+    def _defining_objects(self):
+        app = self._device.this_application.app
+        self._objects = {}
+        for name, prototype in object_prototypes(self._type):
+            obj = clone_object(prototype)
+            app.add_object(obj)
+            obj._property_monitors["presentValue"].append(partial(self._on_point_changed, name))
+            self._objects[name] = obj
+        for name, increment in self._cov_increments.items():
+            self._objects[name].covIncrement = increment
+        enable_cov_property(app)
+        self.refresh()
+
+    async def start(self):
+        params = {}
+        if self._network_number is not None:
+            params["networkNumber"] = self._network_number
+        self._device = BAC0.connect(
+            ip=self._ip,
+            port=self._port,
+            deviceId=self._device_id,
+            localObjName=self._name,
+            **params
+        )
+        self._defining_objects()
+
+    def get_device_id(self):
+        return self._device_id
+
+    def refresh(self):
+        """Snapshots every present value into the image in one pass. Pending writes are discarded."""
+        self._image = {name: obj.presentValue for name, obj in self._objects.items()}
+        self._dirty.clear()
+
+    def get_points(self) -> dict:
+        # Binary present values are BinaryPV enums in the image, exported as booleans
+        binary_points = self._type.binary_points
+        return {name: value == BinaryPV.active if name in binary_points else value
+                for name, value in self._image.items()}
+
+    def set_command_listener(self, listener):
+        self._command_listener = listener
+
+    def _on_point_changed(self, name: str, old_value, new_value):
+        # bacpypes3 property monitor: keeps the image current when a BACnet client writes a point.
+        # commit() triggers it too, with the value the image already holds
+        written = self._image.get(name) != new_value
+        self._image[name] = new_value
+        if written and name in self._type.command_points and self._command_listener is not None:
+            self._command_listener.on_command(name)
+
+    def commit(self):
+        """Writes back to the BACnet objects only the points changed since the last commit."""
+        for name in self._dirty:
+            self._objects[name].presentValue = self._image[name]
+        self._dirty.clear()
+
+    def _read_point(self, name: str):
+        return self._image[name]
+
+    def _write_point(self, name: str, value):
+        if self._image[name] != value:
+            self._image[name] = value
+            self._dirty.add(name)
+
+    def _read_binary(self, name: str) -> bool:
+        return self._image[name] == BinaryPV.active
+
+    async def stop(self):
+        if self._device:
+            self._device.disconnect()
+            self._device = None
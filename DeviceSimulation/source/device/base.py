@@ -0,0 +1,161 @@
+from abc import ABC, abstractmethod
+
+
+class BoilerDevice(ABC):
+    """
+    Point interface used by SimulationContext and the State classes.
+    Getters and setters address points by their BACnet object name, subclasses
+    only decide where the present values are stored.
+    """
+    __slots__ = ()
+
+    @abstractmethod
+    def _read_point(self, name: str):
+        pass
+
+    @abstractmethod
+    def _write_point(self, name: str, value):
+        pass
+
+    def _read_binary(self, name: str) -> bool:
+        return bool(self._read_point(name))
+
+    @abstractmethod
+    def get_device_id(self):
+        pass
+
+    @abstractmethod
+    def get_points(self) -> dict:
+        """Present value of every point by object name, as plain Python values."""
+        pass
+
+    def load_points(self, points: dict):
+        """Overwrites the present values of the given points, published by the next commit()."""
+        for name, value in points.items():
+            self._write_point(name, value)
+
+    def commit(self):
+        """Publishes the values written during a tick. Backends without a point image do nothing."""
+        pass
+
+    @abstractmethod
+    def set_command_listener(self, listener):
+        """
+        listener.on_command(name) is called as soon as a command point (Boiler Enable, Supply Setpoint)
+        changes, so a BMS write reaches the simulation without waiting for its next tick. The listener is
+        an object, usually the SimulationContext, so no bound method is kept per device.
+        """
+        pass
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def get_boiler_command(self):
+        return self._read_binary("Boiler Enable")
+    def set_boiler_command(self, value):
+        self._write_point("Boiler Enable", value)
+
+    def get_device_operating_status(self):
+        return self._read_point("Operating Status")
+    def set_device_operating_status(self, operating_status_id: int):
+        if 0 < operating_status_id < 10:
+            self._write_point("Operating Status", operating_status_id)
+
+    def get_supply_setpoint(self):
+        return self._read_point("Supply Setpoint")
+    def set_supply_setpoint(self, temperature):
+        self._write_point("Supply Setpoint", temperature)
+
+    def get_supply_temperature(self):
+        return self._read_point("Supply Temp")
+    def set_supply_temperature(self, temperature):
+        self._write_point("Supply Temp", temperature)
+
+    def get_return_temperature(self):
+        return self._read_point("Return Temp")
+    def set_return_temperature(self, temperature):
+        self._write_point("Return Temp", temperature)
+
+    def get_stack_temperature(self):
+        return self._read_point("Stack Temp")
+    def set_stack_temperature(self, value):
+        self._write_point("Stack Temp", value)
+
+    def get_air_temperature(self):
+        return self._read_point("Air Temp")
+    def set_air_temperature(self, temperature):
+        self._write_point("Air Temp", temperature)
+
+    def get_fan_speed(self):
+        return self._read_point("Fan Speed")
+    def set_fan_speed(self, value):
+        self._write_point("Fan Speed", value)
+
+    def get_inlet_pressure(self):
+        return self._read_point("Inlet Pressure")
+    def set_inlet_pressure(self, value):
+        self._write_point("Inlet Pressure", value)
+
+    def get_outlet_pressure(self):
+        return self._read_point("Outlet Pressure")
+    def set_outlet_pressure(self, value):
+        self._write_point("Outlet Pressure", value)
+
+    def get_pump_status(self):
+        return self._read_binary("Pump")
+    def set_pump_status(self, value):
+        self._write_point("Pump", value)
+
+    def get_burner_status(self):
+        return self._read_binary("Burner")
+    def set_burner_status(self, new_status):
+        self._write_point("Burner", new_status)
+
+    def get_ignition_starts(self):
+        return self._read_point("Ignition Starts")
+    def increase_ignition_starts(self):
+        self._write_point("Ignition Starts", self._read_point("Ignition Starts") + 1)
+    def set_ignition_starts(self, value):
+        self._write_point("Ignition Starts", value)
+
+    def get_power_seconds(self):
+        return self._read_point("Power On Seconds")
+    def increase_power_seconds(self, seconds=1):
+        self._write_point("Power On Seconds", self._read_point("Power On Seconds") + seconds)
+    def set_power_seconds(self, value):
+        self._write_point("Power On Seconds", value)
+
+    def get_burner_seconds(self):
+        return self._read_point("Burner On Seconds")
+    def increase_burner_seconds(self, seconds=1):
+        self._write_point("Burner On Seconds", self._read_point("Burner On Seconds") + seconds)
+    def set_burner_seconds(self, value):
+        self._write_point("Burner On Seconds", value)
+
+    def get_instant_power(self):
+        return self._read_point("Boiler Instant Power")
+    def set_instant_power(self, value):
+        self._write_point("Boiler Instant Power", value)
+
+    def get_flow_rate(self):
+        return self._read_point("Flow Rate")
+    def set_flow_rate(self, value):
+        self._write_point("Flow Rate", value)
+
+    def get_required_pressure(self):
+        return self._read_point("Required Pressure")
+    def set_required_pressure(self, value):
+        self._write_point("Required Pressure", value)
+
+    def get_service_mode(self):
+        return self._read_point("Service Mode")
+    def set_service_mode(self, value):
+        self._write_point("Service Mode", value)
+
+    def get_error_message(self):
+        return self._read_point("Error Message")
+    def set_error_message(self, value):
+        self._write_point("Error Message", value)
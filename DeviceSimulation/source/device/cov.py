@@ -0,0 +1,118 @@
+import asyncio
+from bacpypes3.apdu import ConfirmedCOVNotificationRequest, SimpleAckPDU, SubscribeCOVPropertyRequest, \
+    UnconfirmedCOVNotificationRequest
+from bacpypes3.basetypes import PropertyValue
+from bacpypes3.constructeddata import Any
+from bacpypes3.errors import ExecutionError
+
+
+# bacpypes3 answers SubscribeCOV with the covIncrement of the object, SubscribeCOVProperty is
+# not implemented there: these subscriptions are handled here, with an increment per subscription.
+class PropertySubscription:
+    def __init__(self, app, obj, client_address, process_id: int, property_name: str, confirmed: bool,
+                 lifetime: int, increment: float | None):
+        self.app = app
+        self.obj = obj
+        self.client_address = client_address
+        self.process_id = process_id
+        self.property_name = property_name
+        self.confirmed = confirmed
+        self.increment = increment
+        self.reported_value = None
+        self._cancel_handle = None
+        self.renew(lifetime)
+        obj._property_monitors[property_name].append(self.property_changed)
+
+    @property
+    def key(self):
+        return self.client_address, self.process_id, self.obj.objectIdentifier, self.property_name
+
+    def renew(self, lifetime: int):
+        """Restarts the lifetime; 0 keeps the subscription until cancelled."""
+        if self._cancel_handle is not None:
+            self._cancel_handle.cancel()
+        self._cancel_handle = asyncio.get_running_loop().call_later(lifetime, self.cancel) if lifetime else None
+
+    def cancel(self):
+        if self._cancel_handle is not None:
+            self._cancel_handle.cancel()
+            self._cancel_handle = None
+        self.obj._property_monitors[self.property_name].remove(self.property_changed)
+        self.app._cov_property_subscriptions.pop(self.key, None)
+
+    def property_changed(self, old_value, new_value):
+        # Called on every write of the property: only a change of at least the increment is notified
+        if self.reported_value is None:
+            return  # the first notification is still scheduled
+        if self.increment is None:
+            changed = new_value != self.reported_value
+        else:
+            changed = abs(new_value - self.reported_value) >= self.increment
+        if changed:
+            self.notify()
+
+    def notify(self):
+        # The stored value, already cast to the BACnet datatype of the property
+        value = getattr(self.obj, self.property_name)
+        self.reported_value = value
+        request = ConfirmedCOVNotificationRequest() if self.confirmed else UnconfirmedCOVNotificationRequest()
+        request.pduDestination = self.client_address
+        request.subscriberProcessIdentifier = self.process_id
+        request.initiatingDeviceIdentifier = self.app.device_object.objectIdentifier
+        request.monitoredObjectIdentifier = self.obj.objectIdentifier
+        request.timeRemaining = max(1, int(self._cancel_handle.when() - asyncio.get_running_loop().time())) \
+            if self._cancel_handle is not None else 0
+        request.listOfValues = [
+            PropertyValue(propertyIdentifier=self.property_name, value=Any(value)),
+            PropertyValue(propertyIdentifier="statusFlags", value=Any(self.obj.statusFlags)),
+        ]
+        self.app.cov_notification(self, request)
+
+
+async def _do_subscribe_cov_property(app, apdu: SubscribeCOVPropertyRequest):
+    obj = app.get_object_id(apdu.monitoredObjectIdentifier)
+    cancel = apdu.issueConfirmedNotifications is None and apdu.lifetime is None
+    property_name = apdu.monitoredPropertyIdentifier.propertyIdentifier.attr
+    key = (apdu.pduSource, apdu.subscriberProcessIdentifier, apdu.monitoredObjectIdentifier, property_name)
+    subscription = app._cov_property_subscriptions.get(key)
+
+    if cancel:
+        if subscription is not None:
+            subscription.cancel()
+        await app.response(SimpleAckPDU(context=apdu))
+        return
+
+    if obj is None:
+        raise ExecutionError(errorClass="object", errorCode="unknownObject")
+    if property_name not in obj._property_monitors and getattr(obj, property_name, None) is None:
+        raise ExecutionError(errorClass="property", errorCode="unknownProperty")
+
+    # Without an increment in the request, the object increment applies to its present value
+    increment = apdu.covIncrement
+    if increment is None and property_name == "presentValue":
+        increment = getattr(obj, "covIncrement", None)
+    if increment is not None and not isinstance(getattr(obj, property_name), (int, float)):
+        increment = None
+
+    if subscription is None:
+        subscription = PropertySubscription(app, obj, apdu.pduSource, apdu.subscriberProcessIdentifier, property_name,
+                                            apdu.issueConfirmedNotifications, apdu.lifetime or 0, increment)
+        app._cov_property_subscriptions[key] = subscription
+    else:
+        subscription.increment = increment
+        subscription.renew(apdu.lifetime or 0)
+
+    await app.response(SimpleAckPDU(context=apdu))
+    # A new or renewed subscription gets the current value right away
+    asyncio.get_running_loop().call_soon(subscription.notify)
+
+
+def enable_cov_property(app):
+    """Adds SubscribeCOVProperty to a bacpypes3 application, which dispatches requests to its do_<Request> methods."""
+    app._cov_property_subscriptions = {}
+
+    async def do_SubscribeCOVPropertyRequest(apdu):
+        await _do_subscribe_cov_property(app, apdu)
+
+    app.do_SubscribeCOVPropertyRequest = do_SubscribeCOVPropertyRequest
+    app.device_object.protocolServicesSupported = app.get_services_supported()
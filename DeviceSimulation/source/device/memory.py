@@ -0,0 +1,42 @@
+from .base import BoilerDevice
+from .schema import load_device_type
+
+# Initial present values, the defaults of types/boiler.json like the BACnet objects
+DEFAULT_POINTS = load_device_type("boiler").defaults
+COMMAND_POINTS = load_device_type("boiler").command_points
+
+
+class InMemoryBoilerDevice(BoilerDevice):
+    """Boiler whose points live in a plain dict: no BACnet stack, no network."""
+    __slots__ = ("_name", "_device_id", "_points", "_command_listener")
+
+    def __init__(self, device_id: int, name: str = "Boiler1"):
+        self._name = name
+        self._device_id = device_id
+        self._points = dict(DEFAULT_POINTS)
+        self._command_listener = None
+
+    def _read_point(self, name: str):
+        return self._points[name]
+
+    def _write_point(self, name: str, value):
+        self._points[name] = value
+
+    def bms_write(self, name: str, value):
+        """
+        Stands in for a BACnet client writing a point, there is no network here. Like the BACnet backend,
+        only these writes notify the command listener, not the ones the simulation makes through the setters.
+        """
+        changed = self._points[name] != value
+        self._points[name] = value
+        if changed and name in COMMAND_POINTS and self._command_listener is not None:
+            self._command_listener.on_command(name)
+
+    def set_command_listener(self, listener):
+        self._command_listener = listener
+
+    def get_device_id(self):
+        return self._device_id
+
+    def get_points(self) -> dict:
+        return dict(self._points)
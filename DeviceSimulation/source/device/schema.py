@@ -0,0 +1,102 @@
+import json
+from dataclasses import dataclass, field
+from functools import cache
+from pathlib import Path
+from types import MappingProxyType
+
+# Built-in device types, one JSON file each: a new type is a new file, not a new class
+TYPES_DIRECTORY = Path(__file__).parent / "types"
+
+ANALOG_OBJECTS = ("analogInput", "analogOutput", "analogValue")
+BINARY_OBJECTS = ("binaryInput", "binaryValue")
+MULTISTATE_OBJECTS = ("multiStateInput", "multiStateValue")
+
+
+@dataclass(frozen=True)
+class PointSpec:
+    name: str
+    object_type: str
+    instance: int
+    description: str
+    default: float | bool | int
+    units: str | None = None
+    cov_increment: float | None = None
+    active_text: str = "On"
+    inactive_text: str = "Off"
+    states: tuple[str, ...] = ()
+    command: bool = False
+
+
+# eq=False: a compiled type is hashed by identity, so backends can cache what they derive from it
+@dataclass(frozen=True, eq=False)
+class DeviceType:
+    """A device type compiled from its schema, with the lookups every instance would otherwise recompute."""
+    name: str
+    points: tuple[PointSpec, ...]
+    defaults: MappingProxyType = field(repr=False)          # point name -> initial present value
+    binary_points: frozenset = field(repr=False)
+    cov_increments: MappingProxyType = field(repr=False)    # analog point name -> default COV increment
+    command_points: frozenset = field(repr=False)           # points a client writes to command the device
+
+
+def compile_device_type(schema: dict) -> DeviceType:
+    """
+    Validates a device type schema and compiles it. Each point has a name, an object type, a description
+    and a default; analog points also need units and may set cov_increment, binary points may set
+    active_text/inactive_text, multistate points list their states. A point a client writes to command the
+    device sets command. Instances are numbered per object type.
+    """
+    points = []
+    instances = {}
+    for point in schema["points"]:
+        name = point["name"]
+        object_type = point["object"]
+        if object_type in ANALOG_OBJECTS:
+            if "units" not in point:
+                raise ValueError(f"Analog point {name!r} of {schema['name']} has no units")
+            default = float(point["default"])
+        elif object_type in BINARY_OBJECTS:
+            default = bool(point["default"])
+        elif object_type in MULTISTATE_OBJECTS:
+            if not point.get("states"):
+                raise ValueError(f"Multistate point {name!r} of {schema['name']} has no states")
+            default = int(point["default"])
+        else:
+            raise ValueError(f"Unsupported object type {object_type!r} for point {name!r} of {schema['name']}")
+
+        instance = point.get("instance", instances.get(object_type, 0))
+        instances[object_type] = instance + 1
+        points.append(PointSpec(
+            name=name,
+            object_type=object_type,
+            instance=instance,
+            description=point.get("description", ""),
+            default=default,
+            units=point.get("units"),
+            cov_increment=point.get("cov_increment"),
+            active_text=point.get("active_text", "On"),
+            inactive_text=point.get("inactive_text", "Off"),
+            states=tuple(point.get("states", ())),
+            command=bool(point.get("command", False)),
+        ))
+
+    names = [point.name for point in points]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Point names of {schema['name']} must be unique")
+    return DeviceType(
+        name=schema["name"],
+        points=tuple(points),
+        defaults=MappingProxyType({point.name: point.default for point in points}),
+        binary_points=frozenset(point.name for point in points if point.object_type in BINARY_OBJECTS),
+        cov_increments=MappingProxyType({point.name: point.cov_increment for point in points
+                                         if point.object_type in ANALOG_OBJECTS and point.cov_increment is not None}),
+        command_points=frozenset(point.name for point in points if point.command),
+    )
+
+
+@cache
+def load_device_type(name: str) -> DeviceType:
+    """Compiles a built-in type by name ("boiler") or a schema file by path, once per process."""
+    path = Path(name) if name.endswith(".json") else TYPES_DIRECTORY / f"{name}.json"
+    with open(path) as schema_file:
+        return compile_device_type(json.load(schema_file))
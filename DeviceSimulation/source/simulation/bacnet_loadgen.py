@@ -0,0 +1,162 @@
+import asyncio
+import re
+from collections import Counter
+import aiohttp
+from bacpypes3.apdu import AbortPDU, AbortReason, ErrorRejectAbortNack
+from bacpypes3.basetypes import PropertyIdentifier
+from bacpypes3.errors import DecodingError, RejectException
+from bacpypes3.pdu import Address
+from bacpypes3.primitivedata import ObjectIdentifier
+from .loadgen import LatencyHistogram, OpenLoopSchedule
+from ..device.schema import DeviceType
+
+READ_PROPERTY = "read_property"
+READ_PROPERTY_MULTIPLE = "read_property_multiple"
+READ_SERVICES = (READ_PROPERTY, READ_PROPERTY_MULTIPLE)
+PRESENT_VALUE = PropertyIdentifier("presentValue")
+# Invoke IDs are one byte: bacpypes3 cannot have more confirmed requests pending towards one peer
+MAX_PENDING_PER_DEVICE = 255
+
+TICK_LAG_LINE = re.compile(r'^boiler_(tick_lag_seconds_bucket\{le="([^"]+)"\}|tick_lag_seconds_count|tick_lag_seconds_sum|'
+                           r'overruns_total) (\S+)$', re.MULTILINE)
+
+
+# --- DISCOVERY ----
+async def discover(app, ip: str, ports: list[int], timeout: float = 2.0) -> dict[int, Address]:
+    """Device ID -> address of the devices answering a Who-Is sent to ip on each port."""
+    i_ams = await asyncio.gather(*(app.who_is(address=Address(f"{ip}:{port}"), timeout=timeout) for port in ports))
+    return {i_am.iAmDeviceIdentifier[1]: i_am.pduSource for answers in i_ams for i_am in answers}
+
+
+def client_timeout(app, timeout: float):
+    """
+    Makes bacpypes3 give up on a confirmed request after timeout seconds, without retries. The
+    request keeps its invoke ID until then: cancelling it earlier on the client side would free
+    the ID for a newer request, which could then be answered with the reply to the old one.
+    """
+    app.device_object.apduTimeout = int(timeout * 1000)
+    app.device_object.numberOfApduRetries = 0
+
+
+# --- LOAD GENERATOR ----
+class BacnetReadLoadGenerator(OpenLoopSchedule):
+    """
+    Polls simulated devices the way a BMS does, at a fixed request rate round robin over the devices
+    and the services: a ReadProperty reads the present value of one point, a ReadPropertyMultiple
+    those of every point of the device type. A request bacpypes3 gives up on with no answer is a
+    timeout (see client_timeout), an Error, Reject or Abort answer an error. Requests to a device
+    that already has MAX_PENDING_PER_DEVICE pending are skipped and counted.
+    """
+
+    def __init__(self, app, devices: dict[int, Address], device_type: DeviceType, rate: float,
+                 services: tuple[str, ...] = READ_SERVICES, max_in_flight: int = 1000):
+        super().__init__(rate, max_in_flight)
+        self._app = app
+        self._addresses = list(devices.values())
+        self._objects = [ObjectIdentifier((point.object_type, point.instance)) for point in device_type.points]
+        # read_property_multiple takes object identifiers and property lists one after the other
+        self._all_points = [item for object_id in self._objects for item in (object_id, [PRESENT_VALUE])]
+        self.services = services
+        self._request_index = 0
+        self._next_point = 0
+        self._pending = Counter()       # address -> requests waiting for an answer
+
+        # --- Results ---
+        self.response_time = {service: LatencyHistogram() for service in services}  # from the intended send time
+        self.service_time = {service: LatencyHistogram() for service in services}   # from the actual dispatch
+        self.outcomes = {service: Counter() for service in services}                 # ok, timeout or the error class
+        self.values_read = Counter()
+
+    def _next_request(self) -> tuple[str, Address] | None:
+        service = self.services[self._request_index % len(self.services)]
+        address = self._addresses[self._request_index // len(self.services) % len(self._addresses)]
+        self._request_index += 1
+        if self._pending[address] >= MAX_PENDING_PER_DEVICE:
+            return None
+        return service, address
+
+    async def _read(self, service: str, address: Address) -> int:
+        """Values read by one request."""
+        if service == READ_PROPERTY:
+            object_id = self._objects[self._next_point]
+            self._next_point = (self._next_point + 1) % len(self._objects)
+            await self._app.read_property(address, object_id, PRESENT_VALUE)
+            return 1
+        return len(await self._app.read_property_multiple(address, self._all_points))
+
+    async def _send(self, request: tuple[str, Address], intended: float, measured: bool):
+        loop = asyncio.get_running_loop()
+        service, address = request
+        dispatched = loop.time()
+        values = 0
+        self._pending[address] += 1
+        try:
+            values = await self._read(service, address)
+            outcome = "ok"
+        except ErrorRejectAbortNack as error:
+            no_response = isinstance(error, AbortPDU) and error.apduAbortRejectReason == AbortReason.noResponse
+            outcome = "timeout" if no_response else type(error).__name__
+        except (DecodingError, RejectException) as error:
+            # An answer that came after its request was given up on, matched to a newer one with the same invoke ID
+            outcome = type(error).__name__
+        finally:
+            self._pending[address] -= 1
+        if measured:
+            done = loop.time()
+            self.response_time[service].record(done - intended)
+            self.service_time[service].record(done - dispatched)
+            self.outcomes[service][outcome] += 1
+            self.values_read[service] += values
+
+    def report(self, duration: float) -> dict:
+        report = {
+            "target_rate": self.rate,
+            "devices": len(self._addresses),
+            "points": len(self._objects),
+            "duration": duration,
+            "skipped_requests": self.skipped_requests,
+            "max_dispatch_lag": self.max_dispatch_lag,
+        }
+        for service in self.services:
+            outcomes = self.outcomes[service]
+            report[service] = {
+                "requests": sum(outcomes.values()),
+                "responses_per_second": outcomes["ok"] / duration,
+                "values_per_second": self.values_read[service] / duration,
+                "timeouts": outcomes["timeout"],
+                "errors": sum(count for outcome, count in outcomes.items() if outcome not in ("ok", "timeout")),
+                "outcomes": dict(outcomes),
+                "response_time": self.response_time[service].summary(),
+                "service_time": self.service_time[service].summary(),
+            }
+        return report
+
+
+# --- TICK LAG ----
+async def scrape_tick_lag(session: aiohttp.ClientSession, metrics_url: str) -> dict:
+    """Tick lag histogram and overruns exposed by a simulator started with --metrics_port."""
+    async with session.get(metrics_url) as response:
+        response.raise_for_status()
+        text = await response.text()
+    scrape = {"buckets": {}, "count": 0.0, "sum": 0.0, "overruns": 0.0}
+    for name, bound, value in TICK_LAG_LINE.findall(text):
+        if bound:
+            scrape["buckets"][float(bound)] = float(value)
+        else:
+            scrape[{"tick_lag_seconds_count": "count", "tick_lag_seconds_sum": "sum", "overruns_total": "overruns"}[name]] = float(value)
+    return scrape
+
+
+def tick_lag_between(before: dict, after: dict) -> dict:
+    """
+    Tick lag of the ticks run between two scrapes. The histogram only has the bucket bounds,
+    so the percentiles are upper bounds.
+    """
+    ticks = after["count"] - before["count"]
+    lag = {"ticks": int(ticks), "mean": (after["sum"] - before["sum"]) / ticks if ticks else 0.0,
+           "overruns": int(after["overruns"] - before["overruns"])}
+    for percent in (50, 99):
+        lag[f"p{percent}_below"] = next((bound for bound, cumulative in sorted(after["buckets"].items())
+                                         if cumulative - before["buckets"].get(bound, 0.0) >= percent / 100 * ticks),
+                                        0.0) if ticks else 0.0
+    return lag
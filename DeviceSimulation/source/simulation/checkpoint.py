@@ -0,0 +1,89 @@
+import asyncio
+import gzip
+import json
+import os
+from datetime import datetime
+from . import states
+from .simulation import SimulationContext, shared_profile
+
+CHECKPOINT_VERSION = 1
+
+# SimulationContext attributes saved with the state, the rest (device, scheduler, uploader) is rebuilt at startup
+CONTEXT_FIELDS = ("simulation_mode", "capacity", "potenza", "ambient_temperature", "setpoint", "interval_send_data", "timer")
+# Of those, the ones that come from the shared BoilerProfile
+PROFILE_FIELDS = ("capacity", "potenza", "ambient_temperature", "interval_send_data")
+# Context attribute -> key in "state_vars", named after the attributes the states used to keep them in
+STATE_VARS = {"state_timer": "_timer", "purge_end": "_purge_end", "end_heating": "_end_heating"}
+
+
+# --- SNAPSHOT ----
+def snapshot(context: SimulationContext) -> dict:
+    """Everything needed to resume a device: state class, its timers, the context fields and every point value."""
+    return {
+        "device_id": context.device.get_device_id(),
+        "state": type(context.state).__name__,
+        "state_vars": {key: getattr(context, attribute) for attribute, key in STATE_VARS.items()},
+        "context": {field: getattr(context, field) for field in CONTEXT_FIELDS},
+        "points": context.device.get_points(),
+    }
+
+
+def restore(context: SimulationContext, device_snapshot: dict):
+    """
+    Puts the context back in the snapshot state and publishes the point values.
+    The device keeps its own identity, so a snapshot of one device can warm up another.
+    """
+    context.state = states.STATES[device_snapshot["state"]]
+    state_vars = device_snapshot["state_vars"]
+    context.state_timer = state_vars.get("_timer", 0)
+    context.purge_end = state_vars.get("_purge_end", False)
+    context.end_heating = state_vars.get("_end_heating", False)
+    saved = device_snapshot["context"]
+    context.profile = shared_profile(**{field: saved[field] for field in PROFILE_FIELDS if field in saved})
+    for field, value in saved.items():
+        if field not in PROFILE_FIELDS:
+            setattr(context, field, value)
+    context.device.load_points(device_snapshot["points"])
+    context.device.commit()
+
+
+# --- FILES ----
+def save_checkpoint(path: str, snapshots: list[dict]):
+    """
+    Writes the snapshots as gzip-compressed JSON. The file is replaced atomically,
+    a crash while saving leaves the previous checkpoint intact.
+    """
+    checkpoint = {"version": CHECKPOINT_VERSION, "time": datetime.now().isoformat(), "devices": snapshots}
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "wb") as raw_file:
+        with gzip.GzipFile(fileobj=raw_file, mode="wb", compresslevel=6) as checkpoint_file:
+            checkpoint_file.write(json.dumps(checkpoint, separators=(",", ":")).encode())
+        raw_file.flush()
+        os.fsync(raw_file.fileno())
+    os.replace(temporary_path, path)
+
+
+def load_checkpoint(path: str, device_ids=None) -> dict[int, dict]:
+    """Reads a checkpoint and returns its snapshots by device ID, only the ones in device_ids when given."""
+    with gzip.open(path, "rt") as checkpoint_file:
+        checkpoint = json.load(checkpoint_file)
+    if checkpoint.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version {checkpoint.get('version')} in {path}")
+    wanted = set(device_ids) if device_ids is not None else None
+    return {device["device_id"]: device for device in checkpoint["devices"]
+            if wanted is None or device["device_id"] in wanted}
+
+
+def load_template(path: str) -> dict:
+    """First snapshot of a checkpoint, used to clone a warm device into a whole fleet."""
+    snapshots = load_checkpoint(path)
+    if not snapshots:
+        raise ValueError(f"Checkpoint {path} contains no devices")
+    return next(iter(snapshots.values()))
+
+
+async def checkpoint_periodically(path: str, interval: float, take_snapshots):
+    """Saves take_snapshots() every interval seconds. Snapshots are taken on the loop, compression and I/O run in a thread."""
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.to_thread(save_checkpoint, path, take_snapshots())
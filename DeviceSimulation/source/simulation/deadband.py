@@ -0,0 +1,75 @@
+from dataclasses import dataclass, field
+
+# Sample fields a frame can leave out, device_id and timestamp are in every frame
+FRAME_FIELDS = ("operation_mode", "supply_temp", "return_temp", "outlet_pressure", "inlet_pressure", "instant_power",
+                "pump_status", "error_message")
+# Smallest change of an analog field worth a frame, the other fields are sent on any change
+DEFAULT_DEADBANDS = {
+    "supply_temp": 0.5,
+    "return_temp": 0.5,
+    "outlet_pressure": 0.05,
+    "inlet_pressure": 0.05,
+    "instant_power": 5.0,
+}
+DEADBAND_FIELDS = tuple(DEFAULT_DEADBANDS)
+# Simulated seconds between two full frames, even when nothing moved
+DEFAULT_HEARTBEAT = 300
+
+
+@dataclass(frozen=True)
+class DeadbandPolicy:
+    deadbands: dict = field(default_factory=lambda: dict(DEFAULT_DEADBANDS))
+    heartbeat: float = DEFAULT_HEARTBEAT
+
+
+class DeltaEncoder:
+    """
+    Report by exception for one device. Every sample becomes a full frame, a delta frame with only
+    the fields that moved past their deadband since they were last reported, or nothing at all.
+    Frames are numbered so the server can tell a lost frame from a device that had nothing to say;
+    a full frame every heartbeat lets it rebuild the state again after a loss.
+    """
+
+    def __init__(self, policy: DeadbandPolicy):
+        self.policy = policy
+        self.sequence = 0
+        self.reported = None        # field -> value the server holds, None until the first full frame
+        self.since_full = 0.0
+
+        # --- Stats ---
+        self.full_frames = 0
+        self.delta_frames = 0
+        self.suppressed_samples = 0
+
+    def frame(self, sample: dict, elapsed: float, force_full: bool = False) -> dict | None:
+        """
+        The frame to upload for a sample taken elapsed simulated seconds after the previous one, None when
+        nothing changed. force_full sends every field, e.g. while uploads fail and frames may be lost.
+        """
+        self.since_full += elapsed
+        if self.reported is None or force_full or self.since_full >= self.policy.heartbeat:
+            self.reported = {name: sample[name] for name in FRAME_FIELDS}
+            self.since_full = 0.0
+            self.full_frames += 1
+            frame = dict(sample)
+        else:
+            deadbands = self.policy.deadbands
+            changed = {}
+            for name in FRAME_FIELDS:
+                value = sample[name]
+                reported = self.reported[name]
+                if value == reported:
+                    continue
+                deadband = deadbands.get(name)
+                if deadband is None or abs(value - reported) >= deadband:
+                    changed[name] = value
+            if not changed:
+                self.suppressed_samples += 1
+                return None
+            # Only the fields sent move the reference: a slow drift still crosses the deadband eventually
+            self.reported.update(changed)
+            self.delta_frames += 1
+            frame = {"device_id": sample["device_id"], "timestamp": sample["timestamp"], **changed}
+        self.sequence += 1
+        frame["seq"] = self.sequence
+        return frame
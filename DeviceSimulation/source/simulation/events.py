@@ -0,0 +1,165 @@
+import json
+import logging
+import queue
+import sys
+import time
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+
+# --- EVENT TYPES ----
+TRANSITION = "transition"  # a device moved to another state
+ERROR = "error"            # a device or the uploader hit a fault
+SUMMARY = "summary"        # periodic fleet-wide figures
+TRACE = "trace"            # per-tick values, only for the traced device
+
+DEFAULT_RATE = 5     # events per second per device
+DEFAULT_BURST = 20
+DEFAULT_QUEUE_SIZE = 10000
+
+logger = logging.getLogger("boiler.events")
+logger.propagate = False
+logger.addHandler(logging.NullHandler())  # silent until start_event_log is called
+
+_trace_device = None
+
+
+def trace_enabled(device_id) -> bool:
+    return _trace_device is not None and device_id == _trace_device
+
+
+def transitions_enabled() -> bool:
+    return logger.isEnabledFor(logging.INFO)
+
+
+def _emit(level: int, event_type: str, device_id, message: str, fields: dict):
+    if logger.isEnabledFor(level):
+        logger.log(level, message, extra={"event_type": event_type, "device_id": device_id, "fields": fields})
+
+
+def transition(device_id, old_state: str, new_state: str, **fields):
+    _emit(logging.INFO, TRANSITION, device_id, f"{old_state} -> {new_state}", {"from": old_state, "to": new_state, **fields})
+
+
+def error(device_id, message: str, **fields):
+    _emit(logging.ERROR, ERROR, device_id, message, fields)
+
+
+def summary(message: str, **fields):
+    _emit(logging.INFO, SUMMARY, None, message, fields)
+
+
+def trace(device_id, message: str, **fields):
+    _emit(logging.DEBUG, TRACE, device_id, message, fields)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, event type, device, message and the event fields."""
+
+    def format(self, record):
+        event = {
+            "time": datetime.fromtimestamp(record.created).isoformat(),
+            "event": getattr(record, "event_type", record.levelname.lower()),
+            "device_id": getattr(record, "device_id", None),
+            "message": record.getMessage(),
+        }
+        event.update(getattr(record, "fields", {}))
+        return json.dumps(event, default=str)
+
+
+class DeviceRateLimit(logging.Filter):
+    """
+    Token bucket per device: at most `rate` events per second, with bursts of `burst`.
+    Summaries and traces are not limited, the first event let through after a suppression
+    carries the number of events suppressed meanwhile.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}  # device_id -> [tokens, last refill, suppressed]
+
+    def filter(self, record):
+        if getattr(record, "event_type", None) in (SUMMARY, TRACE):
+            return True
+        now = time.monotonic()
+        bucket = self._buckets.get(record.device_id)
+        if bucket is None:
+            bucket = self._buckets[record.device_id] = [self.burst, now, 0]
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens < 1:
+            bucket[0] = tokens
+            bucket[2] += 1
+            return False
+        bucket[0] = tokens - 1
+        if bucket[2]:
+            record.fields = {**record.fields, "suppressed": bucket[2]}
+            bucket[2] = 0
+        return True
+
+
+class _EventQueueHandler(QueueHandler):
+    """Hands records to the listener thread as they are, formatting and I/O happen there."""
+
+    def __init__(self, event_queue):
+        super().__init__(event_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        # A full queue means the output cannot keep up: lose the event rather than block the simulation
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class EventListener(QueueListener):
+    """Writes the queued events from a background thread and reports the ones lost to a full queue on stop()."""
+
+    def __init__(self, event_queue, output: logging.Handler):
+        super().__init__(event_queue, output)
+        self.queue_handler = _EventQueueHandler(event_queue)
+
+    def enqueue_sentinel(self):
+        # Waits for room: the events still queued are written before the thread ends
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        logger.removeHandler(self.queue_handler)
+        super().stop()
+        if self.queue_handler.dropped:
+            record = logging.makeLogRecord({"msg": "Events dropped, the output could not keep up", "event_type": SUMMARY,
+                                            "device_id": None, "fields": {"dropped": self.queue_handler.dropped}})
+            self.handle(record)
+        for handler in self.handlers:
+            handler.close()
+
+
+def start_event_log(path: str | None = None, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST,
+                    trace_device: int | None = None, queue_size: int = DEFAULT_QUEUE_SIZE) -> EventListener:
+    """
+    Sends the events to `path` (stderr when None) as JSON lines, written by a background thread.
+    With trace_device, per-tick trace events are enabled for that device only.
+    Returns the listener, stop() it to flush the remaining events on exit.
+    """
+    global _trace_device
+    _trace_device = trace_device
+
+    output = logging.FileHandler(path) if path else logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter())
+    listener = EventListener(queue.Queue(queue_size), output)
+
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    for log_filter in list(logger.filters):
+        logger.removeFilter(log_filter)
+    logger.addHandler(listener.queue_handler)
+    logger.addFilter(DeviceRateLimit(rate, burst))
+    logger.setLevel(logging.DEBUG if trace_device is not None else logging.INFO)
+
+    listener.start()
+    return listener
@@ -0,0 +1,245 @@
+import asyncio
+import json
+import os
+import resource
+import time
+from dataclasses import dataclass
+import aiohttp
+from . import events
+from .checkpoint import checkpoint_periodically, load_checkpoint, load_template, restore, save_checkpoint, snapshot
+from .deadband import DeadbandPolicy, DeltaEncoder
+from .scheduler import TickScheduler, CATCH_UP
+from .simulation import SimulationContext
+from .uploader import TelemetryUploader, WEB_SERVER_FRAMES_URL
+from .states import INITIALIZE_STATE
+from ..device.boiler import BoilerBacnetDevice
+
+
+# --- MANIFEST ----
+@dataclass
+class FleetDeviceConfig:
+    device_id: int
+    ip: str
+    port: int
+    name: str
+    initial_setpoint: float = 70.0
+    simulation_mode: int = 0
+    network_number: int | None = None
+    cov_increments: dict[str, float] | None = None
+
+
+def load_manifest(path: str) -> list[FleetDeviceConfig]:
+    """
+    Reads a fleet manifest. Devices are either listed one by one in "devices"
+    or generated from "count", "first_device_id" and "first_port".
+    Values in "defaults" apply to every device that does not override them.
+    """
+    with open(path) as manifest_file:
+        manifest = json.load(manifest_file)
+
+    defaults = {"ip": manifest.get("ip"), "initial_setpoint": 70.0, "simulation_mode": 0}
+    defaults.update(manifest.get("defaults", {}))
+
+    entries = manifest.get("devices")
+    if entries is None:
+        count = manifest["count"]
+        first_device_id = manifest.get("first_device_id", 1)
+        first_port = manifest.get("first_port", 47808)
+        entries = [{"device_id": first_device_id + i, "port": first_port + i} for i in range(count)]
+
+    devices = []
+    for entry in entries:
+        config = dict(defaults)
+        config.update(entry)
+        if config.get("ip") is None:
+            raise ValueError(f"Device {config['device_id']} has no ip")
+        config.setdefault("name", f"Boiler{config['device_id']}")
+        devices.append(FleetDeviceConfig(**config))
+
+    device_ids = [device.device_id for device in devices]
+    if len(set(device_ids)) != len(device_ids):
+        raise ValueError("Device IDs in the manifest must be unique")
+    return devices
+
+
+# --- RESOURCE USAGE ----
+def current_rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # No procfs: fall back to the peak resident size (kilobytes on Linux, bytes on macOS)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# --- FLEET ----
+class FleetSimulation:
+    def __init__(self, devices: list[FleetDeviceConfig], report_interval: float = 30, spool_path: str | None = None,
+                 checkpoint_path: str | None = None, checkpoint_interval: float = 300, restore_path: str | None = None,
+                 template_path: str | None = None, wire_format: str = "auto", deadband: DeadbandPolicy | None = None):
+        self.configs = devices
+        self.report_interval = report_interval
+        self.spool_path = spool_path
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        self.restore_path = restore_path
+        self.template_path = template_path
+        self.wire_format = wire_format
+        self.deadband = deadband
+        self.uploader = None
+        self.engine = None
+        self.boilers = []
+        self.contexts = []
+        self.schedulers = []
+
+    async def start(self):
+        """
+        Brings up every device. With restore_path each device resumes from its own snapshot, with
+        template_path the devices missing from it start from a copy of the template device instead.
+        """
+        restoring = None
+        if self.restore_path:
+            # Decompressed and parsed in a worker thread while the BACnet devices come up
+            device_ids = [config.device_id for config in self.configs]
+            restoring = asyncio.create_task(asyncio.to_thread(load_checkpoint, self.restore_path, device_ids))
+        template = load_template(self.template_path) if self.template_path else None
+
+        # BAC0.connect is synchronous, devices come up one at a time; their objects are cloned from the compiled boiler type
+        for config in self.configs:
+            boiler = BoilerBacnetDevice(name=config.name, ip=config.ip, port=config.port,
+                                        device_id=config.device_id, network_number=config.network_number,
+                                        cov_increments=config.cov_increments)
+            await boiler.start()
+            self.boilers.append(boiler)
+            context = SimulationContext(boiler, INITIALIZE_STATE, config.simulation_mode, config.initial_setpoint)
+            if self.deadband is not None:
+                context.delta_encoder = DeltaEncoder(self.deadband)
+            self.contexts.append(context)
+
+        snapshots = await restoring if restoring is not None else {}
+        restored = 0
+        for context in self.contexts:
+            device_snapshot = snapshots.get(context.device.get_device_id(), template)
+            if device_snapshot is not None:
+                restore(context, device_snapshot)
+                restored += 1
+        events.summary("Fleet started", devices=len(self.boilers), restored=restored)
+
+    def snapshots(self) -> list[dict]:
+        if self.engine is not None:
+            self.engine.store_contexts(self.contexts)
+        return [snapshot(context) for context in self.contexts]
+
+    async def save_checkpoint(self):
+        snapshots = self.snapshots()
+        await asyncio.to_thread(save_checkpoint, self.checkpoint_path, snapshots)
+        events.summary("Checkpoint saved", devices=len(snapshots), path=self.checkpoint_path)
+
+    async def run(self, speed_factor: float, engine: str = "scalar", tick_period: float = 1.0, overrun_policy: str = CATCH_UP):
+        async with aiohttp.ClientSession() as session:
+            # One uploader batches the samples of every device in the fleet
+            if self.deadband is not None:
+                # Frames are JSON only
+                self.uploader = TelemetryUploader(session, url=WEB_SERVER_FRAMES_URL, spool_path=self.spool_path, wire_format="json")
+            else:
+                self.uploader = TelemetryUploader(session, spool_path=self.spool_path, wire_format=self.wire_format)
+            tasks = [asyncio.create_task(self.uploader.run())]
+            if engine == "vectorized":
+                scheduler = TickScheduler(tick_period, overrun_policy)
+                self.schedulers = [scheduler]
+                tasks.append(asyncio.create_task(self._run_vectorized(speed_factor, scheduler, self.uploader)))
+            else:
+                tasks += [asyncio.create_task(context.run_simulation(speed_factor, self.uploader, tick_period, overrun_policy))
+                          for context in self.contexts]
+            if self.report_interval > 0:
+                tasks.append(asyncio.create_task(self._report_resources()))
+            if self.checkpoint_path and self.checkpoint_interval > 0:
+                tasks.append(asyncio.create_task(
+                    checkpoint_periodically(self.checkpoint_path, self.checkpoint_interval, self.snapshots)))
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                # Waited for, so a batch the uploader was sending is back in its queue before close() drains it
+                await asyncio.gather(*tasks, return_exceptions=True)
+                await self.uploader.close()
+
+    async def _run_vectorized(self, speed_factor: float, scheduler: TickScheduler, uploader: TelemetryUploader):
+        # NumPy is only needed by this engine
+        from .vectorized import VectorizedBoilerFleet
+
+        engine = self.engine = VectorizedBoilerFleet(
+            len(self.contexts),
+            simulation_mode=[config.simulation_mode for config in self.configs],
+            initial_setpoint=[config.initial_setpoint for config in self.configs],
+        )
+        # Picks up restored states and points, a cold fleet is already in the engine defaults
+        engine.load_contexts(self.contexts)
+
+        def upload(step):
+            for context in self.contexts:
+                context.schedule_upload(step, uploader)
+
+        await engine.run(self.boilers, speed_factor, scheduler, on_tick=upload)
+
+    async def stop(self):
+        if self.checkpoint_path and self.contexts:
+            await self.save_checkpoint()
+        for boiler in self.boilers:
+            await boiler.stop()
+        self.boilers.clear()
+        self.contexts.clear()
+
+    def stats(self) -> dict:
+        """Device count, resident memory, tick lag and upload figures of the fleet, as plain numbers."""
+        schedulers = self.schedulers or [context.scheduler for context in self.contexts if context.scheduler]
+        stats = {
+            "devices": len(self.contexts),
+            "rss_bytes": current_rss_bytes(),
+            "ticks": sum(s.ticks for s in schedulers),
+            "overruns": sum(s.overruns for s in schedulers),
+            "skipped_ticks": sum(s.skipped_ticks for s in schedulers),
+            "max_lag": max((s.max_lag for s in schedulers), default=0.0),
+            "mean_lag": sum(s.mean_lag for s in schedulers) / len(schedulers) if schedulers else 0.0,
+        }
+        if self.uploader is not None:
+            stats.update({f"upload_{key}": value for key, value in self.uploader.stats().items()})
+        stats.update(self.frame_stats())
+        return stats
+
+    def frame_stats(self) -> dict:
+        """Frames sent and samples left out by report by exception, empty when it is off."""
+        if self.deadband is None:
+            return {}
+        encoders = [context.delta_encoder for context in self.contexts]
+        return {
+            "full_frames": sum(encoder.full_frames for encoder in encoders),
+            "delta_frames": sum(encoder.delta_frames for encoder in encoders),
+            "suppressed_samples": sum(encoder.suppressed_samples for encoder in encoders),
+        }
+
+    async def _report_resources(self):
+        last_cpu = time.process_time()
+        last_wall = time.monotonic()
+        while True:
+            await asyncio.sleep(self.report_interval)
+            cpu = time.process_time()
+            wall = time.monotonic()
+            device_count = max(len(self.contexts), 1)
+            cpu_percent = 100 * (cpu - last_cpu) / (wall - last_wall)
+            rss = current_rss_bytes()
+            events.summary("Fleet resources", devices=device_count, rss_bytes=rss, rss_bytes_per_device=rss / device_count,
+                           cpu_percent=cpu_percent, cpu_percent_per_device=cpu_percent / device_count)
+            last_cpu, last_wall = cpu, wall
+
+            schedulers = self.schedulers or [context.scheduler for context in self.contexts if context.scheduler]
+            if schedulers:
+                events.summary("Fleet ticks",
+                               max_lag=max(s.max_lag for s in schedulers),
+                               mean_lag=sum(s.mean_lag for s in schedulers) / len(schedulers),
+                               overruns=sum(s.overruns for s in schedulers),
+                               skipped_ticks=sum(s.skipped_ticks for s in schedulers))
+
+            if self.uploader is not None:
+                events.summary("Fleet uploads", **self.uploader.stats(), **self.frame_stats())
@@ -0,0 +1,226 @@
+import asyncio
+import json
+import math
+import random
+from abc import ABC, abstractmethod
+from collections import Counter
+from datetime import datetime
+import aiohttp
+from .uploader import EXAMPLE_API_KEY
+from .wire import BINARY_CONTENT_TYPE, encode_batch
+
+REPORT_PERCENTILES = (50, 90, 99, 99.9, 99.99)
+
+
+# --- HISTOGRAM ----
+class LatencyHistogram:
+    """
+    HDR-style latency histogram: log-linear buckets keep significant_digits of relative precision
+    from 1 us up to max_seconds, with constant memory and an O(1) record. Values above max_seconds
+    are clamped and counted in overflows.
+    """
+
+    def __init__(self, significant_digits: int = 3, max_seconds: float = 60.0):
+        self._sub_bucket_bits = math.ceil(math.log2(2 * 10 ** significant_digits))
+        self._half = 1 << (self._sub_bucket_bits - 1)
+        self._max_value = int(max_seconds * 1e6)
+        self.counts = [0] * (self._index(self._max_value) + 1)
+        self.total = 0
+        self.overflows = 0
+        self.min = math.inf
+        self.max = 0.0
+        self.sum = 0.0
+
+    def _index(self, value: int) -> int:
+        # Bucket b holds values of b + sub_bucket_bits bits at a resolution of 2**b us
+        bucket = max(0, value.bit_length() - self._sub_bucket_bits)
+        return bucket * self._half + (value >> bucket)
+
+    def _highest_equivalent(self, index: int) -> int:
+        bucket = max(0, index // self._half - 1)
+        return ((index - bucket * self._half + 1) << bucket) - 1
+
+    def record(self, seconds: float):
+        value = int(seconds * 1e6)
+        if value > self._max_value:
+            self.overflows += 1
+            value = self._max_value
+        self.counts[self._index(max(value, 0))] += 1
+        self.total += 1
+        self.sum += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def percentile(self, percent: float) -> float:
+        """Seconds below which percent of the recorded values fall, within the histogram precision."""
+        if not self.total:
+            return 0.0
+        target = max(1, math.ceil(percent / 100 * self.total))
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return min(self._highest_equivalent(index) / 1e6, self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.total if self.total else 0.0
+
+    def summary(self) -> dict:
+        summary = {f"p{percent:g}": self.percentile(percent) for percent in REPORT_PERCENTILES}
+        summary.update(count=self.total, min=self.min if self.total else 0.0, mean=self.mean, max=self.max,
+                       overflows=self.overflows)
+        return summary
+
+
+# --- LOAD GENERATOR ----
+class OpenLoopSchedule(ABC):
+    """
+    Dispatches requests at a fixed rate whatever the response time: every request has an intended
+    send time on a fixed schedule and is dispatched at that time even if earlier ones are still
+    waiting. Subclasses build requests in _next_request, send them in _send and measure response
+    times from the intended time, so a slow server shows up as latency instead of as a lower send
+    rate (no coordinated omission).
+    """
+
+    def __init__(self, rate: float, max_in_flight: int):
+        self.rate = rate
+        self.max_in_flight = max_in_flight
+        self._in_flight = set()
+        self.sent_requests = 0
+        self.skipped_requests = 0                # not dispatched: max_in_flight requests pending, or declined by _next_request
+        self.max_dispatch_lag = 0.0              # how late the generator itself dispatched a request
+
+    async def run(self, duration: float, warmup: float = 0.0) -> dict:
+        """Runs warmup + duration seconds of the schedule, only the requests after the warmup are measured."""
+        loop = asyncio.get_running_loop()
+        interval = 1 / self.rate
+        total = int((warmup + duration) * self.rate)
+        start = loop.time()
+        measured_from = start + warmup
+        dispatched = 0
+        while dispatched < total:
+            due = min(total, int((loop.time() - start) * self.rate) + 1)
+            while dispatched < due:
+                intended = start + dispatched * interval
+                dispatched += 1
+                if len(self._in_flight) >= self.max_in_flight:
+                    self.skipped_requests += 1
+                    continue
+                task = asyncio.create_task(self._dispatch(intended, intended >= measured_from))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+            await asyncio.sleep(max(0.0, start + dispatched * interval - loop.time()))
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight)
+        return self.report(duration)
+
+    async def _dispatch(self, intended: float, measured: bool):
+        request = self._next_request()
+        if request is None:
+            self.skipped_requests += 1
+            return
+        self.max_dispatch_lag = max(self.max_dispatch_lag, asyncio.get_running_loop().time() - intended)
+        self.sent_requests += 1
+        await self._send(request, intended, measured)
+
+    @abstractmethod
+    def _next_request(self):
+        """What the next request sends, None to skip it."""
+        pass
+
+    @abstractmethod
+    async def _send(self, request, intended: float, measured: bool):
+        pass
+
+    @abstractmethod
+    def report(self, duration: float) -> dict:
+        pass
+
+
+class OpenLoopLoadGenerator(OpenLoopSchedule):
+    """
+    Sends synthetic ReceivedDeviceStatus samples from virtual devices to the Web Server at a fixed
+    request rate. Response times are measured from the intended send time, service times from the
+    actual dispatch.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, base_url: str, rate: float, devices: int, batch_size: int = 1,
+                 api_key: str = EXAMPLE_API_KEY, first_device_id: int = 1, max_in_flight: int = 10000, seed: int = 1,
+                 wire_format: str = "json"):
+        super().__init__(rate, max_in_flight)
+        self._session = session
+        # Binary records only exist for the batch endpoint, even with one sample per request
+        self._binary = wire_format == "binary"
+        single = batch_size == 1 and not self._binary
+        self._url = f"{base_url}/device/upload" if single else f"{base_url}/device/upload/batch"
+        self._headers = {"Authorization": api_key, "Content-Type": BINARY_CONTENT_TYPE if self._binary else "application/json"}
+        self._single = single
+        self.batch_size = batch_size
+        self._random = random.Random(seed)
+        self._devices = [self._virtual_device(first_device_id + index) for index in range(devices)]
+        self._next_device = 0
+
+        # --- Results ---
+        self.response_time = LatencyHistogram()  # from the intended send time
+        self.service_time = LatencyHistogram()   # from the actual dispatch
+        self.statuses = Counter()
+
+    def _virtual_device(self, device_id: int) -> dict:
+        return {
+            "device_id": device_id,
+            "operation_mode": self._random.choice((1, 4)),
+            "supply_temp": self._random.uniform(40, 80),
+            "return_temp": self._random.uniform(25, 50),
+            "outlet_pressure": 1.5,
+            "inlet_pressure": 2.0,
+            "instant_power": self._random.uniform(0, 600),
+            "pump_status": True,
+            "error_message": 1,
+        }
+
+    def _next_sample(self, timestamp: str) -> dict:
+        device = self._devices[self._next_device]
+        self._next_device = (self._next_device + 1) % len(self._devices)
+        device["supply_temp"] += self._random.uniform(-0.5, 0.5)
+        return {**device, "timestamp": timestamp}
+
+    def _next_request(self) -> str | bytes:
+        timestamp = datetime.now().isoformat()
+        if self._single:
+            return json.dumps(self._next_sample(timestamp))
+        samples = [self._next_sample(timestamp) for _ in range(self.batch_size)]
+        return encode_batch(samples) if self._binary else json.dumps(samples)
+
+    async def _send(self, body: str | bytes, intended: float, measured: bool):
+        loop = asyncio.get_running_loop()
+        dispatched = loop.time()
+        try:
+            async with self._session.post(self._url, data=body, headers=self._headers) as response:
+                await response.read()
+                status = response.status
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            status = type(error).__name__
+        if measured:
+            done = loop.time()
+            self.response_time.record(done - intended)
+            self.service_time.record(done - dispatched)
+            self.statuses[status] += 1
+
+    def report(self, duration: float) -> dict:
+        succeeded = sum(count for status, count in self.statuses.items() if isinstance(status, int) and status < 300)
+        return {
+            "target_rate": self.rate,
+            "batch_size": self.batch_size,
+            "wire_format": "binary" if self._binary else "json",
+            "duration": duration,
+            "requests": self.response_time.total,
+            "achieved_rate": succeeded / duration,
+            "achieved_samples_per_second": succeeded * self.batch_size / duration,
+            "statuses": {str(status): count for status, count in self.statuses.items()},
+            "skipped_requests": self.skipped_requests,
+            "max_dispatch_lag": self.max_dispatch_lag,
+            "response_time": self.response_time.summary(),
+            "service_time": self.service_time.summary(),
+        }
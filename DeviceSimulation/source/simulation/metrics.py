@@ -0,0 +1,117 @@
+import weakref
+from bisect import bisect_left
+
+# Bucket upper bounds in seconds
+HANDLE_BUCKETS = (2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 5e-3, 1e-2)
+COMMIT_BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2)
+LAG_BUCKETS = (1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+UPLOAD_BUCKETS = (1e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Off until start_metrics_server: the hot paths check it before timing anything
+enabled = False
+
+
+class FastHistogram:
+    """
+    Bucket counters kept in a plain list, with no lock and no label lookup per observation.
+    They become a Prometheus histogram only when the endpoint is scraped.
+    """
+
+    def __init__(self, buckets):
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def buckets(self) -> list:
+        counts = list(self.counts)
+        cumulative = []
+        total = 0
+        for bound, count in zip(self.bounds + (float("inf"),), counts):
+            total += count
+            cumulative.append(("+Inf" if bound == float("inf") else repr(bound), total))
+        return cumulative
+
+
+handle_seconds = {}  # State class name -> FastHistogram
+transitions = {}     # (from state, to state) -> count
+commit_seconds = FastHistogram(COMMIT_BUCKETS)
+vectorized_step_seconds = FastHistogram(HANDLE_BUCKETS + (5e-2, 0.1, 0.5))
+tick_lag_seconds = FastHistogram(LAG_BUCKETS)
+upload_seconds = FastHistogram(UPLOAD_BUCKETS)
+
+schedulers = weakref.WeakSet()
+uploaders = weakref.WeakSet()
+
+
+def observe_handle(state_name: str, seconds: float):
+    histogram = handle_seconds.get(state_name)
+    if histogram is None:
+        histogram = handle_seconds[state_name] = FastHistogram(HANDLE_BUCKETS)
+    histogram.observe(seconds)
+
+
+def count_transition(old_state: str, new_state: str):
+    key = (old_state, new_state)
+    transitions[key] = transitions.get(key, 0) + 1
+
+
+class SimulatorCollector:
+    """Builds every metric at scrape time, from the histograms above and the stats of the live schedulers and uploaders."""
+
+    def collect(self):
+        from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+
+        def histogram_family(name: str, documentation: str, histogram: FastHistogram):
+            family = HistogramMetricFamily(name, documentation)
+            family.add_metric([], histogram.buckets(), histogram.sum)
+            return family
+
+        family = HistogramMetricFamily("boiler_state_handle_seconds", "Duration of State.handle per state class",
+                                       labels=["state"])
+        for state_name, histogram in list(handle_seconds.items()):
+            family.add_metric([state_name], histogram.buckets(), histogram.sum)
+        yield family
+
+        family = CounterMetricFamily("boiler_state_transitions", "State transitions", labels=["from_state", "to_state"])
+        for (old_state, new_state), count in list(transitions.items()):
+            family.add_metric([old_state, new_state], count)
+        yield family
+
+        yield histogram_family("boiler_commit_seconds", "Duration of the BACnet point write-back at the end of a tick", commit_seconds)
+        yield histogram_family("boiler_vectorized_step_seconds", "Duration of one vectorized fleet step", vectorized_step_seconds)
+        yield histogram_family("boiler_tick_lag_seconds", "Delay of each tick after its deadline", tick_lag_seconds)
+
+        scheduler_stats = [scheduler.stats() for scheduler in list(schedulers)]
+        for key, documentation in (("ticks", "Ticks run"), ("overruns", "Ticks started a period or more late"),
+                                   ("skipped_ticks", "Ticks skipped after an overrun")):
+            yield CounterMetricFamily(f"boiler_{key}", documentation, value=sum(stats[key] for stats in scheduler_stats))
+        yield GaugeMetricFamily("boiler_tick_lag_max_seconds", "Largest tick lag seen by any scheduler",
+                                value=max((stats["max_lag"] for stats in scheduler_stats), default=0.0))
+
+        yield histogram_family("boiler_upload_seconds", "Latency of successful upload requests", upload_seconds)
+        uploader_stats = [uploader.stats() for uploader in list(uploaders)]
+        for key, documentation in (("sent_samples", "Samples accepted by the Web Server"),
+                                   ("failed_requests", "Upload requests that failed and will be retried"),
+                                   ("rejected_samples", "Samples refused by the Web Server"),
+                                   ("dropped_samples", "Samples dropped by a full upload queue"),
+                                   ("spooled_samples", "Samples written to the spool")):
+            yield CounterMetricFamily(f"boiler_upload_{key}", documentation, value=sum(stats[key] for stats in uploader_stats))
+        yield GaugeMetricFamily("boiler_upload_consecutive_errors", "Consecutive failed upload requests",
+                                value=max((stats["consecutive_errors"] for stats in uploader_stats), default=0))
+        yield GaugeMetricFamily("boiler_upload_queue_depth", "Samples waiting to be uploaded",
+                                value=sum(stats["queue_depth"] for stats in uploader_stats))
+
+
+def start_metrics_server(port: int, address: str = "0.0.0.0"):
+    """Serves the metrics on http://address:port/metrics from a background thread and enables their collection."""
+    # prometheus_client is only imported when metrics are served, headless runs do without it
+    from prometheus_client import REGISTRY, start_http_server
+
+    global enabled
+    REGISTRY.register(SimulatorCollector())
+    start_http_server(port, address)
+    enabled = True
@@ -0,0 +1,111 @@
+import asyncio
+import time
+from . import metrics
+
+# --- OVERRUN POLICIES ----
+CATCH_UP = "catch_up"  # run the missed ticks back to back until the schedule is met again
+SKIP = "skip"          # drop the missed ticks and cover their time in the next, longer step
+OVERRUN_POLICIES = (CATCH_UP, SKIP)
+
+
+def _resolve(future, result):
+    if not future.done():
+        future.set_result(result)
+
+
+class TickScheduler:
+    """
+    Deadline-based tick clock on time.monotonic().
+    Deadlines sit on a fixed grid (start + n * period), so handler time and event-loop
+    contention do not accumulate into drift as a sleep after the work would.
+    """
+
+    def __init__(self, period: float = 1.0, overrun_policy: str = CATCH_UP, max_backlog: int = 10):
+        if period <= 0:
+            raise ValueError(f"Tick period must be positive, got {period}")
+        if overrun_policy not in OVERRUN_POLICIES:
+            raise ValueError(f"Unknown overrun policy {overrun_policy!r}, expected one of {OVERRUN_POLICIES}")
+        self.period = period
+        self.overrun_policy = overrun_policy
+        self.max_backlog = max_backlog  # beyond this many missed ticks catch_up falls back to skipping
+        self._deadline = None
+        self._sleep = None  # future the wait for the next deadline is on, resolved early by wake()
+
+        # --- Lag metrics ---
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped_ticks = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        metrics.schedulers.add(self)
+
+    def start(self):
+        self._deadline = time.monotonic()
+
+    def wake(self):
+        """Ends the wait for the next deadline now, see next_tick. Does nothing when no tick is awaited."""
+        if self._sleep is not None and not self._sleep.done():
+            self._sleep.set_result(True)
+
+    async def _sleep_until_deadline(self, delay: float) -> bool:
+        """Sleeps like asyncio.sleep, True when wake() cut the sleep short."""
+        loop = asyncio.get_running_loop()
+        self._sleep = loop.create_future()
+        timer = loop.call_later(delay, _resolve, self._sleep, False)
+        try:
+            return await self._sleep
+        finally:
+            timer.cancel()
+            self._sleep = None
+
+    async def next_tick(self) -> int:
+        """
+        Waits for the next deadline and returns how many periods the coming tick must cover:
+        1 on schedule, more when missed ticks were skipped, 0 when wake() was called before the
+        deadline. The deadline stays where it was, so a woken tick does not shift the grid.
+        """
+        if self._deadline is None:
+            self.start()
+
+        now = time.monotonic()
+        if self._deadline > now:
+            if await self._sleep_until_deadline(self._deadline - now):
+                return 0
+            now = time.monotonic()
+        else:
+            # Late: still let the other tasks on the loop run
+            await asyncio.sleep(0)
+
+        lag = max(now - self._deadline, 0.0)
+        self.ticks += 1
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        self.total_lag += lag
+        if metrics.enabled:
+            metrics.tick_lag_seconds.observe(lag)
+
+        periods = 1
+        if lag >= self.period:
+            self.overruns += 1
+            missed = int(lag // self.period)
+            if self.overrun_policy == SKIP or missed > self.max_backlog:
+                self.skipped_ticks += missed
+                self._deadline += missed * self.period
+                periods += missed
+        self._deadline += self.period
+        return periods
+
+    @property
+    def mean_lag(self) -> float:
+        return self.total_lag / self.ticks if self.ticks else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "skipped_ticks": self.skipped_ticks,
+            "last_lag": self.last_lag,
+            "mean_lag": self.mean_lag,
+            "max_lag": self.max_lag,
+        }
@@ -1,60 +1,270 @@
 import datetime
+import math
+import time
 import aiohttp
 import asyncio
-from datetime import datetime
-from .states import State
-from ..device.boiler import BoilerBacnetDevice
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from . import events, metrics
+from .deadband import DeadbandPolicy, DeltaEncoder
+from .scheduler import TickScheduler, CATCH_UP
+from .states import EPSILON, INITIALIZE_STATE, OFF_STATE, OffState, State
+from .uploader import TelemetryUploader, WEB_SERVER_FRAMES_URL
+from ..device.base import BoilerDevice
 
-WEB_SERVER_URL = "http://localhost:8099/device/upload"
-EXAMPLE_API_KEY = "EXAMPLE_API_KEY"
+# Events handled in a row without simulated time passing before the rest of a tick is integrated at once,
+# a guard against a state whose threshold stays due
+MAX_INSTANT_EVENTS = 32
+
+
+# --- PROFILES ----
+@dataclass(frozen=True, slots=True)
+class BoilerProfile:
+    """Physical parameters of a boiler model, shared by every device of that model."""
+    capacity: float = 300               # litres
+    potenza: float = 210                # kW
+    ambient_temperature: float = 25
+    interval_send_data: float = 10      # simulated seconds between samples
+
+
+_PROFILES = {}
+
+
+def shared_profile(**parameters) -> BoilerProfile:
+    """One BoilerProfile per distinct set of parameters, however many devices use it."""
+    profile = BoilerProfile(**parameters)
+    return _PROFILES.setdefault(profile, profile)
+
+
+DEFAULT_PROFILE = shared_profile()
 
 
 # --- SIMULATION ----
 class SimulationContext:
-    def __init__(self, device: BoilerBacnetDevice, initial_state: State, simulation_mode: int = 0, initial_setpoint: float = 25):
+    """
+    Per-device simulation data. Fleets hold thousands of these, so the class uses __slots__, the
+    boiler parameters come from a shared BoilerProfile and the states are flyweights whose timers
+    are kept here.
+    """
+    __slots__ = ("state", "device", "simulation_mode", "profile", "setpoint", "state_timer", "purge_end", "end_heating",
+                 "command_pending", "timer", "scheduler", "uploader", "delta_encoder", "trace")
+
+    def __init__(self, device: BoilerDevice, initial_state: State, simulation_mode: int = 0, initial_setpoint: float = 25,
+                 profile: BoilerProfile = DEFAULT_PROFILE):
         self.state = initial_state
         self.device = device
         self.simulation_mode = simulation_mode
-
-        self.capacity = 300
-        self.potenza = 210
-        self.ambient_temperature = 25
+        self.profile = profile
         self.setpoint = initial_setpoint
 
-        self.interval_send_data = 10
+        # Timers of the current state, reset on every transition
+        self.state_timer = 0
+        self.purge_end = False
+        self.end_heating = False
+
+        # BMS writes are applied by the next tick, the first one applies the commands the device starts with
+        self.command_pending = True
+        device.set_command_listener(self)
+
         self.timer = 0
+        self.scheduler = None
+        self.uploader = None
+        self.delta_encoder = None  # set for report by exception, see deadband.py
+        # Decided once: start_event_log must be called before the contexts are created
+        self.trace = events.trace_enabled(device.get_device_id())
+
+    @property
+    def capacity(self) -> float:
+        return self.profile.capacity
+
+    @property
+    def potenza(self) -> float:
+        return self.profile.potenza
 
-        # --- NEW ATTRIBUTES TO HANDLE ERRORS ---
-        self.consecutive_errors = 0
-        self.max_errors = 5  # stop sending API requests after 5 consecutive errors
-        self.api_task = None
+    @property
+    def ambient_temperature(self) -> float:
+        return self.profile.ambient_temperature
 
-    async def run_simulation(self, simulation_speed: int):
-        async with aiohttp.ClientSession() as session:
-            while True:
-                self.state.handle(self, simulation_speed)
+    @property
+    def interval_send_data(self) -> float:
+        return self.profile.interval_send_data
 
+    async def run_simulation(self, simulation_speed: float, uploader: TelemetryUploader | None = None,
+                             tick_period: float = 1.0, overrun_policy: str = CATCH_UP, spool_path: str | None = None,
+                             wire_format: str = "auto", deadband: DeadbandPolicy | None = None):
+        self.scheduler = TickScheduler(tick_period, overrun_policy)
+        # A fleet shares one uploader between all its devices and sets the encoders itself, a single device runs its own
+        if uploader is None:
+            if deadband is not None:
+                self.delta_encoder = DeltaEncoder(deadband)
+            async with aiohttp.ClientSession() as session:
+                if deadband is not None:
+                    # Frames are JSON only
+                    uploader = TelemetryUploader(session, url=WEB_SERVER_FRAMES_URL, spool_path=spool_path, wire_format="json")
+                else:
+                    uploader = TelemetryUploader(session, spool_path=spool_path, wire_format=wire_format)
+                self.uploader = uploader
+                upload_task = asyncio.create_task(uploader.run())
+                try:
+                    await self._simulation_loop(simulation_speed, uploader)
+                finally:
+                    upload_task.cancel()
+                    # Waited for, so a batch it was sending is back in the queue before close() drains it
+                    await asyncio.gather(upload_task, return_exceptions=True)
+                    await uploader.close()
+        else:
+            self.uploader = uploader
+            await self._simulation_loop(simulation_speed, uploader)
+
+    async def _simulation_loop(self, simulation_speed: float, uploader: TelemetryUploader):
+        self.scheduler.start()
+        while True:
+            periods = await self.scheduler.next_tick()
+            # Simulated seconds covered by this tick, none when a command woke the scheduler early
+            step = simulation_speed * self.scheduler.period * periods
+            self.tick(step)
+            self.schedule_upload(step, uploader)
+
+    def tick(self, simulation_speed: float):
+        """
+        Advances the simulation by simulation_speed seconds. The tick is split at every state threshold,
+        so each state is integrated exactly and transitions happen where the threshold is crossed:
+        the trajectory does not depend on the tick length.
+        """
+        if self.command_pending:
+            self._apply_commands()
+
+        remaining = simulation_speed
+        instant_events = 0
+        while True:
+            state = self.state
+            step = state.time_to_next_event(self)
+            if step >= remaining - EPSILON:
+                # An event at the very end of the tick is left to the next one, whatever the tick length
+                step = remaining
+            elif step <= 0:
+                instant_events += 1
+                if instant_events > MAX_INSTANT_EVENTS:
+                    step = remaining
+            else:
+                instant_events = 0
+
+            if metrics.enabled:
+                start = time.perf_counter()
+                state.handle(self, step)
+                metrics.observe_handle(type(state).__name__, time.perf_counter() - start)
+            else:
+                state.handle(self, step)
+            if self.state is not state:
+                self._entered(state)
+
+            if step > 0:
                 if self.device.get_device_operating_status() != 10:
-                    self.device.increase_power_seconds()
+                    self.device.increase_power_seconds(step)
 
                 if self.device.get_burner_status():
-                    self.device.increase_burner_seconds()
+                    self.device.increase_burner_seconds(step)
+
+            remaining -= step
+            if remaining <= 0:
+                break
+
+        if metrics.enabled:
+            start = time.perf_counter()
+            self.device.commit()
+            metrics.commit_seconds.observe(time.perf_counter() - start)
+        else:
+            self.device.commit()
 
-                # --- SEND DATA ONLY IF WE HAVE NOT EXCEEDED ERROR LIMIT ---
-                if self.timer >= self.interval_send_data and self.consecutive_errors < self.max_errors:
-                    if self.api_task is None or self.api_task.done():
-                        self.api_task = asyncio.create_task(self.send_data_to_api(session))
-                    self.timer = 0
+        if self.trace:
+            self._trace_tick(simulation_speed)
 
-                self.timer += simulation_speed
-                await asyncio.sleep(1)
+    def _entered(self, previous: State):
+        """Bookkeeping of a transition from previous to the current state: fresh timers, event log and metrics."""
+        self.state_timer = 0
+        self.purge_end = False
+        self.end_heating = False
+        events.transition(self.device.get_device_id(), type(previous).__name__, type(self.state).__name__)
+        if metrics.enabled:
+            metrics.count_transition(type(previous).__name__, type(self.state).__name__)
 
-    async def send_data_to_api(self, session: aiohttp.ClientSession):
-        print("Sending data to API")
+    def on_command(self, name: str):
+        """Command listener of the device: a BMS wrote Boiler Enable or Supply Setpoint."""
+        self.command_pending = True
+        if self.scheduler is not None:
+            self.scheduler.wake()
 
-        data = {
+    def _apply_commands(self):
+        """
+        Disabling the boiler switches any state to OffState, enabling it starts an OffState boiler.
+        A new setpoint needs no transition: the states read it from the device and their thresholds follow.
+        """
+        self.command_pending = False
+        previous = self.state
+        enabled = self.device.get_boiler_command()
+        if not enabled and not isinstance(previous, OffState):
+            self.state = OFF_STATE
+        elif enabled and isinstance(previous, OffState):
+            self.state = INITIALIZE_STATE
+        else:
+            return
+        self._entered(previous)
+
+    def _trace_tick(self, step: float):
+        fields = self.collect_sample()
+        del fields["device_id"], fields["timestamp"]
+        fields.update(
+            state=type(self.state).__name__,
+            step=step,
+            supply_setpoint=self.device.get_supply_setpoint(),
+            stack_temp=self.device.get_stack_temperature(),
+            fan_speed=self.device.get_fan_speed(),
+            burner=self.device.get_burner_status(),
+        )
+        events.trace(self.device.get_device_id(), "tick", **fields)
+
+    def run_headless(self, duration: float, simulation_speed: float | None = None, on_sample=None,
+                     start_time: datetime | None = None):
+        """
+        Runs the state machine without sleeping and without uploads, as fast as the CPU allows.
+        Every interval_send_data simulated seconds on_sample receives the sample that would be uploaded,
+        stamped with the simulated time. Ticks last at most simulation_speed seconds when given, otherwise
+        each tick jumps straight to the next sample, or to the end of the run without on_sample.
+        Returns the number of ticks executed.
+        """
+        start_time = start_time or datetime.now()
+        elapsed = 0
+        next_sample = self.interval_send_data if on_sample is not None else math.inf
+        ticks = 0
+        while elapsed < duration:
+            target = min(duration, next_sample)
+            if simulation_speed:
+                target = min(target, elapsed + simulation_speed)
+            self.tick(target - elapsed)
+            ticks += 1
+            elapsed = target
+            if elapsed >= next_sample:
+                on_sample(self.collect_sample(start_time + timedelta(seconds=elapsed)))
+                next_sample += self.interval_send_data
+        return ticks
+
+    def schedule_upload(self, simulation_speed: float, uploader: TelemetryUploader):
+        # Queued, never blocks the tick: the uploader batches and retries in the background
+        if self.timer >= self.interval_send_data:
+            sample = self.collect_sample()
+            if self.delta_encoder is not None:
+                # Full frames while uploads fail, a frame lost with them would leave the server state behind
+                sample = self.delta_encoder.frame(sample, self.timer, force_full=uploader.consecutive_errors > 0)
+            if sample is not None:
+                uploader.submit(sample)
+            self.timer = 0
+
+        self.timer += simulation_speed
+
+    def collect_sample(self, timestamp: datetime | None = None) -> dict:
+        return {
             "device_id": self.device.get_device_id(),
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": (timestamp or datetime.now()).isoformat(),
             "operation_mode": self.device.get_device_operating_status(),
             "supply_temp": self.device.get_supply_temperature(),
             "return_temp": self.device.get_return_temperature(),
@@ -64,24 +274,3 @@ class SimulationContext:
             "pump_status": self.device.get_pump_status(),
             "error_message": self.device.get_error_message()
         }
-
-        try:
-            # 4-second timeout for API request
-            async with asyncio.timeout(4):
-                async with session.post(WEB_SERVER_URL, json=data, headers={"Authorization": f"{EXAMPLE_API_KEY}"}) as response:
-                    if response.status == 204:
-                        print("Data sent successfully")
-                        self.consecutive_errors = 0  # reset error counter
-                    else:
-                        print(f"Error sending data: {response.status}")
-                        self.consecutive_errors += 1
-
-        except asyncio.TimeoutError:
-            print("Timeout: API too slow")
-            self.consecutive_errors += 1
-        except Exception as e:
-            print(f"Error while sending data: {e}")
-            self.consecutive_errors += 1
-
-        if self.consecutive_errors >= self.max_errors:
-            print(f"Exceeded error limit ({self.max_errors}). Stopping API calls.")
@@ -1,25 +1,85 @@
 import math
 from abc import ABC, abstractmethod
+from . import events
+
+# --- RATES ----
+# Per simulated second: every state integrates them exactly over the step it is given
+COOLING_RATE = 0.000625          # 1/s, water cooling towards the air temperature
+STANDBY_STACK_COOLING = 2        # degrees per second
+PURGING_STACK_COOLING = 5        # degrees per second
+FAN_RAMP = 1000                  # rpm per second
+EPSILON = 1e-9                   # seconds: a threshold closer than this has been reached
 
 # --- HELP FUNCTIONS ----
 def instantaneous_pressure_variation(delta_temp) -> float:
     return delta_temp*0.011
 
-def instantaneous_temperature_decrement(current_temperature, ambient_temperature) -> float:
-    return (current_temperature - ambient_temperature) * (math.exp(-0.000625) - 1)
+def cooled_temperature(current_temperature, ambient_temperature, step) -> float:
+    """Exponential cooling towards the ambient temperature, exact over `step` seconds."""
+    return ambient_temperature + (current_temperature - ambient_temperature) * math.exp(-COOLING_RATE * step)
+
+def cooling_time(current_temperature, threshold, ambient_temperature) -> float:
+    """Seconds until a cooling temperature drops to threshold, inf if it never does."""
+    if current_temperature <= threshold:
+        return 0.0
+    if threshold <= ambient_temperature:
+        return math.inf
+    return math.log((current_temperature - ambient_temperature) / (threshold - ambient_temperature)) / COOLING_RATE
 
-def instantaneous_temperature_increment(setpoint, current_temperature, ambient_temperature, context) -> float:
+def heating_rate(setpoint, ambient_temperature, context) -> float:
+    """Rate (1/s) at which the burner drives the supply temperature towards 120% of the setpoint."""
     diff_temp = setpoint - ambient_temperature
-    k_cont = (context.potenza * 1000) / (context.capacity * 4186 * diff_temp)
-    return ((setpoint * 1.20) - current_temperature) * (1 - math.exp(-k_cont))
+    return (context.potenza * 1000) / (context.capacity * 4186 * diff_temp)
+
+def heated_temperature(setpoint, current_temperature, rate, step) -> float:
+    """Exponential heating towards 120% of the setpoint, exact over `step` seconds."""
+    target = setpoint * 1.20
+    return target - (target - current_temperature) * math.exp(-rate * step)
+
+def heating_time(setpoint, current_temperature, threshold, rate) -> float:
+    """Seconds until a heating temperature rises to threshold, inf if it never does."""
+    target = setpoint * 1.20
+    if current_temperature >= threshold:
+        return 0.0
+    if rate <= 0 or threshold >= target:
+        return math.inf
+    return math.log((target - current_temperature) / (target - threshold)) / rate
+
+def reached(seconds_left) -> bool:
+    return seconds_left <= EPSILON
 
 # --- STATE CLASSES ----
 class State(ABC):
+    """
+    Behaviour of one operating state. States are flyweights: they hold no per-device data, so one
+    instance per class serves every device (see the *_STATE constants at the bottom). Timers live in
+    the SimulationContext, which resets them whenever its state changes.
+    """
+    __slots__ = ()
+    operating_status = None  # set by the state when it is entered
+
     @abstractmethod
     def handle(self, context, step):
         pass
 
+    def time_to_next_event(self, context) -> float:
+        """
+        Simulated seconds the state can be integrated over before one of its thresholds is reached.
+        0 when an event is due now: the state was just entered or a threshold was reached. Enable commands
+        are not polled here, SimulationContext applies them as soon as a BMS writes them.
+        """
+        if context.device.get_device_operating_status() != self.operating_status:
+            return 0.0
+        seconds = self._next_threshold(context)
+        return seconds if seconds > EPSILON else 0.0
+
+    def _next_threshold(self, context) -> float:
+        return math.inf
+
 class OffState(State):
+    __slots__ = ()
+    operating_status = 8
+
     def handle(self, context, step):
         device = context.device
         device.set_fan_speed(0)
@@ -28,53 +88,35 @@ class OffState(State):
         device.set_instant_power(0)
         device.set_device_operating_status(8)
 
-        print(f"Device OFF state:")
-
-        command = device.get_boiler_command()
-        if command == True:
-            context.state = InitializeState()
-
 class InitializeState(State):
-    def __init__(self):
-        self._timer = 0
+    __slots__ = ()
+    operating_status = 7
+    boot_time = 4
 
     def handle(self, context, step):
         device = context.device
-        command = device.get_boiler_command()
 
         # Simulating Error
-        print(f"Device INITIAL state: {context.simulation_mode}")
         if context.simulation_mode == 1:
             device.set_inlet_pressure(1.3)
             device.set_outlet_pressure(1.1)
 
-        if command == False:
-            context.state = OffState()
-
         current_status = device.get_device_operating_status()
         inlet_pressure = device.get_inlet_pressure()
         outlet_pressure = device.get_outlet_pressure()
 
         if current_status != 7:
-            print("Starting Boiler...")
             device.set_device_operating_status(7)
             device.set_service_mode(3)
             device.set_instant_power(0.05)
             device.set_supply_temperature(20)
             device.set_return_temperature(20)
 
-        print(f"Device on InitializeState: Timer: {self._timer}")
-
-
-        print("inlet pressure:", inlet_pressure)
-        print("outlet pressure:", outlet_pressure)
-        print("device required pressure", device.get_required_pressure())
-        print((inlet_pressure or outlet_pressure) < device.get_required_pressure())
         if inlet_pressure < device.get_required_pressure() or outlet_pressure < device.get_required_pressure():
-            context.state = ErrorState()
+            context.state = ERROR_STATE
 
         # TURN ON BOILER
-        if self._timer >= 4:
+        if reached(self.boot_time - context.state_timer):
             device.set_device_operating_status(6)
             device.set_air_temperature(context.ambient_temperature)
             device.set_supply_setpoint(context.setpoint)
@@ -82,28 +124,30 @@ class InitializeState(State):
             device.set_inlet_pressure(2.3)
             device.set_outlet_pressure(2.1)
             device.set_pump_status(True)
-            context.state = StandbyState()
+            context.state = STANDBY_STATE
         else:
-            self._timer += step
+            context.state_timer += step
+
+    def _next_threshold(self, context):
+        device = context.device
+        required_pressure = device.get_required_pressure()
+        if device.get_inlet_pressure() < required_pressure or device.get_outlet_pressure() < required_pressure:
+            return 0.0
+        return self.boot_time - context.state_timer
 
 
 class StandbyState(State):
-    def __init__(self):
-        self._timer = 0
+    __slots__ = ()
+    operating_status = 1
 
     def handle(self, context, speed_factor):
         device = context.device
-        command = device.get_boiler_command()
-        if command == False:
-            context.state = OffState()
-
         current_status = device.get_device_operating_status()
 
         if current_status != 1:
             device.set_device_operating_status(1)
             device.set_service_mode(2)
             device.set_burner_status(False)
-            print("Boiler Ready")
 
         supply_setpoint = device.get_supply_setpoint()
         supply_temperature = device.get_supply_temperature()
@@ -113,127 +157,116 @@ class StandbyState(State):
         current_inlet_pressure = device.get_inlet_pressure()
         current_outlet_pressure = device.get_outlet_pressure()
 
-        print(f"Device on StandbyState: Supply setpoint: {supply_setpoint} Supply temperature: {supply_temperature} Return temperature: {return_temperature}")
-
-        if (supply_setpoint*0.90) > supply_temperature:
-            context.state = PurgingState()
-
-        decrement_supply_temp = instantaneous_temperature_decrement(supply_temperature, air_temperature)
-        decrement_return_temp = instantaneous_temperature_decrement(return_temperature, air_temperature)
+        if reached(cooling_time(supply_temperature, supply_setpoint*0.90, air_temperature)):
+            context.state = PURGING_STATE
 
-        decrement_supply_temp *= speed_factor
-        decrement_return_temp *= speed_factor
+        new_supply_temp = cooled_temperature(supply_temperature, air_temperature, speed_factor)
+        new_return_temp = cooled_temperature(return_temperature, air_temperature, speed_factor)
 
-        device.set_supply_temperature(supply_temperature + decrement_supply_temp)
-        device.set_return_temperature(return_temperature + decrement_return_temp)
+        device.set_supply_temperature(new_supply_temp)
+        device.set_return_temperature(new_return_temp)
 
-        pressure_variation = instantaneous_pressure_variation(decrement_supply_temp)
+        pressure_variation = instantaneous_pressure_variation(new_supply_temp - supply_temperature)
         device.set_outlet_pressure(current_outlet_pressure + pressure_variation)
         device.set_inlet_pressure(current_inlet_pressure + pressure_variation)
 
-
         if stack_temperature > air_temperature:
-            device.set_stack_temperature(stack_temperature - 2*speed_factor)
+            device.set_stack_temperature(max(stack_temperature - STANDBY_STACK_COOLING*speed_factor, air_temperature))
 
-        self._timer += speed_factor
+        context.state_timer += speed_factor
+
+    def _next_threshold(self, context):
+        # Burner restart when the supply temperature cools below 90% of the setpoint
+        device = context.device
+        return cooling_time(device.get_supply_temperature(), device.get_supply_setpoint()*0.90, device.get_air_temperature())
 
 class PurgingState(State):
-    def __init__(self):
-        self._timer = 0 # Timer elapsed time
-        self._purge_end = False
-        self._purge_time = 10 # 10 Seconds durating of the purging process
+    __slots__ = ()
+    operating_status = 2
+    purge_time = 10 # 10 Seconds durating of the purging process
 
     def handle(self, context, speed_factor):
         device = context.device
-
-        command = device.get_boiler_command()
-        if command == False:
-            context.state = OffState()
-
         status = device.get_device_operating_status()
         fan_speed = device.get_fan_speed()
 
         stack_temperature = device.get_stack_temperature()
         air_temperature = device.get_air_temperature()
         if stack_temperature > air_temperature:
-            device.set_stack_temperature(stack_temperature - 5)
+            device.set_stack_temperature(max(stack_temperature - PURGING_STACK_COOLING*speed_factor, air_temperature))
 
         # --- Ensure correct operating mode ---
         if status != 2:
-            print("Starting Purging...")
             device.set_device_operating_status(2)
             device.set_service_mode(1)
 
-        print(f"Device on PurgingState: fan speed: {fan_speed}")
-
         # --- Handle fan speed logic ---
-        target_speed = 3000 if not self._purge_end else 1000
-        speed_step = 1000 * speed_factor
+        target_speed = 3000 if not context.purge_end else 1000
+        speed_step = FAN_RAMP * speed_factor
 
         # Smoothly adjust fan speed toward target
-        if (fan_speed < target_speed) and not self._purge_end:
+        if (fan_speed < target_speed) and not context.purge_end:
             device.set_fan_speed(min(fan_speed + speed_step, target_speed))
-        elif fan_speed > target_speed and self._purge_end:
+        elif fan_speed > target_speed and context.purge_end:
             device.set_fan_speed(max(fan_speed - speed_step, target_speed))
 
         # --- Handle purging state transitions ---
-        if not self._purge_end and self._timer >= self._purge_time:
-            self._purge_end = True
-        elif self._purge_end and fan_speed <= 1000:
-            print("Purging Finished")
-            context.state = BurnerState()
+        if not context.purge_end and reached(self.purge_time - context.state_timer):
+            context.purge_end = True
+        elif context.purge_end and reached((fan_speed - 1000) / FAN_RAMP):
+            context.state = BURNER_STATE
             return
 
-        self._timer += speed_factor
+        context.state_timer += speed_factor
+
+    def _next_threshold(self, context):
+        if not context.purge_end:
+            return self.purge_time - context.state_timer
+        # Fan slowing down to the ignition speed
+        return (context.device.get_fan_speed() - 1000) / FAN_RAMP
 
 
 class BurnerState(State):
-    def __init__(self):
-        self._timer = 0
-        self._burner_start_time = 2
-        self._max_stack_temperature = 120
+    __slots__ = ()
+    operating_status = 3
+    burner_start_time = 2
+    max_stack_temperature = 120
 
     def handle(self, context, step):
         device = context.device
-        command = device.get_boiler_command()
         status = device.get_device_operating_status()
-        if command == False:
-            context.state = OffState()
 
         if status != 3:
-            print("Starting Burning...")
             device.set_device_operating_status(3)
 
+        # The stack reaches its maximum temperature within the burner start time
         current_stack_temperature = device.get_stack_temperature()
-        if current_stack_temperature <= self._max_stack_temperature:
-            device.set_stack_temperature(current_stack_temperature + (self._max_stack_temperature/min(self._burner_start_time, self._burner_start_time)))
+        if current_stack_temperature < self.max_stack_temperature:
+            heating_speed = self.max_stack_temperature / self.burner_start_time
+            device.set_stack_temperature(min(current_stack_temperature + heating_speed*step, self.max_stack_temperature))
 
-        print(f"Device on BurnerState")
-        if self._timer > self._burner_start_time:
-            print(f"Burning Finished")
+        if reached(self.burner_start_time - context.state_timer):
             device.set_burner_status(True)
             device.increase_ignition_starts()
-            context.state = HeatingState()
+            context.state = HEATING_STATE
 
         else:
-            self._timer += step
+            context.state_timer += step
+
+    def _next_threshold(self, context):
+        return self.burner_start_time - context.state_timer
 
 class HeatingState(State):
-    def __init__(self):
-        self._timer = 0
-        self._off_set = 20
-        self._end_heating = False
+    __slots__ = ()
+    operating_status = 4
+    off_set = 20
+    return_delay = 8
 
     def handle(self, context, speed_factor):
         device = context.device
-        command = device.get_boiler_command()
-        if command == False:
-            context.state = OffState()
-            return
 
         # --- Ensure heating mode ---
         if device.get_device_operating_status() != 4:
-            print("Starting Heating...")
             device.set_device_operating_status(4)
             device.set_instant_power(210)
 
@@ -245,80 +278,101 @@ class HeatingState(State):
         current_inlet_pressure = device.get_inlet_pressure()
         current_outlet_pressure = device.get_outlet_pressure()
 
-        print(f"Device on HeatingState: Current setpoint: {current_setpoint}, "
-              f"Supply temp: {current_supply_temperature}, Return temp: {current_return_temperature}")
-
-        # --- Compute increment ---
-        temp_increment = instantaneous_temperature_increment(current_setpoint, current_supply_temperature, air_temperature, context)
-        temp_increment *= speed_factor
+        rate = heating_rate(current_setpoint, air_temperature, context)
 
         # --- Update supply temperature ---
-        if current_supply_temperature < current_setpoint*1.05:
-            device.set_supply_temperature(current_supply_temperature + temp_increment)
-        elif not self._end_heating:
-            self._end_heating = True
-            self._timer = 0
+        if not reached(heating_time(current_setpoint, current_supply_temperature, current_setpoint*1.05, rate)):
+            new_supply_temperature = heated_temperature(current_setpoint, current_supply_temperature, rate, speed_factor)
+            device.set_supply_temperature(new_supply_temperature)
+            temp_increment = new_supply_temperature - current_supply_temperature
+        else:
+            # Supply held at temperature: the heat still goes to the return water
+            new_supply_temperature = current_supply_temperature
+            temp_increment = rate * (current_setpoint*1.20 - current_supply_temperature) * speed_factor
+            if not context.end_heating:
+                context.end_heating = True
+                context.state_timer = 0
 
-        if (self._timer > 8 or self._end_heating) and (current_return_temperature < current_supply_temperature * 0.60):
-            device.set_return_temperature(current_return_temperature + temp_increment)
+        if (reached(self.return_delay - context.state_timer) or context.end_heating) and (current_return_temperature < new_supply_temperature * 0.60):
+            device.set_return_temperature(min(current_return_temperature + temp_increment, new_supply_temperature * 0.60))
 
         #--- Update Pressure ----
-        if not self._end_heating:
+        if not context.end_heating:
             pressure_variation = instantaneous_pressure_variation(temp_increment)
             device.set_outlet_pressure(current_outlet_pressure + pressure_variation)
             device.set_inlet_pressure(current_inlet_pressure + pressure_variation)
 
-
         # --- Check for stopping heating ---
-        if self._end_heating and self._timer >= self._off_set:
+        if context.end_heating and reached(self.off_set - context.state_timer):
             device.set_fan_speed(0)
-            context.state = StandbyState()
+            context.state = STANDBY_STATE
 
-        self._timer += speed_factor
+        context.state_timer += speed_factor
+
+    def _next_threshold(self, context):
+        if context.end_heating:
+            return self.off_set - context.state_timer
+        device = context.device
+        setpoint = device.get_supply_setpoint()
+        rate = heating_rate(setpoint, device.get_air_temperature(), context)
+        seconds = heating_time(setpoint, device.get_supply_temperature(), setpoint*1.05, rate)
+        if not reached(self.return_delay - context.state_timer):
+            seconds = min(seconds, self.return_delay - context.state_timer)
+        return seconds
 
 
 class ErrorState(State):
-    def __init__(self):
-        self._valve_opened = False
-        self._pressure_increment = 0.0025  # pressure increase per second
+    __slots__ = ()
+    operating_status = 5
+    pressure_increment = 0.0025  # pressure increase per second
 
     def handle(self, context, speed_factor):
         device = context.device
         target_pressure = device.get_inlet_pressure()
 
-        command = device.get_boiler_command()
-        if command == False:
-            context.state = OffState()
-
         # Set error state on first call
         if device.get_device_operating_status() != 5:
-            print("Simulating Error due to Low Pressure!..")
+            events.error(device.get_device_id(), "Low pressure", inlet_pressure=device.get_inlet_pressure(),
+                         outlet_pressure=device.get_outlet_pressure(), required_pressure=device.get_required_pressure())
             device.set_device_operating_status(5)
             device.set_burner_status(False)
             device.set_pump_status(False)
             device.set_instant_power(0.05)
             device.set_error_message(2)
 
-        if not self._valve_opened:
-            print("Simulating valve opening and system pressurization...")
-            self._valve_opened = True
-
         # Gradually increase pressure until target is reached
         current_inlet_pressure = device.get_inlet_pressure()
         current_outlet_pressure = device.get_outlet_pressure()
 
         if current_inlet_pressure < target_pressure:
-            new_inlet_pressure = current_inlet_pressure + self._pressure_increment * speed_factor
+            new_inlet_pressure = min(current_inlet_pressure + self.pressure_increment * speed_factor, target_pressure)
             device.set_inlet_pressure(new_inlet_pressure)
 
         if current_outlet_pressure < target_pressure:
-            new_outlet_pressure = current_outlet_pressure + self._pressure_increment * speed_factor
+            new_outlet_pressure = min(current_outlet_pressure + self.pressure_increment * speed_factor, target_pressure)
             device.set_outlet_pressure(new_outlet_pressure)
 
-        print(f"Inlet Pressure: {device.get_inlet_pressure():.2f} bar, Outlet Pressure: {device.get_outlet_pressure():.2f} bar")
-
         # Once target pressure is reached, go back to StandbyState
-        if device.get_inlet_pressure() >= target_pressure and device.get_outlet_pressure() >= target_pressure:
-            print("Target pressure reached. Returning to StandbyState.")
+        if (reached((target_pressure - device.get_inlet_pressure()) / self.pressure_increment)
+                and reached((target_pressure - device.get_outlet_pressure()) / self.pressure_increment)):
             device.set_error_message(1)
-            context.state = StandbyState()
\ No newline at end of file
+            context.state = STANDBY_STATE
+
+    def _next_threshold(self, context):
+        # The outlet refilled up to the inlet pressure
+        device = context.device
+        return (device.get_inlet_pressure() - device.get_outlet_pressure()) / self.pressure_increment
+
+
+# --- FLYWEIGHTS ----
+OFF_STATE = OffState()
+INITIALIZE_STATE = InitializeState()
+STANDBY_STATE = StandbyState()
+PURGING_STATE = PurgingState()
+BURNER_STATE = BurnerState()
+HEATING_STATE = HeatingState()
+ERROR_STATE = ErrorState()
+
+# State class name -> flyweight, as saved in checkpoints and traces
+STATES = {type(state).__name__: state for state in (
+    OFF_STATE, INITIALIZE_STATE, STANDBY_STATE, PURGING_STATE, BURNER_STATE, HEATING_STATE, ERROR_STATE)}
@@ -0,0 +1,252 @@
+import asyncio
+import dataclasses
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from . import events, metrics
+from .fleet import FleetDeviceConfig, FleetSimulation
+
+STATS_INTERVAL = 5        # seconds between the stats messages of a worker
+RESTART_BACKOFF = 1       # seconds before restarting a crashed worker, doubled for each crash in a row
+MAX_RESTART_BACKOFF = 60
+STALL_TIMEOUT = 60        # seconds without stats after which a running worker is killed and restarted, at least 3 intervals
+STARTUP_TIMEOUT = 300     # seconds a worker gets to start its devices and send its first stats
+STOP_TIMEOUT = 30         # seconds a worker gets to save its checkpoint and stop
+
+
+# --- SHARDING ----
+def shard_devices(devices: list[FleetDeviceConfig], workers: int, first_network: int | None = None) -> list[list[FleetDeviceConfig]]:
+    """
+    Splits the manifest into contiguous shards, so every worker owns one range of device IDs and ports.
+    With first_network, the devices of worker i that have no network number go on virtual network first_network + i.
+    """
+    workers = max(1, min(workers, len(devices)))
+    size, extra = divmod(len(devices), workers)
+    shards = []
+    start = 0
+    for index in range(workers):
+        end = start + size + (1 if index < extra else 0)
+        shard = devices[start:end]
+        if first_network is not None:
+            shard = [device if device.network_number is not None else dataclasses.replace(device, network_number=first_network + index)
+                     for device in shard]
+        shards.append(shard)
+        start = end
+    return shards
+
+
+def worker_path(path: str | None, index: int) -> str | None:
+    """Per-worker variant of a file option: workers never share a spool, a checkpoint or an event log."""
+    return f"{path}.{index}" if path else None
+
+
+# --- WORKER PROCESS ----
+def run_worker(index: int, devices: list[FleetDeviceConfig], options: dict, stats_queue, resume: bool):
+    """Process entry point: runs one shard as a FleetSimulation on its own event loop and reports its stats."""
+    # The supervisor stops its workers with SIGTERM, a Ctrl-C on the terminal is for the supervisor only
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    listener = events.start_event_log(worker_path(options["event_log"], index), options["event_rate"],
+                                      trace_device=options["trace_device"])
+    if options["metrics_port"] is not None:
+        metrics.start_metrics_server(options["metrics_port"] + index)
+    try:
+        asyncio.run(_run_shard(index, devices, options, stats_queue, resume))
+    finally:
+        listener.stop()
+
+
+async def _run_shard(index: int, devices: list[FleetDeviceConfig], options: dict, stats_queue, resume: bool):
+    loop = asyncio.get_running_loop()
+    main_task = asyncio.current_task()
+
+    def request_stop():
+        # Only the first SIGTERM cancels, a second one must not interrupt the final checkpoint
+        loop.remove_signal_handler(signal.SIGTERM)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        main_task.cancel()
+
+    loop.add_signal_handler(signal.SIGTERM, request_stop)
+
+    checkpoint_path = worker_path(options["checkpoint_path"], index)
+    restore_path = options["restore_path"]
+    if resume and checkpoint_path and os.path.exists(checkpoint_path):
+        # Restarted after a crash: resume from the last checkpoint of this worker
+        restore_path = checkpoint_path
+    elif restore_path and os.path.exists(worker_path(restore_path, index)):
+        # Checkpoints saved by a fleet with the same number of workers
+        restore_path = worker_path(restore_path, index)
+
+    fleet = FleetSimulation(devices, report_interval=0, spool_path=worker_path(options["spool_path"], index),
+                            checkpoint_path=checkpoint_path, checkpoint_interval=options["checkpoint_interval"],
+                            restore_path=restore_path, template_path=options["template_path"],
+                            wire_format=options["wire_format"], deadband=options["deadband"])
+    reporter = None
+    try:
+        await fleet.start()
+        reporter = asyncio.create_task(_report_stats(index, fleet, stats_queue, options["stats_interval"]))
+        await fleet.run(options["speed_factor"], options["engine"], options["tick_period"], options["overrun_policy"])
+    except asyncio.CancelledError:
+        pass
+    finally:
+        if reporter is not None:
+            reporter.cancel()
+        await fleet.stop()
+
+
+async def _report_stats(index: int, fleet: FleetSimulation, stats_queue, interval: float):
+    last_cpu = time.process_time()
+    last_wall = time.monotonic()
+    while True:
+        cpu = time.process_time()
+        wall = time.monotonic()
+        stats = fleet.stats()
+        stats.update(worker=index, pid=os.getpid(), cpu_percent=100 * (cpu - last_cpu) / max(wall - last_wall, 1e-9))
+        stats_queue.put(stats)
+        last_cpu, last_wall = cpu, wall
+        await asyncio.sleep(interval)
+
+
+# --- SUPERVISOR ----
+class WorkerHandle:
+    def __init__(self, index: int, devices: list[FleetDeviceConfig]):
+        self.index = index
+        self.devices = devices
+        self.process = None
+        self.started_at = 0.0
+        self.last_seen = None     # monotonic time of the last stats message
+        self.stats = None
+        self.restarts = 0
+        self.crashes_in_a_row = 0
+        self.restart_at = None
+
+
+class FleetSupervisor:
+    """
+    Runs a fleet across worker processes, one event loop and one share of the BACnet devices each,
+    so the simulation scales with the cores. Crashed or stalled workers are restarted with backoff,
+    resuming from their last checkpoint when checkpoints are enabled, and the stats the workers
+    send over a queue are aggregated into periodic summary events.
+    """
+
+    def __init__(self, devices: list[FleetDeviceConfig], workers: int, worker_options: dict, report_interval: float = 30,
+                 first_network: int | None = None, stall_timeout: float = STALL_TIMEOUT,
+                 startup_timeout: float = STARTUP_TIMEOUT):
+        self.worker_options = {"stats_interval": STATS_INTERVAL, **worker_options}
+        self.report_interval = report_interval
+        # A few stats intervals at least, or a long --stats_interval would get healthy workers killed as stalled
+        self.stall_timeout = max(stall_timeout, 3 * self.worker_options["stats_interval"])
+        self.startup_timeout = startup_timeout
+        # spawn: a worker must not inherit the event log thread or the BACnet sockets of another process
+        self._context = multiprocessing.get_context("spawn")
+        self._stats_queue = self._context.Queue()
+        self.workers = [WorkerHandle(index, shard) for index, shard in enumerate(shard_devices(devices, workers, first_network))]
+
+    def run(self):
+        """Starts every worker and supervises them until interrupted, then stops them."""
+        for worker in self.workers:
+            self._start(worker, resume=False)
+        events.summary("Supervisor started", workers=len(self.workers), devices=sum(len(worker.devices) for worker in self.workers))
+        next_report = time.monotonic() + self.report_interval
+        try:
+            while True:
+                self._receive_stats(timeout=1)
+                now = time.monotonic()
+                for worker in self.workers:
+                    self._check(worker, now)
+                if self.report_interval > 0 and now >= next_report:
+                    events.summary("Fleet workers", **self.stats())
+                    next_report = now + self.report_interval
+        finally:
+            self.stop()
+
+    def _start(self, worker: WorkerHandle, resume: bool):
+        worker.process = self._context.Process(
+            target=run_worker, name=f"fleet-worker-{worker.index}",
+            args=(worker.index, worker.devices, self.worker_options, self._stats_queue, resume))
+        worker.process.start()
+        worker.started_at = time.monotonic()
+        worker.last_seen = None
+        worker.stats = None
+        worker.restart_at = None
+
+    def _receive_stats(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                stats = self._stats_queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                return
+            worker = self.workers[stats["worker"]]
+            # Late messages of a process that has been replaced are ignored
+            if worker.process is not None and stats["pid"] == worker.process.pid:
+                worker.stats = stats
+                worker.last_seen = time.monotonic()
+
+    def _check(self, worker: WorkerHandle, now: float):
+        if worker.restart_at is not None:
+            if now >= worker.restart_at:
+                worker.restarts += 1
+                self._start(worker, resume=True)
+            return
+
+        if not worker.process.is_alive():
+            if now - worker.started_at > MAX_RESTART_BACKOFF:
+                worker.crashes_in_a_row = 0
+            backoff = min(RESTART_BACKOFF * 2 ** worker.crashes_in_a_row, MAX_RESTART_BACKOFF)
+            worker.crashes_in_a_row += 1
+            worker.restart_at = now + backoff
+            events.error(None, "Worker exited", worker=worker.index, exitcode=worker.process.exitcode, restart_in=backoff)
+        elif worker.last_seen is not None and now - worker.last_seen > self.stall_timeout:
+            # Reporting stopped while the process is still there: its event loop is stuck
+            events.error(None, "Worker stalled", worker=worker.index, seconds_since_stats=now - worker.last_seen)
+            self._kill(worker)
+        elif worker.last_seen is None and now - worker.started_at > self.startup_timeout:
+            # No stats yet: the worker is stuck in fleet.start(), e.g. on a blocking BACnet connect
+            events.error(None, "Worker stalled starting", worker=worker.index, seconds_since_start=now - worker.started_at)
+            self._kill(worker)
+
+    def _kill(self, worker: WorkerHandle):
+        # Waited for, so the next check sees the worker exited and schedules its restart
+        worker.process.kill()
+        worker.process.join()
+
+    def stats(self) -> dict:
+        """Fleet-wide figures from the last stats of every running worker."""
+        reports = [worker.stats for worker in self.workers
+                   if worker.stats is not None and worker.process is not None and worker.process.is_alive()]
+        return {
+            "workers": len(self.workers),
+            "workers_reporting": len(reports),
+            "restarts": sum(worker.restarts for worker in self.workers),
+            "devices": sum(report["devices"] for report in reports),
+            "rss_bytes": sum(report["rss_bytes"] for report in reports),
+            "cpu_percent": sum(report["cpu_percent"] for report in reports),
+            "ticks": sum(report["ticks"] for report in reports),
+            "overruns": sum(report["overruns"] for report in reports),
+            "skipped_ticks": sum(report["skipped_ticks"] for report in reports),
+            "max_lag": max((report["max_lag"] for report in reports), default=0.0),
+            "mean_lag": sum(report["mean_lag"] for report in reports) / len(reports) if reports else 0.0,
+            "upload_sent_samples": sum(report.get("upload_sent_samples", 0) for report in reports),
+            "upload_failed_requests": sum(report.get("upload_failed_requests", 0) for report in reports),
+            "upload_dropped_samples": sum(report.get("upload_dropped_samples", 0) for report in reports),
+            "upload_queue_depth": sum(report.get("upload_queue_depth", 0) for report in reports),
+            "upload_consecutive_errors": max((report.get("upload_consecutive_errors", 0) for report in reports), default=0),
+            "suppressed_samples": sum(report.get("suppressed_samples", 0) for report in reports),
+        }
+
+    def stop(self):
+        """Asks every worker to stop (SIGTERM), so each one saves its checkpoint, and kills the ones that do not exit in time."""
+        for worker in self.workers:
+            if worker.process is not None and worker.process.is_alive():
+                worker.process.terminate()
+        deadline = time.monotonic() + STOP_TIMEOUT
+        for worker in self.workers:
+            if worker.process is None:
+                continue
+            worker.process.join(max(deadline - time.monotonic(), 0))
+            if worker.process.is_alive():
+                events.error(None, "Worker killed on stop", worker=worker.index)
+                worker.process.kill()
+                worker.process.join()
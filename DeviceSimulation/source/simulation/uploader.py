@@ -0,0 +1,274 @@
+import asyncio
+import json
+import os
+import random
+import struct
+import time
+from collections import deque
+import aiohttp
+from . import events, metrics
+from .wire import BINARY_CONTENT_TYPE, encode_batch
+
+WEB_SERVER_BATCH_URL = "http://localhost:8099/device/upload/batch"
+WEB_SERVER_FRAMES_URL = "http://localhost:8099/device/upload/frames"
+EXAMPLE_API_KEY = "EXAMPLE_API_KEY"
+WIRE_FORMATS = ("auto", "json", "binary")
+
+
+class TelemetryUploader:
+    """
+    Background uploader shared by one or many SimulationContext.
+    Samples are queued without blocking the tick, sent in batches as one JSON array per request,
+    retried with exponential backoff and jitter, and spilled to an append-only NDJSON spool
+    while the server is unreachable. The spool is replayed once uploads succeed again, before any newer sample.
+    With wire_format "auto" batches go as JSON until the server lists the binary format
+    in the Accept-Post header of a response, then as binary records (see wire.py).
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, url: str = WEB_SERVER_BATCH_URL, api_key: str = EXAMPLE_API_KEY,
+                 max_queue: int = 10000, max_batch: int = 500, flush_interval: float = 1.0, spool_path: str | None = None,
+                 request_timeout: float = 4, base_backoff: float = 0.5, max_backoff: float = 60, wire_format: str = "auto"):
+        if wire_format not in WIRE_FORMATS:
+            raise ValueError(f"Unknown wire format {wire_format!r}, expected one of {WIRE_FORMATS}")
+        self._session = session
+        self._url = url
+        self._headers = {"Authorization": api_key}
+        self._wire_format = wire_format
+        self._binary = wire_format == "binary"
+        self._queue = deque()
+        self._max_queue = max_queue
+        self._max_batch = max_batch
+        self._flush_interval = flush_interval
+        self._spool_path = spool_path
+        self._spool_offset = 0  # bytes of the spool already replayed
+        self._request_timeout = request_timeout
+        self._base_backoff = base_backoff
+        self._max_backoff = max_backoff
+        self._wakeup = asyncio.Event()
+        self._retry_after = 0.0  # seconds asked by the server before the next attempt
+
+        # --- Stats ---
+        self.consecutive_errors = 0
+        self.sent_samples = 0
+        self.sent_batches = 0
+        self.failed_requests = 0
+        self.rejected_samples = 0
+        self.dropped_samples = 0
+        self.spooled_samples = 0
+        self.replayed_samples = 0
+        self.last_batch_size = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+        metrics.uploaders.add(self)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def submit(self, sample: dict):
+        """Queues a sample. When the queue is full the oldest sample is dropped."""
+        if len(self._queue) >= self._max_queue:
+            self._queue.popleft()
+            self.dropped_samples += 1
+        self._queue.append(sample)
+        if len(self._queue) >= self._max_batch:
+            self._wakeup.set()
+
+    async def run(self):
+        while True:
+            spool_ready = self._spool_path and self.consecutive_errors == 0 and self._spool_pending()
+            if len(self._queue) < self._max_batch and not spool_ready:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self._flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+
+            if self._spool_path and self._spool_pending():
+                # Older samples first: until the spool is replayed, live samples join its end
+                self._spill()
+                if not await self._replay_spool():
+                    await self._backoff()
+                continue
+
+            if self._queue:
+                batch = [self._queue.popleft() for _ in range(min(self._max_batch, len(self._queue)))]
+                try:
+                    sent = await self._upload(batch)
+                except asyncio.CancelledError:
+                    # Stopped mid-request: back to the front of the queue, for close() to send or spool
+                    self._queue.extendleft(reversed(batch))
+                    raise
+                if not sent:
+                    self._keep(batch)
+                    await self._backoff()
+
+    async def close(self):
+        """
+        Last attempt to send what is still queued, anything left goes to the spool.
+        The run() task must have been cancelled and awaited first, or a batch it is sending is missed.
+        """
+        if self._spool_path and self._spool_pending():
+            # Sent after the spool by the next run, so the server still gets the samples in order
+            self._spill()
+        while self._queue:
+            batch = [self._queue.popleft() for _ in range(min(self._max_batch, len(self._queue)))]
+            if not await self._upload(batch):
+                self._keep(batch)
+                break
+
+    async def _upload(self, batch: list) -> bool:
+        """
+        Posts one batch. Returns False when it should be retried later. Samples that cannot be encoded
+        are rejected and removed from batch, so a retry only carries the others.
+        """
+        try:
+            body = self._encode(batch)
+        except (struct.error, TypeError, ValueError) as e:
+            # Sending them again would fail the same way, and would hold back everything queued behind
+            valid = [sample for sample in batch if self._encodable(sample)]
+            events.error(None, "Samples cannot be encoded", rejected=len(batch) - len(valid), reason=str(e))
+            self.rejected_samples += len(batch) - len(valid)
+            batch[:] = valid
+            if not batch:
+                return True
+            body = self._encode(batch)
+
+        start = time.monotonic()
+        try:
+            async with asyncio.timeout(self._request_timeout):
+                async with self._session.post(self._url, data=body, headers=self._headers) as response:
+                    status = response.status
+                    retry_after = response.headers.get("Retry-After")
+                    accepted_formats = response.headers.get("Accept-Post", "")
+        except asyncio.TimeoutError:
+            events.error(None, "Upload timed out", batch_size=len(batch))
+            return self._failed()
+        except Exception as e:
+            events.error(None, "Upload failed", batch_size=len(batch), reason=str(e))
+            return self._failed()
+
+        latency = time.monotonic() - start
+        # 202: queued by the server, 204: stored before the answer
+        if 200 <= status < 300:
+            if self._wire_format == "auto" and not self._binary and BINARY_CONTENT_TYPE in accepted_formats:
+                self._binary = True
+                events.summary("Upload format switched to binary", url=self._url)
+            self.consecutive_errors = 0
+            self.sent_samples += len(batch)
+            self.sent_batches += 1
+            self.last_batch_size = len(batch)
+            self.last_latency = latency
+            self.max_latency = max(self.max_latency, latency)
+            self.total_latency += latency
+            if metrics.enabled:
+                metrics.upload_seconds.observe(latency)
+            return True
+
+        events.error(None, "Upload refused", batch_size=len(batch), status=status, retry_after=retry_after)
+        if status == 415 and self._binary and self._wire_format == "auto":
+            # The server no longer takes binary bodies, the batch is sent again as JSON
+            self._binary = False
+            return self._failed()
+        if retry_after is not None and retry_after.isdigit():
+            # Only the delay in seconds is used, the HTTP-date form falls back to the backoff
+            self._retry_after = float(retry_after)
+        if 400 <= status < 500 and status not in (408, 429):
+            # The server refuses this data, sending it again would fail the same way
+            self.rejected_samples += len(batch)
+            self.consecutive_errors = 0
+            return True
+        return self._failed()
+
+    def _encode(self, batch: list) -> bytes:
+        if self._binary:
+            self._headers["Content-Type"] = BINARY_CONTENT_TYPE
+            return encode_batch(batch)
+        self._headers["Content-Type"] = "application/json"
+        return json.dumps(batch).encode()
+
+    def _encodable(self, sample: dict) -> bool:
+        try:
+            self._encode([sample])
+        except (struct.error, TypeError, ValueError):
+            return False
+        return True
+
+    def _failed(self) -> bool:
+        self.failed_requests += 1
+        self.consecutive_errors += 1
+        return False
+
+    def _keep(self, batch: list):
+        if self._spool_path:
+            with open(self._spool_path, "a") as spool:
+                spool.writelines(json.dumps(sample) + "\n" for sample in batch)
+            self.spooled_samples += len(batch)
+        else:
+            # No spool: back to the front of the queue, the bound still applies
+            for sample in reversed(batch):
+                if len(self._queue) >= self._max_queue:
+                    self.dropped_samples += 1
+                    continue
+                self._queue.appendleft(sample)
+
+    def _spill(self):
+        if self._queue:
+            self._keep(list(self._queue))
+            self._queue.clear()
+
+    async def _backoff(self):
+        delay = min(self._max_backoff, self._base_backoff * 2 ** (self.consecutive_errors - 1))
+        delay *= random.uniform(0.5, 1.0)
+        # A server shedding load says when it expects to have room, jitter only spreads the retries after that
+        if self._retry_after:
+            delay = self._retry_after + delay * random.uniform(0.0, 0.5)
+            self._retry_after = 0.0
+        await asyncio.sleep(delay)
+
+    def _spool_pending(self) -> bool:
+        try:
+            return os.path.getsize(self._spool_path) > self._spool_offset
+        except OSError:
+            return False
+
+    async def _replay_spool(self) -> bool:
+        """Sends the next batch from the spool, deleting the file once it has been replayed entirely."""
+        with open(self._spool_path, "rb") as spool:
+            spool.seek(self._spool_offset)
+            lines = [spool.readline() for _ in range(self._max_batch)]
+        lines = [line for line in lines if line.endswith(b"\n")]
+        if not lines:
+            # Torn line left by a crash while spooling
+            os.truncate(self._spool_path, self._spool_offset)
+        else:
+            if not await self._upload([json.loads(line) for line in lines]):
+                return False
+            self._spool_offset += sum(len(line) for line in lines)
+            self.replayed_samples += len(lines)
+
+        if os.path.getsize(self._spool_path) <= self._spool_offset:
+            os.remove(self._spool_path)
+            self._spool_offset = 0
+            events.summary("Spool replayed", spool_path=self._spool_path, replayed_samples=self.replayed_samples)
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "sent_samples": self.sent_samples,
+            "sent_batches": self.sent_batches,
+            "mean_batch_size": self.sent_samples / self.sent_batches if self.sent_batches else 0.0,
+            "last_batch_size": self.last_batch_size,
+            "failed_requests": self.failed_requests,
+            "consecutive_errors": self.consecutive_errors,
+            "rejected_samples": self.rejected_samples,
+            "dropped_samples": self.dropped_samples,
+            "spooled_samples": self.spooled_samples,
+            "replayed_samples": self.replayed_samples,
+            "last_latency": self.last_latency,
+            "mean_latency": self.total_latency / self.sent_batches if self.sent_batches else 0.0,
+            "max_latency": self.max_latency,
+            "wire_format": "binary" if self._binary else "json",
+        }
@@ -0,0 +1,475 @@
+import time
+import numpy as np
+from . import events, metrics, states
+from .scheduler import TickScheduler
+from .simulation import MAX_INSTANT_EVENTS
+from .states import COOLING_RATE, EPSILON, FAN_RAMP, PURGING_STACK_COOLING, STANDBY_STACK_COOLING
+
+# --- STATE CODES ----
+OFF = 0
+INITIALIZE = 1
+STANDBY = 2
+PURGING = 3
+BURNER = 4
+HEATING = 5
+ERROR = 6
+
+STATE_CODES = {
+    "OffState": OFF,
+    "InitializeState": INITIALIZE,
+    "StandbyState": STANDBY,
+    "PurgingState": PURGING,
+    "BurnerState": BURNER,
+    "HeatingState": HEATING,
+    "ErrorState": ERROR,
+}
+STATE_NAMES = {code: name for name, code in STATE_CODES.items()}
+
+# Operating Status each state sets when it is entered, indexed by state code
+STATE_STATUS = np.array([getattr(states, STATE_NAMES[code]).operating_status for code in range(len(STATE_CODES))], dtype=np.int8)
+
+# BACnet object name -> array attribute of VectorizedBoilerFleet
+POINT_ARRAYS = {
+    "Supply Setpoint": "supply_setpoint",
+    "Supply Temp": "supply_temp",
+    "Return Temp": "return_temp",
+    "Stack Temp": "stack_temp",
+    "Air Temp": "air_temp",
+    "Inlet Pressure": "inlet_pressure",
+    "Outlet Pressure": "outlet_pressure",
+    "Flow Rate": "flow_rate",
+    "Fan Speed": "fan_speed",
+    "Boiler Instant Power": "instant_power",
+    "Required Pressure": "required_pressure",
+    "Power On Seconds": "power_seconds",
+    "Burner On Seconds": "burner_seconds",
+    "Ignition Starts": "ignition_starts",
+    "Pump": "pump",
+    "Burner": "burner",
+    "Boiler Enable": "enable",
+    "Operating Status": "operating_status",
+    "Error Message": "error_message",
+    "Service Mode": "service_mode",
+}
+
+
+def _cooling_time(temperature, threshold, ambient_temperature):
+    """states.cooling_time over arrays."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        seconds = np.log((temperature - ambient_temperature) / (threshold - ambient_temperature)) / COOLING_RATE
+    return np.where(temperature <= threshold, 0.0, np.where(threshold <= ambient_temperature, np.inf, seconds))
+
+
+def _heating_time(setpoint, temperature, threshold, rate):
+    """states.heating_time over arrays."""
+    target = setpoint * 1.20
+    with np.errstate(divide="ignore", invalid="ignore"):
+        seconds = np.log((target - temperature) / (target - threshold)) / rate
+    return np.where(temperature >= threshold, 0.0, np.where((rate <= 0) | (threshold >= target), np.inf, seconds))
+
+
+# --- VECTORIZED ENGINE ----
+class VectorizedBoilerFleet:
+    """
+    Runs the state machine of states.py for N boilers at once.
+    Every BACnet point and every per-state timer is a NumPy array indexed by device,
+    a tick is a few masked sub-steps, split at the state thresholds, and state transitions are applied by mask.
+    """
+
+    def __init__(self, size: int, simulation_mode=0, initial_setpoint=70.0, capacity=300, potenza=210, ambient_temperature=25):
+        self.size = size
+
+        # --- Context parameters ---
+        self.simulation_mode = np.broadcast_to(np.asarray(simulation_mode, dtype=np.int8), size).copy()
+        self.setpoint = np.broadcast_to(np.asarray(initial_setpoint, dtype=np.float64), size).copy()
+        self.capacity = capacity
+        self.potenza = potenza
+        self.ambient_temperature = ambient_temperature
+
+        # --- State machine ---
+        self.state = np.full(size, INITIALIZE, dtype=np.int8)
+        self.timer = np.zeros(size)
+        self.purge_end = np.zeros(size, dtype=bool)
+        self.end_heating = np.zeros(size, dtype=bool)
+        self.transitions = []  # (device indexes, old codes, new codes) of each sub-step of the last step
+
+        # --- BACnet points, same defaults as source/device/types/boiler.json ---
+        self.supply_setpoint = np.full(size, 70.0)
+        self.supply_temp = np.full(size, 20.0)
+        self.return_temp = np.full(size, 20.0)
+        self.stack_temp = np.full(size, 25.0)
+        self.air_temp = np.full(size, 25.0)
+        self.inlet_pressure = np.full(size, 2.0)
+        self.outlet_pressure = np.full(size, 1.5)
+        self.flow_rate = np.zeros(size)
+        self.fan_speed = np.zeros(size)
+        self.instant_power = np.zeros(size)
+        self.required_pressure = np.full(size, 1.2)
+        self.power_seconds = np.zeros(size)
+        self.burner_seconds = np.zeros(size)
+        self.ignition_starts = np.zeros(size)
+        self.pump = np.zeros(size, dtype=bool)
+        self.burner = np.zeros(size, dtype=bool)
+        self.enable = np.ones(size, dtype=bool)
+        self.operating_status = np.full(size, 10, dtype=np.int8)
+        self.error_message = np.ones(size, dtype=np.int8)
+        self.service_mode = np.ones(size, dtype=np.int8)
+
+    # --- STEP ----
+    def step(self, speed_factor):
+        """
+        Advances every boiler by speed_factor seconds, equivalent to one SimulationContext.tick per device:
+        each device's step is split at its own state thresholds, all the devices still inside the step
+        are handled together by one masked sub-step.
+        """
+        remaining = np.full(self.size, float(speed_factor))
+        active = np.ones(self.size, dtype=bool)
+        instant_events = np.zeros(self.size, dtype=np.int16)
+        self.transitions = []
+        while True:
+            dt = self.time_to_next_event()
+            # An event at the very end of the tick is left to the next one, whatever the tick length
+            dt[dt >= remaining - EPSILON] = remaining[dt >= remaining - EPSILON]
+            instant = active & (dt <= 0)
+            instant_events = np.where(instant, instant_events + 1, 0)
+            stuck = instant_events > MAX_INSTANT_EVENTS
+            dt[stuck] = remaining[stuck]
+            dt[~active] = 0
+
+            self._sub_step(active, dt)
+            remaining -= dt
+            active &= remaining > 0
+            if not active.any():
+                break
+
+    def _sub_step(self, active, dt):
+        state = self.state
+        next_state = state.copy()
+
+        self._off(active & (state == OFF), next_state)
+        self._initialize(active & (state == INITIALIZE), next_state, dt)
+        self._standby(active & (state == STANDBY), next_state, dt)
+        self._purging(active & (state == PURGING), next_state, dt)
+        self._burner(active & (state == BURNER), next_state, dt)
+        self._heating(active & (state == HEATING), next_state, dt)
+        self._error(active & (state == ERROR), next_state, dt)
+        # Applied last, over the transitions of the states: like SimulationContext._apply_commands,
+        # disabling a boiler switches any state to OFF
+        next_state[active & ~self.enable] = OFF
+
+        # A transition creates a fresh state object in the scalar engine: reset its timers
+        changed = next_state != state
+        if changed.any():
+            self.timer[changed] = 0
+            self.purge_end[changed] = False
+            self.end_heating[changed] = False
+            self.transitions.append((np.flatnonzero(changed), state[changed], next_state[changed]))
+        self.state = next_state
+
+        # Counters updated by SimulationContext after every handle
+        powered = self.operating_status != 10
+        self.power_seconds[powered] += dt[powered]
+        self.burner_seconds[self.burner] += dt[self.burner]
+
+    def time_to_next_event(self):
+        """Seconds each device can be integrated over before one of its state thresholds, as State.time_to_next_event."""
+        state = self.state
+        seconds = np.full(self.size, np.inf)
+
+        m = state == INITIALIZE
+        low_pressure = (self.inlet_pressure < self.required_pressure) | (self.outlet_pressure < self.required_pressure)
+        seconds[m] = np.where(low_pressure[m], 0.0, 4 - self.timer[m])
+
+        m = state == STANDBY
+        seconds[m] = _cooling_time(self.supply_temp[m], self.supply_setpoint[m] * 0.90, self.air_temp[m])
+
+        m = state == PURGING
+        seconds[m] = np.where(self.purge_end[m], (self.fan_speed[m] - 1000) / FAN_RAMP, 10 - self.timer[m])
+
+        m = state == BURNER
+        seconds[m] = 2 - self.timer[m]
+
+        m = state == HEATING
+        setpoint = self.supply_setpoint[m]
+        timer = self.timer[m]
+        rate = self._heating_rate(setpoint, self.air_temp[m])
+        heating = _heating_time(setpoint, self.supply_temp[m], setpoint * 1.05, rate)
+        heating = np.where(8 - timer <= EPSILON, heating, np.minimum(heating, 8 - timer))
+        seconds[m] = np.where(self.end_heating[m], 20 - timer, heating)
+
+        m = state == ERROR
+        seconds[m] = (self.inlet_pressure[m] - self.outlet_pressure[m]) / 0.0025
+
+        seconds[seconds <= EPSILON] = 0
+        # Entering a state, or a change of the enable command, is due now
+        seconds[self.operating_status != STATE_STATUS[state]] = 0
+        seconds[(state != OFF) & ~self.enable] = 0
+        seconds[(state == OFF) & self.enable] = 0
+        return seconds
+
+    def _heating_rate(self, setpoint, air_temperature):
+        return (self.potenza * 1000) / (self.capacity * 4186 * (setpoint - air_temperature))
+
+    def _set_status(self, mask, status):
+        """Sets the operating status where it differs and returns the mask of devices that entered the state."""
+        entering = mask & (self.operating_status != status)
+        self.operating_status[entering] = status
+        return entering
+
+    def _off(self, m, next_state):
+        self.fan_speed[m] = 0
+        self.pump[m] = False
+        self.flow_rate[m] = 0
+        self.instant_power[m] = 0
+        self.operating_status[m] = 8
+        next_state[m & self.enable] = INITIALIZE
+
+    def _initialize(self, m, next_state, dt):
+        error_mode = m & (self.simulation_mode == 1)
+        self.inlet_pressure[error_mode] = 1.3
+        self.outlet_pressure[error_mode] = 1.1
+
+        inlet_pressure = self.inlet_pressure.copy()
+        outlet_pressure = self.outlet_pressure.copy()
+
+        entering = self._set_status(m, 7)
+        self.service_mode[entering] = 3
+        self.instant_power[entering] = 0.05
+        self.supply_temp[entering] = 20
+        self.return_temp[entering] = 20
+
+        low_pressure = m & ((inlet_pressure < self.required_pressure) | (outlet_pressure < self.required_pressure))
+        next_state[low_pressure] = ERROR
+
+        ready = m & (4 - self.timer <= EPSILON)
+        self.operating_status[ready] = 6
+        self.air_temp[ready] = self.ambient_temperature
+        self.supply_setpoint[ready] = self.setpoint[ready]
+        self.flow_rate[ready] = 4.82
+        self.inlet_pressure[ready] = 2.3
+        self.outlet_pressure[ready] = 2.1
+        self.pump[ready] = True
+        next_state[ready] = STANDBY
+        waiting = m & ~ready
+        self.timer[waiting] += dt[waiting]
+
+    def _standby(self, m, next_state, dt):
+        entering = self._set_status(m, 1)
+        self.service_mode[entering] = 2
+        self.burner[entering] = False
+
+        supply = self.supply_temp[m]
+        air = self.air_temp[m]
+        stack = self.stack_temp[m]
+        restart = np.zeros(self.size, dtype=bool)
+        restart[m] = _cooling_time(supply, self.supply_setpoint[m] * 0.90, air) <= EPSILON
+        next_state[restart] = PURGING
+
+        decay = np.exp(-COOLING_RATE * dt[m])
+        new_supply = air + (supply - air) * decay
+        self.supply_temp[m] = new_supply
+        self.return_temp[m] = air + (self.return_temp[m] - air) * decay
+
+        pressure_variation = (new_supply - supply) * 0.011
+        self.outlet_pressure[m] += pressure_variation
+        self.inlet_pressure[m] += pressure_variation
+
+        self.stack_temp[m] = np.where(stack > air, np.maximum(stack - STANDBY_STACK_COOLING * dt[m], air), stack)
+        self.timer[m] += dt[m]
+
+    def _purging(self, m, next_state, dt):
+        fan_speed = self.fan_speed.copy()
+
+        cooling = m & (self.stack_temp > self.air_temp)
+        self.stack_temp[cooling] = np.maximum(self.stack_temp[cooling] - PURGING_STACK_COOLING * dt[cooling], self.air_temp[cooling])
+
+        entering = self._set_status(m, 2)
+        self.service_mode[entering] = 1
+
+        speed_step = FAN_RAMP * dt
+        ramp_up = m & ~self.purge_end & (fan_speed < 3000)
+        ramp_down = m & self.purge_end & (fan_speed > 1000)
+        self.fan_speed[ramp_up] = np.minimum(fan_speed[ramp_up] + speed_step[ramp_up], 3000)
+        self.fan_speed[ramp_down] = np.maximum(fan_speed[ramp_down] - speed_step[ramp_down], 1000)
+
+        purge_done = m & ~self.purge_end & (10 - self.timer <= EPSILON)
+        finished = m & self.purge_end & ((fan_speed - 1000) / FAN_RAMP <= EPSILON)
+        self.purge_end[purge_done] = True
+        next_state[finished] = BURNER
+        running = m & ~finished
+        self.timer[running] += dt[running]
+
+    def _burner(self, m, next_state, dt):
+        self._set_status(m, 3)
+
+        heating_up = m & (self.stack_temp < 120)
+        self.stack_temp[heating_up] = np.minimum(self.stack_temp[heating_up] + 120 / 2 * dt[heating_up], 120)
+
+        ignited = m & (2 - self.timer <= EPSILON)
+        self.burner[ignited] = True
+        self.ignition_starts[ignited] += 1
+        next_state[ignited] = HEATING
+        waiting = m & ~ignited
+        self.timer[waiting] += dt[waiting]
+
+    def _heating(self, m, next_state, dt):
+        # A disabled boiler only leaves the state, see _sub_step
+        m = m & self.enable
+
+        entering = self._set_status(m, 4)
+        self.instant_power[entering] = 210
+
+        index = np.flatnonzero(m)
+        setpoint = self.supply_setpoint[index]
+        supply = self.supply_temp[index]
+        step = dt[index]
+        rate = self._heating_rate(setpoint, self.air_temp[index])
+        target = setpoint * 1.20
+
+        heating = _heating_time(setpoint, supply, setpoint * 1.05, rate) > EPSILON
+        new_supply = np.where(heating, target - (target - supply) * np.exp(-rate * step), supply)
+        # Supply held at temperature: the heat still goes to the return water
+        increment = np.where(heating, new_supply - supply, rate * (target - supply) * step)
+        self.supply_temp[index] = new_supply
+
+        reached = index[~heating & ~self.end_heating[index]]
+        self.end_heating[reached] = True
+        self.timer[reached] = 0
+
+        end_heating = self.end_heating[index]
+        timer = self.timer[index]
+        return_temp = self.return_temp[index]
+        warming = ((8 - timer <= EPSILON) | end_heating) & (return_temp < new_supply * 0.60)
+        self.return_temp[index[warming]] = np.minimum(return_temp[warming] + increment[warming], new_supply[warming] * 0.60)
+
+        pressure_variation = increment[~end_heating] * 0.011
+        self.outlet_pressure[index[~end_heating]] += pressure_variation
+        self.inlet_pressure[index[~end_heating]] += pressure_variation
+
+        finished = index[end_heating & (20 - timer <= EPSILON)]
+        self.fan_speed[finished] = 0
+        next_state[finished] = STANDBY
+        self.timer[index] += step
+
+    def _error(self, m, next_state, dt):
+        target_pressure = self.inlet_pressure.copy()
+
+        entering = self._set_status(m, 5)
+        self.burner[entering] = False
+        self.pump[entering] = False
+        self.instant_power[entering] = 0.05
+        self.error_message[entering] = 2
+
+        inlet_low = m & (self.inlet_pressure < target_pressure)
+        outlet_low = m & (self.outlet_pressure < target_pressure)
+        self.inlet_pressure[inlet_low] = np.minimum(self.inlet_pressure[inlet_low] + 0.0025 * dt[inlet_low], target_pressure[inlet_low])
+        self.outlet_pressure[outlet_low] = np.minimum(self.outlet_pressure[outlet_low] + 0.0025 * dt[outlet_low], target_pressure[outlet_low])
+
+        recovered = (m & ((target_pressure - self.inlet_pressure) / 0.0025 <= EPSILON)
+                     & ((target_pressure - self.outlet_pressure) / 0.0025 <= EPSILON))
+        self.error_message[recovered] = 1
+        next_state[recovered] = STANDBY
+
+    # --- CONTEXTS ----
+    def load_contexts(self, contexts):
+        """Takes state, timers, context fields and point values from SimulationContext objects, e.g. after a checkpoint restore."""
+        for i, context in enumerate(contexts):
+            state = context.state
+            self.state[i] = STATE_CODES[type(state).__name__]
+            self.timer[i] = context.state_timer
+            self.purge_end[i] = context.purge_end
+            self.end_heating[i] = context.end_heating
+            self.simulation_mode[i] = context.simulation_mode
+            self.setpoint[i] = context.setpoint
+            for name, value in context.device.get_points().items():
+                attribute = POINT_ARRAYS.get(name)
+                if attribute is not None:
+                    getattr(self, attribute)[i] = value
+
+    def store_contexts(self, contexts):
+        """Gives every SimulationContext the state and timers equivalent to its vectorized state, so it can be checkpointed."""
+        state_codes = self.state.tolist()
+        timers = self.timer.tolist()
+        purge_end = self.purge_end.tolist()
+        end_heating = self.end_heating.tolist()
+        for i, context in enumerate(contexts):
+            context.state = states.STATES[STATE_NAMES[state_codes[i]]]
+            context.state_timer = timers[i]
+            context.purge_end = purge_end[i]
+            context.end_heating = end_heating[i]
+
+    # --- BACNET I/O ----
+    def pull_commands(self, devices):
+        """Reads the points a BMS can write, so commands reach the vectorized state."""
+        for i, device in enumerate(devices):
+            self.enable[i] = device.get_boiler_command()
+            self.supply_setpoint[i] = device.get_supply_setpoint()
+
+    def publish(self, devices):
+        """Writes the arrays back to the BACnet objects of every device."""
+        columns = zip(
+            self.supply_temp.tolist(), self.return_temp.tolist(), self.stack_temp.tolist(), self.air_temp.tolist(),
+            self.inlet_pressure.tolist(), self.outlet_pressure.tolist(), self.flow_rate.tolist(), self.fan_speed.tolist(),
+            self.instant_power.tolist(), self.pump.tolist(), self.burner.tolist(), self.operating_status.tolist(),
+            self.error_message.tolist(), self.service_mode.tolist(), self.supply_setpoint.tolist(),
+            self.power_seconds.tolist(), self.burner_seconds.tolist(), self.ignition_starts.tolist(),
+        )
+        for device, values in zip(devices, columns):
+            (supply, return_temp, stack, air, inlet, outlet, flow, fan, power, pump, burner, status,
+             error_message, service_mode, setpoint, power_seconds, burner_seconds, ignition_starts) = values
+            device.set_supply_temperature(supply)
+            device.set_return_temperature(return_temp)
+            device.set_stack_temperature(stack)
+            device.set_air_temperature(air)
+            device.set_inlet_pressure(inlet)
+            device.set_outlet_pressure(outlet)
+            device.set_flow_rate(flow)
+            device.set_fan_speed(fan)
+            device.set_instant_power(power)
+            device.set_pump_status(pump)
+            device.set_burner_status(burner)
+            device.set_device_operating_status(status)
+            device.set_error_message(error_message)
+            device.set_service_mode(service_mode)
+            device.set_supply_setpoint(setpoint)
+            device.set_power_seconds(power_seconds)
+            device.set_burner_seconds(burner_seconds)
+            device.set_ignition_starts(ignition_starts)
+            device.commit()
+
+    def log_transitions(self, devices):
+        for indexes, old_codes, new_codes in self.transitions:
+            for i, old_code, new_code in zip(indexes.tolist(), old_codes.tolist(), new_codes.tolist()):
+                self._log_transition(devices[i].get_device_id(), i, old_code, new_code)
+
+    def _log_transition(self, device_id, i, old_code, new_code):
+        old_state, new_state = STATE_NAMES[old_code], STATE_NAMES[new_code]
+        events.transition(device_id, old_state, new_state)
+        if metrics.enabled:
+            metrics.count_transition(old_state, new_state)
+        if new_code == ERROR:
+            events.error(device_id, "Low pressure", inlet_pressure=float(self.inlet_pressure[i]),
+                         outlet_pressure=float(self.outlet_pressure[i]), required_pressure=float(self.required_pressure[i]))
+
+    async def run(self, devices, speed_factor, scheduler: TickScheduler, on_tick=None):
+        """Realtime loop: one vectorized step per scheduler tick, published to the BACnet devices."""
+        scheduler.start()
+        while True:
+            periods = await scheduler.next_tick()
+            step = speed_factor * scheduler.period * periods
+            self.pull_commands(devices)
+            if metrics.enabled:
+                start = time.perf_counter()
+                self.step(step)
+                metrics.vectorized_step_seconds.observe(time.perf_counter() - start)
+                start = time.perf_counter()
+                self.publish(devices)
+                # Per device, as the scalar engine records it
+                metrics.commit_seconds.observe((time.perf_counter() - start) / self.size)
+            else:
+                self.step(step)
+                self.publish(devices)
+            if events.transitions_enabled() or metrics.enabled:
+                self.log_transitions(devices)
+            if on_tick is not None:
+                on_tick(step)
@@ -0,0 +1,30 @@
+import struct
+
+# Binary upload format, the layout is mirrored by WebServer/models/wire.py.
+# A body is a header followed by fixed-width little-endian records in collect_sample order:
+# no field names, and the numbers are not turned into text and back.
+BINARY_CONTENT_TYPE = "application/x-device-status"
+MAGIC = b"DS"
+VERSION = 1
+HEADER = struct.Struct("<2sHI")            # magic, version, record count
+# device_id, timestamp, operation_mode, 5 measures, pump_status, error_message. The timestamp keeps its
+# ISO text, NUL-padded, so the server stores the exact string a JSON upload would have carried.
+RECORD = struct.Struct("<i32sh5d?h")
+TIMESTAMP_SIZE = 32
+
+
+def encode_batch(samples: list[dict]) -> bytes:
+    """Packs samples as produced by SimulationContext.collect_sample into one binary body."""
+    body = bytearray(HEADER.size + RECORD.size * len(samples))
+    HEADER.pack_into(body, 0, MAGIC, VERSION, len(samples))
+    offset = HEADER.size
+    for sample in samples:
+        timestamp = sample["timestamp"].encode()
+        if len(timestamp) > TIMESTAMP_SIZE:
+            raise ValueError(f"Timestamp {sample['timestamp']!r} longer than {TIMESTAMP_SIZE} bytes")
+        RECORD.pack_into(body, offset, sample["device_id"], timestamp, sample["operation_mode"],
+                         sample["supply_temp"], sample["return_temp"], sample["outlet_pressure"],
+                         sample["inlet_pressure"], sample["instant_power"], sample["pump_status"],
+                         sample["error_message"])
+        offset += RECORD.size
+    return bytes(body)
@@ -1,6 +1,117 @@
-import datetime
+import logging
+import time
+from controller.frames import FrameReassembler
+from controller.ingest_pipeline import IngestPipeline
+from controller.live_feed import LiveFeed
+from metrics import ingested_samples
+from models.device import ReceivedDeviceStatus
+from storage.segments import SegmentStore
+from storage.timeseries import TimeSeriesStore, DEFAULT_CAPACITY, epoch_seconds
 
-def process_device_update_request(data):
-    """Simple logic to process a request."""
-    device_id = data.device_id
-    print(f"[{datetime.datetime.now()}] Received data from {device_id}: {data.dict()}")
\ No newline at end of file
+# Segments are written under the working directory of the server
+SEGMENT_DIRECTORY = "data/segments"
+# Received time covered by the ring buffers when they are refilled at startup, about one capacity at 10 s per sample
+WARM_UP_SECONDS = DEFAULT_CAPACITY * 10
+
+logger = logging.getLogger(__name__)
+
+time_series = TimeSeriesStore()
+segment_store = SegmentStore(SEGMENT_DIRECTORY)
+live_feed = LiveFeed()
+latest_samples = {}  # device_id -> newest ReceivedDeviceStatus
+latest_times = {}    # device_id -> timestamp of that sample as epoch seconds
+frame_reassembler = FrameReassembler()
+
+async def start_storage():
+    await segment_store.start()
+    loaded = time_series.load(segment_store.scan(start=time.time() - WARM_UP_SECONDS))
+    logger.info("Storage ready: %d samples loaded from %s", loaded, SEGMENT_DIRECTORY)
+    # The latest samples come back with the buffers, or /latest would stay empty until each device sends again
+    for device_id, buffer in time_series.items():
+        newest = buffer.newest()
+        if newest is not None:
+            update_latest(ReceivedDeviceStatus.model_construct(device_id=device_id, **newest))
+    ingest_pipeline.start()
+
+async def stop_storage():
+    # Samples already accepted are stored before the segments are closed
+    await ingest_pipeline.stop()
+    await segment_store.stop()
+
+def enqueue_device_update_request(data) -> bool:
+    """Queues one sample for the workers. False when the ingest queue is full."""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Received data from %s: %s", data.device_id, data.model_dump())
+    return ingest_pipeline.offer("single", [data])
+
+def enqueue_device_batch_request(samples) -> bool:
+    """Queues a batch of samples, possibly from many devices, all or none. False when the ingest queue is full."""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Received batch of %d samples from %d devices", len(samples), len({data.device_id for data in samples}))
+    return ingest_pipeline.offer("batch", samples)
+
+def enqueue_device_frames(frames) -> bool:
+    """
+    Rebuilds full samples from report-by-exception frames and queues them. False when the ingest queue is full:
+    the room is checked first, so a refused request leaves the reassembler untouched and can be sent again.
+    """
+    if not ingest_pipeline.has_room(len(frames)):
+        ingest_pipeline.rejected_samples += len(frames)
+        return False
+    samples = [sample for frame in frames if (sample := frame_reassembler.apply(frame)) is not None]
+    return ingest_pipeline.offer("frames", samples) if samples else True
+
+async def process_samples(requests):
+    """
+    Stores a micro-batch of queued requests, as (endpoint, samples) pairs, and publishes it once on disk.
+    Each request is appended on its own, so a sample the segments cannot hold only fails its own request;
+    all of them still go into the same group commit.
+    """
+    committed = []
+    for endpoint, samples in requests:
+        try:
+            committed.append((endpoint, samples, segment_store.append(samples)))
+        except (OverflowError, TypeError, ValueError) as e:
+            logger.error("Dropped %d samples the segments cannot store: %s", len(samples), e)
+            continue
+        for data in samples:
+            time_series.append(data)
+    for endpoint, samples, future in committed:
+        await future
+        ingested_samples.labels(endpoint).inc(len(samples))
+        for data in samples:
+            update_latest(data)
+        live_feed.publish(samples)
+
+ingest_pipeline = IngestPipeline(process_samples)
+
+def update_latest(data):
+    # Replayed spools deliver old samples late, they must not replace a newer one.
+    # Compared as times: with offsets, "Z" or other fractional digits, ISO strings do not sort as text.
+    timestamp = epoch_seconds(data.timestamp)
+    current = latest_times.get(data.device_id)
+    if current is None or timestamp >= current:
+        latest_samples[data.device_id] = data
+        latest_times[data.device_id] = timestamp
+
+def get_latest_sample(device_id):
+    return latest_samples.get(device_id)
+
+def get_fleet_snapshot(operation_mode=None):
+    """Newest sample of every device, optionally only the devices in the given operation mode."""
+    return [data for data in latest_samples.values() if operation_mode is None or data.operation_mode == operation_mode]
+
+def get_device_history(device_id, last=None, start=None, end=None):
+    """Latest `last` samples of a device, or the ones between start and end. None if the device is unknown."""
+    buffer = time_series.get(device_id)
+    if buffer is None:
+        return None
+    if start is not None or end is not None:
+        return buffer.range(start, end)
+    return buffer.latest(last)
+
+def get_device_downsampled_history(device_id, start, end, bucket_seconds):
+    buffer = time_series.get(device_id)
+    if buffer is None:
+        return None
+    return buffer.downsample(start, end, bucket_seconds)
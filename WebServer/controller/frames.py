@@ -0,0 +1,90 @@
+from models.device import ReceivedDeviceStatus
+
+# Fields a delta frame can leave out
+FRAME_FIELDS = tuple(name for name in ReceivedDeviceStatus.model_fields if name not in ("device_id", "timestamp"))
+FIELDS_SET = frozenset(ReceivedDeviceStatus.model_fields)
+
+
+class DeviceFrames:
+    __slots__ = ("seq", "values", "stale")
+
+    def __init__(self, seq: int, values: dict):
+        self.seq = seq
+        self.values = values
+        self.stale = False      # a frame was lost since the last full one, some fields may be behind
+
+
+class FrameReassembler:
+    """
+    Rebuilds full samples from report-by-exception frames. Each device keeps the values of its last
+    frames: a delta frame updates the fields it carries and yields the complete sample. Sequence numbers
+    tell lost frames (a jump) from late ones (already passed, e.g. replayed from a spool): lost frames
+    mark the device stale until its next full frame, late full frames still reach the history but do
+    not move the current state, late deltas cannot be placed and are dropped.
+    """
+
+    def __init__(self):
+        self._devices = {}
+
+        # --- Stats ---
+        self.full_frames = 0
+        self.delta_frames = 0
+        self.missed_frames = 0      # sequence numbers skipped
+        self.late_frames = 0
+        self.orphan_frames = 0      # deltas of a device with no full frame yet
+        self.restarts = 0
+
+    @property
+    def stale_devices(self) -> int:
+        return sum(device.stale for device in self._devices.values())
+
+    def apply(self, frame) -> ReceivedDeviceStatus | None:
+        """The full sample a frame stands for, None when it cannot be rebuilt."""
+        fields = {name: value for name in FRAME_FIELDS if (value := getattr(frame, name)) is not None}
+        full = len(fields) == len(FRAME_FIELDS)
+        device = self._devices.get(frame.device_id)
+
+        if device is None or full and frame.seq == 1:
+            if not full:
+                self.orphan_frames += 1
+                return None
+            if device is not None:
+                # The simulator started over, e.g. after a restart from a checkpoint
+                self.restarts += 1
+            self._devices[frame.device_id] = DeviceFrames(frame.seq, fields)
+            self.full_frames += 1
+            return self._sample(frame, fields)
+
+        if frame.seq <= device.seq:
+            self.late_frames += 1
+            return self._sample(frame, fields) if full else None
+
+        if frame.seq > device.seq + 1:
+            self.missed_frames += frame.seq - device.seq - 1
+            device.stale = True
+        if full:
+            device.values = fields
+            device.stale = False
+            self.full_frames += 1
+        else:
+            device.values.update(fields)
+            self.delta_frames += 1
+        device.seq = frame.seq
+        return self._sample(frame, device.values)
+
+    @staticmethod
+    def _sample(frame, values: dict) -> ReceivedDeviceStatus:
+        # Every field was validated with the frame
+        return ReceivedDeviceStatus.model_construct(FIELDS_SET, device_id=frame.device_id, timestamp=frame.timestamp,
+                                                    **values)
+
+    def stats(self) -> dict:
+        return {
+            "full_frames": self.full_frames,
+            "delta_frames": self.delta_frames,
+            "missed_frames": self.missed_frames,
+            "late_frames": self.late_frames,
+            "orphan_frames": self.orphan_frames,
+            "restarts": self.restarts,
+            "stale_devices": self.stale_devices,
+        }
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import math
+import time
+
+DEFAULT_MAX_QUEUED_SAMPLES = 100000
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_BATCH = 5000
+# Bounds of the Retry-After sent when the queue is full, in seconds
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 30
+
+logger = logging.getLogger(__name__)
+
+
+class IngestPipeline:
+    """
+    Write-behind queue between the upload endpoints and the sinks. A request only validates its
+    samples and offers them here; a pool of workers drains the queue in micro-batches, each made of
+    the requests queued meanwhile up to max_batch samples, and hands them to process_batch.
+    The queue is bounded in samples: when an offer does not fit it is refused and the endpoint
+    answers 503, so a slow sink pushes back on the clients instead of growing the memory.
+    """
+
+    def __init__(self, process_batch, max_queued_samples: int = DEFAULT_MAX_QUEUED_SAMPLES,
+                 workers: int = DEFAULT_WORKERS, max_batch: int = DEFAULT_MAX_BATCH):
+        self._process_batch = process_batch  # async callable taking a list of (endpoint, samples)
+        self.max_queued_samples = max_queued_samples
+        self.workers = workers
+        self.max_batch = max_batch
+        self._queue = asyncio.Queue()
+        self._tasks = []
+
+        # --- Stats ---
+        self.queued_samples = 0
+        self.drained_samples = 0
+        self.rejected_samples = 0
+        self.failed_samples = 0
+        self.drain_rate = 0.0  # samples per second drained over the last second
+
+    def has_room(self, samples: int) -> bool:
+        return self.queued_samples + samples <= self.max_queued_samples
+
+    def offer(self, endpoint: str, samples) -> bool:
+        """Queues the samples of one request, all or none. False when the queue has no room for them."""
+        if not self.has_room(len(samples)):
+            self.rejected_samples += len(samples)
+            return False
+        self._queue.put_nowait((endpoint, samples))
+        self.queued_samples += len(samples)
+        return True
+
+    def retry_after(self) -> int:
+        """Seconds the queue needs to drain at the current rate, the Retry-After of a refused request."""
+        seconds = self.queued_samples / self.drain_rate if self.drain_rate else MAX_RETRY_AFTER
+        return min(MAX_RETRY_AFTER, max(MIN_RETRY_AFTER, math.ceil(seconds)))
+
+    # --- Lifecycle ---
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._measure_drain_rate()))
+
+    async def stop(self):
+        """Drains what is already queued, then stops the workers."""
+        await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # --- Workers ---
+
+    async def _worker(self):
+        while True:
+            requests = [await self._queue.get()]
+            size = len(requests[0][1])
+            # Everything queued while the previous batches were processed goes in this one
+            while size < self.max_batch and not self._queue.empty():
+                requests.append(self._queue.get_nowait())
+                size += len(requests[-1][1])
+            try:
+                await self._process_batch(requests)
+            except Exception as e:
+                self.failed_samples += size
+                logger.error("Processing of %d samples failed: %s", size, e)
+            finally:
+                self.queued_samples -= size
+                self.drained_samples += size
+                for _ in requests:
+                    self._queue.task_done()
+
+    async def _measure_drain_rate(self):
+        last_drained, last_time = self.drained_samples, time.monotonic()
+        while True:
+            await asyncio.sleep(1)
+            now = time.monotonic()
+            self.drain_rate = (self.drained_samples - last_drained) / (now - last_time)
+            last_drained, last_time = self.drained_samples, now
+
+    def stats(self) -> dict:
+        return {
+            "queued_samples": self.queued_samples,
+            "drained_samples": self.drained_samples,
+            "rejected_samples": self.rejected_samples,
+            "failed_samples": self.failed_samples,
+            "drain_rate": self.drain_rate,
+        }
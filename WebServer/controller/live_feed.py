@@ -0,0 +1,60 @@
+import asyncio
+
+DEFAULT_QUEUE_SIZE = 1000
+
+
+class Subscription:
+    """
+    One live consumer. Samples wait in a bounded queue: when the consumer falls behind
+    the oldest sample is dropped, so a slow client never holds up ingestion.
+    """
+
+    def __init__(self, device_ids=None, operation_modes=None, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.device_ids = set(device_ids) if device_ids else None
+        self.operation_modes = set(operation_modes) if operation_modes else None
+        self._queue = asyncio.Queue(queue_size)
+        self.dropped = 0
+
+    def matches(self, data) -> bool:
+        return ((self.device_ids is None or data.device_id in self.device_ids)
+                and (self.operation_modes is None or data.operation_mode in self.operation_modes))
+
+    def put(self, payload: str):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(payload)
+
+    async def get(self) -> str:
+        return await self._queue.get()
+
+
+class LiveFeed:
+    """Fans every received sample out to the subscriptions whose filters it matches."""
+
+    def __init__(self):
+        self._subscriptions = set()
+
+    def subscribe(self, device_ids=None, operation_modes=None) -> Subscription:
+        subscription = Subscription(device_ids, operation_modes)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscriptions)
+
+    def publish(self, samples):
+        if not self._subscriptions:
+            return
+        for data in samples:
+            # Serialized once, whatever the number of subscribers it goes to
+            payload = None
+            for subscription in self._subscriptions:
+                if subscription.matches(data):
+                    if payload is None:
+                        payload = data.model_dump_json()
+                    subscription.put(payload)
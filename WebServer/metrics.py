@@ -0,0 +1,36 @@
+import time
+from prometheus_client import Counter, Histogram
+
+request_seconds = Histogram("webserver_request_seconds", "Time from request to response headers, per route",
+                            ["method", "route", "status"])
+validation_seconds = Histogram("webserver_batch_validation_seconds",
+                               "Time spent decoding and validating the body of an upload batch, per body format", ["format"],
+                               buckets=(1e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0))
+ingested_samples = Counter("webserver_ingested_samples", "Samples stored, per upload endpoint", ["endpoint"])
+rejected_samples = Counter("webserver_rejected_samples", "Samples refused with 503 because the ingest queue was full, per upload endpoint",
+                           ["endpoint"])
+
+
+class RequestMetricsMiddleware:
+    """
+    Plain ASGI middleware timing every request up to its response headers, so a stream
+    is measured by the time it takes to start and not by how long the client stays connected.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+
+        async def timed_send(message):
+            if message["type"] == "http.response.start":
+                # Set by the router once it matched, the path template keeps the label count bounded
+                route = getattr(scope.get("route"), "path", "unmatched")
+                request_seconds.labels(scope["method"], route, str(message["status"])).observe(time.perf_counter() - start)
+            await send(message)
+
+        await self.app(scope, receive, timed_send)
@@ -1,14 +1,48 @@
-from pydantic import BaseModel
+from datetime import datetime
+from typing import Annotated
+from pydantic import AfterValidator, BaseModel, Field, TypeAdapter
+
+
+def check_timestamp(value: str) -> str:
+    """Rejects timestamps the storage could not convert to epoch seconds, keeping the string the client sent."""
+    datetime.fromisoformat(value).timestamp()
+    return value
+
+
+# Checked here, so a value the storage cannot hold gets 422 instead of a 202 whose sample the storage then drops
+IsoTimestamp = Annotated[str, AfterValidator(check_timestamp)]
+Int16 = Annotated[int, Field(ge=-2 ** 15, le=2 ** 15 - 1)]      # "h" columns of the segments and of the binary records
+DeviceId = Annotated[int, Field(ge=-2 ** 31, le=2 ** 31 - 1)]   # "i" in the binary records, so both formats take the same ids
+
 
 class ReceivedDeviceStatus(BaseModel):
-    device_id: int
-    timestamp: str
-    operation_mode: int
+    device_id: DeviceId
+    timestamp: IsoTimestamp
+    operation_mode: Int16
     supply_temp: float
     return_temp: float
     outlet_pressure: float
     inlet_pressure: float
     instant_power: float
     pump_status: bool
-    error_message: int
+    error_message: Int16
+
+
+class ReceivedDeviceFrame(BaseModel):
+    """A report-by-exception frame: a full sample, or only the fields that changed since the previous frame."""
+    device_id: DeviceId
+    seq: int
+    timestamp: IsoTimestamp
+    operation_mode: Int16 | None = None
+    supply_temp: float | None = None
+    return_temp: float | None = None
+    outlet_pressure: float | None = None
+    inlet_pressure: float | None = None
+    instant_power: float | None = None
+    pump_status: bool | None = None
+    error_message: Int16 | None = None
+
 
+# Validates a whole JSON array of samples in one pass
+ReceivedDeviceStatusBatch = TypeAdapter(list[ReceivedDeviceStatus])
+ReceivedDeviceFrameBatch = TypeAdapter(list[ReceivedDeviceFrame])
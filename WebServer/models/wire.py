@@ -0,0 +1,50 @@
+import struct
+from models.device import ReceivedDeviceStatus, check_timestamp
+
+# Binary upload format, the layout is mirrored by DeviceSimulation/source/simulation/wire.py.
+# A body is a header followed by fixed-width little-endian records, see there for the fields.
+BINARY_CONTENT_TYPE = "application/x-device-status"
+MAGIC = b"DS"
+SUPPORTED_VERSIONS = (1,)
+HEADER = struct.Struct("<2sHI")            # magic, version, record count
+RECORD = struct.Struct("<i32sh5d?h")
+FIELDS_SET = frozenset(ReceivedDeviceStatus.model_fields)
+
+
+def decode_batch(body: bytes) -> list[ReceivedDeviceStatus]:
+    """
+    Decodes a binary body into samples. The struct layout already fixes the type of every field, so the
+    models are built without running the pydantic validators; only the timestamp text is checked.
+    Raises ValueError on a malformed body.
+    """
+    if len(body) < HEADER.size:
+        raise ValueError("Body shorter than the header")
+    magic, version, count = HEADER.unpack_from(body)
+    if magic != MAGIC:
+        raise ValueError("Not a device status body")
+    if version not in SUPPORTED_VERSIONS:
+        raise ValueError(f"Unsupported version {version}")
+    if len(body) != HEADER.size + count * RECORD.size:
+        raise ValueError(f"Body length does not match {count} records")
+
+    new, set_attribute = ReceivedDeviceStatus.__new__, object.__setattr__
+    samples = []
+    for index, (device_id, timestamp, operation_mode, supply_temp, return_temp, outlet_pressure, inlet_pressure,
+                instant_power, pump_status, error_message) in enumerate(RECORD.iter_unpack(memoryview(body)[HEADER.size:])):
+        try:
+            timestamp = check_timestamp(timestamp.rstrip(b"\0").decode())
+        except ValueError:
+            raise ValueError(f"Record {index} has an invalid timestamp")
+        # What model_construct does, without its per-field default handling: every field is set and typed already
+        sample = new(ReceivedDeviceStatus)
+        set_attribute(sample, "__dict__", {
+            "device_id": device_id, "timestamp": timestamp, "operation_mode": operation_mode,
+            "supply_temp": supply_temp, "return_temp": return_temp, "outlet_pressure": outlet_pressure,
+            "inlet_pressure": inlet_pressure, "instant_power": instant_power, "pump_status": pump_status,
+            "error_message": error_message,
+        })
+        set_attribute(sample, "__pydantic_fields_set__", FIELDS_SET)
+        set_attribute(sample, "__pydantic_extra__", None)
+        set_attribute(sample, "__pydantic_private__", None)
+        samples.append(sample)
+    return samples
@@ -1,12 +1,70 @@
-from fastapi import FastAPI, Depends, HTTPException, Header, Response
-from controller.device_controller import process_device_update_request
-from models.device import ReceivedDeviceStatus
+import asyncio
+import logging
+import queue
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from fastapi import FastAPI, Depends, HTTPException, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from controller.device_controller import enqueue_device_update_request, enqueue_device_batch_request, \
+    enqueue_device_frames, get_device_history, get_device_downsampled_history, start_storage, stop_storage, \
+    get_latest_sample, get_fleet_snapshot, live_feed, latest_samples, segment_store, ingest_pipeline, frame_reassembler
+from models.device import ReceivedDeviceStatus, ReceivedDeviceStatusBatch, ReceivedDeviceFrameBatch
+from models.wire import BINARY_CONTENT_TYPE, decode_batch
+from metrics import RequestMetricsMiddleware, validation_seconds, rejected_samples
+from prometheus_client import CONTENT_TYPE_LATEST, Gauge, generate_latest
 import uvicorn
 
 # Simulazione API KEY per la autenticazione del endpoint
 API_KEY = "EXAMPLE_API_KEY"
+# Bodies the batch endpoint decodes, announced on its responses so uploaders can switch from JSON
+BATCH_CONTENT_TYPES = f"application/json, application/x-ndjson, {BINARY_CONTENT_TYPE}"
+# Seconds without samples after which the stream sends a comment, so proxies keep the connection open
+STREAM_KEEPALIVE = 15
 
-app = FastAPI(title="Device IoT Receiver", description="Receive device updates from Bacnet API", version="1.0")
+# Log records are written by a background thread, a slow terminal does not hold up the requests
+log_queue = queue.SimpleQueue()
+log_output = logging.StreamHandler()
+log_output.setFormatter(logging.Formatter("[%(asctime)s] %(levelname)s %(name)s: %(message)s"))
+log_listener = QueueListener(log_queue, log_output)
+log_handler = QueueHandler(log_queue)
+log_handler.setFormatter(logging.Formatter("%(message)s"))  # only the message is merged before queueing
+logging.basicConfig(level=logging.INFO, handlers=[log_handler])
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_listener.start()
+    await start_storage()
+    yield
+    await stop_storage()
+    log_listener.stop()
+
+app = FastAPI(title="Device IoT Receiver", description="Receive device updates from Bacnet API", version="1.0", lifespan=lifespan)
+app.add_middleware(RequestMetricsMiddleware)
+
+# Read when /metrics is scraped, nothing is updated on the request path
+Gauge("webserver_live_subscribers", "Open /device/stream connections").set_function(lambda: live_feed.subscribers)
+Gauge("webserver_devices", "Devices that sent at least one sample").set_function(lambda: len(latest_samples))
+Gauge("webserver_storage_pending_rows", "Rows waiting for the next segment commit").set_function(
+    lambda: segment_store.pending_rows)
+Gauge("webserver_storage_last_commit_seconds", "Duration of the last segment commit").set_function(
+    lambda: segment_store.last_commit_seconds)
+Gauge("webserver_ingest_queued_samples", "Samples accepted and waiting for the ingest workers").set_function(
+    lambda: ingest_pipeline.queued_samples)
+Gauge("webserver_ingest_drain_rate", "Samples per second drained by the ingest workers over the last second").set_function(
+    lambda: ingest_pipeline.drain_rate)
+for key, documentation in (("missed_frames", "Report-by-exception frames lost, from the gaps in their sequence numbers"),
+                           ("late_frames", "Frames received after a newer one of the same device"),
+                           ("orphan_frames", "Delta frames dropped because their device had no full frame yet"),
+                           ("stale_devices", "Devices whose rebuilt state may be behind since a lost frame")):
+    Gauge(f"webserver_{key}", documentation).set_function(lambda key=key: getattr(frame_reassembler, key))
+
+def queue_full(endpoint: str, samples: int):
+    rejected_samples.labels(endpoint).inc(samples)
+    return HTTPException(status_code=503, detail="Ingest queue full",
+                         headers={"Retry-After": str(ingest_pipeline.retry_after())})
 
 async def verify_api_key(authorization: str = Header(...)):
     if authorization != API_KEY:
@@ -16,10 +74,118 @@ async def verify_api_key(authorization: str = Header(...)):
 async def root():
     return {"status": "ok"}
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.post("/device/upload", dependencies=[Depends(verify_api_key)])
 async def upload_device_data(data: ReceivedDeviceStatus):
-    process_device_update_request(data)
-    return Response(status_code=204)
+    if not enqueue_device_update_request(data):
+        raise queue_full("single", 1)
+    return Response(status_code=202)
+
+@app.post("/device/upload/batch", dependencies=[Depends(verify_api_key)])
+async def upload_device_data_batch(request: Request):
+    """
+    Accepts a JSON array of samples, NDJSON (one sample per line) with Content-Type application/x-ndjson,
+    or the binary records of models/wire.py with Content-Type application/x-device-status.
+    """
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+    body_format = "binary" if content_type.startswith(BINARY_CONTENT_TYPE) else "ndjson" if "ndjson" in content_type else "json"
+    start = time.perf_counter()
+    try:
+        if body_format == "binary":
+            samples = decode_batch(body)
+        else:
+            if body_format == "ndjson":
+                # Joined into one JSON array so the whole batch is still validated in a single pass
+                body = b"[" + b",".join(line for line in body.splitlines() if line.strip()) + b"]"
+            samples = ReceivedDeviceStatusBatch.validate_json(body)
+    except ValidationError as e:
+        # Without the input: a malformed body would put raw bytes in the detail, which cannot be serialized
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False, include_input=False))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    finally:
+        validation_seconds.labels(body_format).observe(time.perf_counter() - start)
+    if len(samples) > ingest_pipeline.max_queued_samples:
+        # Would be refused with 503 forever, the client has to split it
+        raise HTTPException(status_code=413, detail=f"Batch larger than the ingest queue ({ingest_pipeline.max_queued_samples} samples)")
+    if not enqueue_device_batch_request(samples):
+        raise queue_full("batch", len(samples))
+    return Response(status_code=202, headers={"Accept-Post": BATCH_CONTENT_TYPES})
+
+@app.post("/device/upload/frames", dependencies=[Depends(verify_api_key)])
+async def upload_device_frames(request: Request):
+    """
+    Accepts a JSON array of report-by-exception frames: full samples, or device_id, seq, timestamp and the fields
+    that changed. Every frame is rebuilt into a full sample before it is queued like the other uploads.
+    """
+    start = time.perf_counter()
+    try:
+        frames = ReceivedDeviceFrameBatch.validate_json(await request.body())
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False, include_input=False))
+    finally:
+        validation_seconds.labels("frames").observe(time.perf_counter() - start)
+    if len(frames) > ingest_pipeline.max_queued_samples:
+        raise HTTPException(status_code=413, detail=f"Batch larger than the ingest queue ({ingest_pipeline.max_queued_samples} samples)")
+    if not enqueue_device_frames(frames):
+        raise queue_full("frames", len(frames))
+    return Response(status_code=202)
+
+@app.get("/device/latest", dependencies=[Depends(verify_api_key)])
+async def fleet_snapshot(operation_mode: int | None = None):
+    """Newest sample of every device."""
+    return get_fleet_snapshot(operation_mode)
+
+@app.get("/device/stream", dependencies=[Depends(verify_api_key)])
+async def device_stream(device_id: list[int] | None = Query(None), operation_mode: list[int] | None = Query(None)):
+    """Server-Sent Events stream of the received samples, optionally filtered by device and by operation mode."""
+    async def events():
+        # Subscribed once the response is streaming: a client gone before that never runs the finally below
+        subscription = live_feed.subscribe(device_id, operation_mode)
+        dropped = 0
+        try:
+            while True:
+                try:
+                    payload = await asyncio.wait_for(subscription.get(), STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if subscription.dropped != dropped:
+                    # Tells the client it missed samples while it was not keeping up
+                    yield f"event: dropped\ndata: {subscription.dropped - dropped}\n\n"
+                    dropped = subscription.dropped
+                yield f"data: {payload}\n\n"
+        finally:
+            live_feed.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/device/{device_id}/latest", dependencies=[Depends(verify_api_key)])
+async def device_latest(device_id: int):
+    data = get_latest_sample(device_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Unknown device")
+    return data
+
+@app.get("/device/{device_id}/history", dependencies=[Depends(verify_api_key)])
+async def device_history(device_id: int, last: int = Query(100, ge=1), start: datetime | None = None, end: datetime | None = None):
+    """Latest `last` samples, or all the samples between start and end when either is given."""
+    history = get_device_history(device_id, last, start, end)
+    if history is None:
+        raise HTTPException(status_code=404, detail="Unknown device")
+    return history
+
+@app.get("/device/{device_id}/history/downsample", dependencies=[Depends(verify_api_key)])
+async def device_history_downsample(device_id: int, start: datetime, end: datetime | None = None, bucket: float = Query(60, gt=0)):
+    """Min, max and average per bucket of `bucket` seconds."""
+    history = get_device_downsampled_history(device_id, start, end, bucket)
+    if history is None:
+        raise HTTPException(status_code=404, detail="Unknown device")
+    return history
 
 if __name__ == "__main__":
     uvicorn.run("server:app", host="0.0.0.0", port=8099, reload=True)
\ No newline at end of file
@@ -0,0 +1,293 @@
+import asyncio
+import logging
+import mmap
+import os
+import shutil
+import time
+from array import array
+from bisect import bisect_left
+from .timeseries import COLUMNS, sample_row
+
+# Every row also records when the server received it (monotonic within the store) and its device.
+# Column files hold the raw array items in native byte order, one fixed-width item per row.
+SEGMENT_COLUMNS = {"received_at": "d", "device_id": "q", **COLUMNS}
+DEFAULT_SEGMENT_SECONDS = 3600
+DEFAULT_RETENTION_SECONDS = 7 * 24 * 3600
+RETENTION_CHECK_SECONDS = 60
+
+logger = logging.getLogger(__name__)
+
+
+class SegmentStore:
+    """
+    Append-only columnar store of received samples.
+    Rows are grouped in segments, one directory per window of segment_seconds of receive time,
+    with one file per column. Appends are group-committed: everything queued while a commit is
+    in progress goes into the next one, written and fsync'd together. Reads mmap the column files,
+    so a scan hands out memoryviews over the page cache instead of Python objects.
+    """
+
+    def __init__(self, directory: str, segment_seconds: int = DEFAULT_SEGMENT_SECONDS,
+                 retention_seconds: float = DEFAULT_RETENTION_SECONDS):
+        # Windows start on whole seconds, which also name the segment directories
+        if not isinstance(segment_seconds, int) or segment_seconds <= 0:
+            raise ValueError(f"Segment length must be a positive number of seconds, got {segment_seconds}")
+        self.directory = directory
+        self.segment_seconds = segment_seconds
+        self.retention_seconds = retention_seconds
+        self._pending = self._new_columns()
+        self._waiters = []
+        self._wakeup = asyncio.Event()
+        self._last_received_at = 0.0
+        self._window = None  # segment the open column files belong to
+        self._files = {}
+        self._task = None
+
+        # --- Stats ---
+        self.committed_rows = 0
+        self.commits = 0
+        self.failed_commits = 0
+        self.last_commit_seconds = 0.0
+        self.recovered_bytes = 0
+        self.removed_segments = 0
+
+    @property
+    def pending_rows(self) -> int:
+        return len(self._pending["received_at"])
+
+    @staticmethod
+    def _new_columns() -> dict:
+        return {name: array(code) for name, code in SEGMENT_COLUMNS.items()}
+
+    def _segment_dir(self, window: int) -> str:
+        return os.path.join(self.directory, str(window))
+
+    def _windows(self) -> list[int]:
+        """Start of every segment on disk, oldest first."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(int(name) for name in names if name.isdigit())
+
+    # --- Lifecycle ---
+
+    def open(self):
+        """Creates the directory and repairs every segment left inconsistent by a crash."""
+        os.makedirs(self.directory, exist_ok=True)
+        windows = self._windows()
+        for window in windows:
+            self._recover(window)
+        self.remove_expired()
+        for columns in self.scan(start=windows[-1] if windows else None):
+            self._last_received_at = max(self._last_received_at, columns["received_at"][-1])
+
+    async def start(self):
+        await asyncio.to_thread(self.open)
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        self._close_files()
+
+    def _recover(self, window: int):
+        """
+        A crash can leave the columns of a segment with different lengths, or a partial item at
+        the end of a file. Every column is truncated to the number of rows complete in all of them.
+        """
+        path = self._segment_dir(window)
+        sizes = {}
+        for name, code in SEGMENT_COLUMNS.items():
+            try:
+                sizes[name] = os.path.getsize(os.path.join(path, name))
+            except FileNotFoundError:
+                sizes[name] = 0
+        rows = min(sizes[name] // array(code).itemsize for name, code in SEGMENT_COLUMNS.items())
+        for name, code in SEGMENT_COLUMNS.items():
+            size = rows * array(code).itemsize
+            if sizes[name] != size:
+                with open(os.path.join(path, name), "ab") as column:
+                    column.truncate(size)
+                self.recovered_bytes += sizes[name] - size
+                logger.warning("Segment %d: truncated torn tail of %s (%d bytes)", window, name, sizes[name] - size)
+
+    def remove_expired(self, now: float | None = None):
+        """Deletes the segments whose whole window is older than the retention period."""
+        limit = (now if now is not None else time.time()) - self.retention_seconds
+        for window in self._windows():
+            if window + self.segment_seconds > limit or window == self._window:
+                break
+            shutil.rmtree(self._segment_dir(window))
+            self.removed_segments += 1
+            logger.info("Segment %d removed by retention", window)
+
+    # --- Writes ---
+
+    def append(self, samples) -> asyncio.Future:
+        """Queues samples for the next commit. The returned future completes once they are on disk."""
+        # A clock stepping back must not break the receive-time order segments are searched by
+        received_at = max(time.time(), self._last_received_at)
+        batch = self._new_columns()
+        for data in samples:
+            batch["received_at"].append(received_at)
+            batch["device_id"].append(data.device_id)
+            for name, value in zip(COLUMNS, sample_row(data)):
+                batch[name].append(value)
+        # Only complete batches reach the pending columns, a value that does not fit leaves them aligned
+        for name, column in batch.items():
+            self._pending[name].extend(column)
+        self._last_received_at = received_at
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self._wakeup.set()
+        return future
+
+    async def run(self):
+        next_retention = time.monotonic() + RETENTION_CHECK_SECONDS
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), RETENTION_CHECK_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Commit failed: %s", e)
+            if time.monotonic() >= next_retention:
+                next_retention = time.monotonic() + RETENTION_CHECK_SECONDS
+                await asyncio.to_thread(self.remove_expired)
+
+    async def flush(self):
+        """Commits everything queued so far and resolves the futures waiting on it."""
+        if not self._waiters and not self._pending["received_at"]:
+            return
+        pending, waiters = self._pending, self._waiters
+        self._pending, self._waiters = self._new_columns(), []
+        start = time.monotonic()
+        try:
+            await asyncio.to_thread(self._write, pending)
+        except Exception as e:
+            self.failed_commits += 1
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+            raise
+        self.commits += 1
+        self.committed_rows += len(pending["received_at"])
+        self.last_commit_seconds = time.monotonic() - start
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _write(self, pending: dict):
+        received = pending["received_at"]
+        lo = 0
+        while lo < len(received):
+            window = int(received[lo] // self.segment_seconds) * self.segment_seconds
+            hi = bisect_left(received, window + self.segment_seconds, lo)
+            try:
+                self._write_window(window, {name: memoryview(column)[lo:hi] for name, column in pending.items()})
+            except Exception:
+                # Leave the segment consistent so the next commits stay aligned
+                self._close_files()
+                self._recover(window)
+                raise
+            lo = hi
+
+    def _write_window(self, window: int, rows: dict):
+        if window != self._window:
+            self._rotate(window)
+        for name, column in self._files.items():
+            column.write(rows[name])
+        for column in self._files.values():
+            column.flush()
+            os.fsync(column.fileno())
+
+    def _rotate(self, window: int):
+        self._close_files()
+        path = self._segment_dir(window)
+        created = not os.path.isdir(path)
+        os.makedirs(path, exist_ok=True)
+        self._files = {name: open(os.path.join(path, name), "ab") for name in SEGMENT_COLUMNS}
+        self._window = window
+        if created:
+            # The new directory entry must be durable too, not only the data written into it
+            directory = os.open(self.directory, os.O_RDONLY)
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+
+    def _close_files(self):
+        for column in self._files.values():
+            column.close()
+        self._files = {}
+        self._window = None
+
+    # --- Reads ---
+
+    def _map(self, window: int) -> dict | None:
+        """Read-only memoryviews over the committed rows of a segment, None if it has none."""
+        path = self._segment_dir(window)
+        try:
+            sizes = {name: os.path.getsize(os.path.join(path, name)) for name in SEGMENT_COLUMNS}
+        except FileNotFoundError:
+            return None
+        # A commit may be extending the files right now: only rows present in every column are mapped
+        rows = min(sizes[name] // array(code).itemsize for name, code in SEGMENT_COLUMNS.items())
+        if rows == 0:
+            return None
+        columns = {}
+        for name, code in SEGMENT_COLUMNS.items():
+            with open(os.path.join(path, name), "rb") as column:
+                mapped = mmap.mmap(column.fileno(), rows * array(code).itemsize, access=mmap.ACCESS_READ)
+            columns[name] = memoryview(mapped).cast(code)
+        return columns
+
+    def scan(self, start: float | None = None, end: float | None = None):
+        """
+        Yields, for every segment with rows received in [start, end), a dict of column name to
+        memoryview limited to those rows. Segments are in receive order, rows are located by
+        binary search on received_at and nothing is copied out of the mapped files.
+        """
+        for window in self._windows():
+            if start is not None and window + self.segment_seconds <= start:
+                continue
+            if end is not None and window >= end:
+                break
+            columns = self._map(window)
+            if columns is None:
+                continue
+            received = columns["received_at"]
+            lo = bisect_left(received, start) if start is not None else 0
+            hi = bisect_left(received, end) if end is not None else len(received)
+            if lo < hi:
+                yield {name: column[lo:hi] for name, column in columns.items()}
+
+    def stats(self) -> dict:
+        windows = self._windows()
+        disk_bytes = 0
+        for window in windows:
+            path = self._segment_dir(window)
+            disk_bytes += sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+        return {
+            "segments": len(windows),
+            "disk_bytes": disk_bytes,
+            "pending_rows": self.pending_rows,
+            "committed_rows": self.committed_rows,
+            "commits": self.commits,
+            "mean_rows_per_commit": self.committed_rows / self.commits if self.commits else 0.0,
+            "failed_commits": self.failed_commits,
+            "last_commit_seconds": self.last_commit_seconds,
+            "recovered_bytes": self.recovered_bytes,
+            "removed_segments": self.removed_segments,
+        }
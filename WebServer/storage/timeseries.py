@@ -0,0 +1,155 @@
+from array import array
+from datetime import datetime
+
+# Column name -> array typecode. One fixed-size typed array per column, no per-sample objects.
+COLUMNS = {
+    "timestamp": "d",
+    "operation_mode": "h",
+    "supply_temp": "d",
+    "return_temp": "d",
+    "outlet_pressure": "d",
+    "inlet_pressure": "d",
+    "instant_power": "d",
+    "pump_status": "b",
+    "error_message": "h",
+}
+NUMERIC_COLUMNS = ("supply_temp", "return_temp", "outlet_pressure", "inlet_pressure", "instant_power")
+DEFAULT_CAPACITY = 8640  # one day of samples at the simulator's 10 s upload interval
+
+
+def epoch_seconds(timestamp: str) -> float:
+    """ISO timestamp as epoch seconds, naive ones in local time: the order samples are stored and compared in."""
+    return datetime.fromisoformat(timestamp).timestamp()
+
+
+def sample_row(data) -> tuple:
+    """Values of a received sample in COLUMNS order, with the timestamp as epoch seconds."""
+    return (epoch_seconds(data.timestamp), data.operation_mode, data.supply_temp, data.return_temp,
+            data.outlet_pressure, data.inlet_pressure, data.instant_power, data.pump_status, data.error_message)
+
+
+class DeviceRingBuffer:
+    """Fixed-capacity columnar ring buffer of one device's samples. The oldest sample is overwritten when full."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        if capacity <= 0:
+            raise ValueError(f"Capacity must be positive, got {capacity}")
+        self.capacity = capacity
+        self._columns = {name: array(code, bytes(array(code).itemsize * capacity)) for name, code in COLUMNS.items()}
+        self._next = 0
+        self.count = 0
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(column.itemsize * len(column) for column in self._columns.values())
+
+    def append(self, data):
+        self.append_row(sample_row(data))
+
+    def append_row(self, row):
+        """Appends one sample given as its values in COLUMNS order."""
+        i = self._next
+        for column, value in zip(self._columns.values(), row):
+            column[i] = value
+        self._next = (i + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def _positions(self):
+        """Physical positions from the oldest to the newest sample."""
+        first = (self._next - self.count) % self.capacity
+        return [(first + i) % self.capacity for i in range(self.count)]
+
+    def _record(self, i) -> dict:
+        record = {name: column[i] for name, column in self._columns.items()}
+        record["timestamp"] = datetime.fromtimestamp(record["timestamp"]).isoformat()
+        record["pump_status"] = bool(record["pump_status"])
+        return record
+
+    def latest(self, n: int) -> list[dict]:
+        return [self._record(i) for i in self._positions()[-n:]] if n > 0 else []
+
+    def newest(self) -> dict | None:
+        """The sample with the latest timestamp, which is not always the last one appended."""
+        if self.count == 0:
+            return None
+        return self._record(max(self._positions(), key=self._columns["timestamp"].__getitem__))
+
+    def _positions_between(self, start: float, end: float):
+        # Linear scan: replayed spools can deliver a device's samples out of order
+        timestamps = self._columns["timestamp"]
+        return [i for i in self._positions() if start <= timestamps[i] <= end]
+
+    def range(self, start: datetime | None, end: datetime | None) -> list[dict]:
+        """Samples with start <= timestamp <= end, a missing bound is open."""
+        low = start.timestamp() if start is not None else float("-inf")
+        high = end.timestamp() if end is not None else float("inf")
+        return [self._record(i) for i in self._positions_between(low, high)]
+
+    def downsample(self, start: datetime, end: datetime | None, bucket_seconds: float) -> list[dict]:
+        """Min, max and average of every numeric column per bucket of bucket_seconds from start, empty buckets omitted."""
+        if bucket_seconds <= 0:
+            raise ValueError(f"Bucket size must be positive, got {bucket_seconds}")
+        origin = start.timestamp()
+        timestamps = self._columns["timestamp"]
+        buckets = {}
+        for i in self._positions_between(origin, end.timestamp() if end is not None else float("inf")):
+            key = int((timestamps[i] - origin) // bucket_seconds)
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = {"count": 0, **{name: [float("inf"), float("-inf"), 0.0] for name in NUMERIC_COLUMNS}}
+            bucket["count"] += 1
+            for name in NUMERIC_COLUMNS:
+                value = self._columns[name][i]
+                stats = bucket[name]
+                stats[0] = min(stats[0], value)
+                stats[1] = max(stats[1], value)
+                stats[2] += value
+
+        result = []
+        for key in sorted(buckets):
+            bucket = buckets[key]
+            count = bucket["count"]
+            row = {"start": datetime.fromtimestamp(origin + key * bucket_seconds).isoformat(), "count": count}
+            for name in NUMERIC_COLUMNS:
+                low, high, total = bucket[name]
+                row[name] = {"min": low, "max": high, "avg": total / count}
+            result.append(row)
+        return result
+
+
+class TimeSeriesStore:
+    """Ring buffers keyed by device_id, all with the same capacity, so memory grows by a fixed amount per device."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._buffers = {}
+
+    def _buffer(self, device_id: int) -> DeviceRingBuffer:
+        buffer = self._buffers.get(device_id)
+        if buffer is None:
+            buffer = self._buffers[device_id] = DeviceRingBuffer(self.capacity)
+        return buffer
+
+    def append(self, data):
+        self._buffer(data.device_id).append(data)
+
+    def load(self, segments) -> int:
+        """Refills the buffers from SegmentStore.scan() slices, oldest first. Returns the number of samples read."""
+        loaded = 0
+        for segment in segments:
+            device_ids = segment["device_id"]
+            columns = [segment[name] for name in COLUMNS]
+            for i in range(len(device_ids)):
+                self._buffer(device_ids[i]).append_row([column[i] for column in columns])
+            loaded += len(device_ids)
+        return loaded
+
+    def get(self, device_id: int) -> DeviceRingBuffer | None:
+        return self._buffers.get(device_id)
+
+    def items(self):
+        return self._buffers.items()
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(buffer.memory_bytes for buffer in self._buffers.values())
@@ -0,0 +1,118 @@
+"""
+Time from a BMS write of Boiler Enable to the Operating Status it causes, on a loopback BACnet link.
+
+A second BAC0 application plays the BMS: it subscribes in COV to the Operating Status of a
+simulated boiler, then disables and enables it in turn with WriteProperty, at a random phase of
+the tick, and times each write until the notification of Off (8), or of any other status after an
+enable: with long ticks a boiler can boot past Initialize within a single tick.
+"polled" applies the writes on the next periodic tick, as when every state read Boiler Enable
+in its handle; "event" lets the write wake the tick scheduler of the device.
+
+    python benchmarks/command_latency.py --tick_period 1 --writes 20
+"""
+import argparse
+import asyncio
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "DeviceSimulation"))
+
+import BAC0
+from bacpypes3.apdu import SubscribeCOVRequest
+from bacpypes3.pdu import Address
+from source.device.boiler import BoilerBacnetDevice
+from source.simulation.scheduler import TickScheduler
+from source.simulation.simulation import SimulationContext
+from source.simulation.states import INITIALIZE_STATE
+
+MODES = ("polled", "event")
+OFF_STATUS = 8
+
+
+async def simulate(context: SimulationContext, scheduler: TickScheduler, speed_factor: float, event_driven: bool):
+    # Without a scheduler in the context a write only flags the command, applied by the next periodic tick
+    context.scheduler = scheduler if event_driven else None
+    scheduler.start()
+    while True:
+        periods = await scheduler.next_tick()
+        context.tick(speed_factor * scheduler.period * periods)
+
+
+def summary(latencies: list[float]) -> str:
+    ordered = sorted(latencies)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    return (f"{sum(ordered) / len(ordered) * 1000:8.1f} {pick(0.5):8.1f} {pick(0.9):8.1f} {ordered[-1] * 1000:8.1f}")
+
+
+async def main(ip: str, server_port: int, client_port: int, tick_period: float, speed_factor: float, writes: int,
+               timeout: float):
+    boiler = BoilerBacnetDevice(name="CommandBoiler", ip=ip, port=server_port, device_id=4244)
+    await boiler.start()
+    client = BAC0.connect(ip=ip, port=client_port, deviceId=4245, localObjName="CommandClient")
+    app = client.this_application.app
+    address = Address(f"{ip.split('/')[0]}:{server_port}")
+    enable_id = boiler._objects["Boiler Enable"].objectIdentifier
+    status_id = boiler._objects["Operating Status"].objectIdentifier
+    loop = asyncio.get_running_loop()
+    awaited = {}    # "enabled" -> whether the boiler should leave Off, "future" -> time of the notification
+
+    async def status_notification(apdu):
+        status = int(apdu.listOfValues[0].value.cast_out(type(boiler._objects["Operating Status"].presentValue)))
+        future = awaited.get("future")
+        if future is not None and not future.done() and (status != OFF_STATUS) == awaited["enabled"]:
+            future.set_result(loop.time())
+
+    app.do_UnconfirmedCOVNotificationRequest = status_notification
+    request = SubscribeCOVRequest(subscriberProcessIdentifier=1, monitoredObjectIdentifier=status_id,
+                                  issueConfirmedNotifications=False, lifetime=0)
+    request.pduDestination = address
+    await app.request(request)
+
+    results = {}
+    try:
+        for mode in MODES:
+            context = SimulationContext(boiler, INITIALIZE_STATE, 0, 70.0)
+            scheduler = TickScheduler(tick_period)
+            task = asyncio.create_task(simulate(context, scheduler, speed_factor, mode == "event"))
+            await asyncio.sleep(2 * tick_period)
+            latencies = []
+            missed = 0
+            for i in range(writes):
+                enable = i % 2 == 1
+                await asyncio.sleep(random.uniform(0, tick_period))
+                future = loop.create_future()
+                awaited.update(enabled=enable, future=future)
+                written = loop.time()
+                await app.write_property(address, enable_id, "presentValue", "active" if enable else "inactive")
+                try:
+                    latencies.append(await asyncio.wait_for(future, timeout) - written)
+                except asyncio.TimeoutError:
+                    missed += 1
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            results[mode] = (latencies, missed)
+            # Next mode starts from an enabled boiler
+            await app.write_property(address, enable_id, "presentValue", "active")
+    finally:
+        client.disconnect()
+        await boiler.stop()
+
+    print(f"{writes} writes of Boiler Enable, tick period {tick_period} s, speed {speed_factor}")
+    print(f"{'mode':8} {'mean':>8} {'p50':>8} {'p90':>8} {'max':>8} {'missed':>7}  (write to status notification, ms)")
+    for mode, (latencies, missed) in results.items():
+        print(f"{mode:8} {summary(latencies) if latencies else ' ' * 35} {missed:7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency from a Boiler Enable write to the Operating Status it causes")
+    parser.add_argument("--ip", type=str, default="127.0.0.1/24", help="Local address with mask (default: 127.0.0.1/24)")
+    parser.add_argument("--server_port", type=int, default=47903, help="Port of the simulated boiler (default: 47903)")
+    parser.add_argument("--client_port", type=int, default=47904, help="Port of the BMS client (default: 47904)")
+    parser.add_argument("--tick_period", type=float, default=1, help="Wall-clock seconds between ticks (default: 1)")
+    parser.add_argument("--speed_factor", type=float, default=1, help="Simulated seconds per wall-clock second (default: 1)")
+    parser.add_argument("--writes", type=int, default=20, help="Writes per mode, disable and enable in turn (default: 20)")
+    parser.add_argument("--timeout", type=float, default=10, help="Seconds to wait for the status of a write (default: 10)")
+    args = parser.parse_args()
+    asyncio.run(main(args.ip, args.server_port, args.client_port, args.tick_period, args.speed_factor, args.writes,
+                     args.timeout))
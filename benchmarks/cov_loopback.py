@@ -0,0 +1,126 @@
+"""
+COV notifications against polled reads for one simulated boiler, on a loopback BACnet link.
+
+A second BAC0 application plays the BMS: it subscribes to every point of the boiler
+(SubscribeCOV, or SubscribeCOVProperty with --property_increment) and at the same time
+polls the same points with ReadProperty every --poll_interval seconds. Both see the same
+trajectory, so the counts compare the traffic of the two approaches directly. Every
+notification of an analog point is checked against the increment of its subscription.
+
+    python benchmarks/cov_loopback.py --ip 127.0.0.1/24 --duration 60 --speed_factor 10
+"""
+import argparse
+import asyncio
+import sys
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "DeviceSimulation"))
+
+import BAC0
+from bacpypes3.apdu import SubscribeCOVPropertyRequest, SubscribeCOVRequest
+from bacpypes3.pdu import Address
+from source.device.boiler import BoilerBacnetDevice
+from source.simulation.simulation import SimulationContext
+from source.simulation.states import INITIALIZE_STATE
+
+
+async def simulate(context: SimulationContext, speed_factor: float, tick_period: float):
+    while True:
+        context.tick(speed_factor * tick_period)
+        await asyncio.sleep(tick_period)
+
+
+async def poll(app, address: Address, objects: dict, interval: float, reads: Counter, changes: Counter):
+    last = {}
+    while True:
+        for name, object_id in objects.items():
+            value = await app.read_property(address, object_id, "presentValue")
+            reads[name] += 1
+            if name in last and value != last[name]:
+                changes[name] += 1
+            last[name] = value
+        await asyncio.sleep(interval)
+
+
+async def main(ip: str, server_port: int, client_port: int, duration: float, speed_factor: float, tick_period: float,
+               poll_interval: float, property_increment: float | None):
+    boiler = BoilerBacnetDevice(name="CovBoiler", ip=ip, port=server_port, device_id=4242)
+    await boiler.start()
+    client = BAC0.connect(ip=ip, port=client_port, deviceId=4243, localObjName="CovClient")
+    app = client.this_application.app
+    address = Address(f"{ip.split('/')[0]}:{server_port}")
+    objects = {name: obj.objectIdentifier for name, obj in boiler._objects.items()}
+    names = {object_id: name for name, object_id in objects.items()}
+    increments = {name: float(boiler._objects[name].covIncrement) for name in objects
+                  if getattr(boiler._objects[name], "covIncrement", None) is not None}
+    if property_increment is not None:
+        increments = {name: property_increment for name in increments}
+
+    notifications = Counter()
+    violations = Counter()
+    reported = {}
+
+    async def count_notification(apdu):
+        name = names[apdu.monitoredObjectIdentifier]
+        notifications[name] += 1
+        value = apdu.listOfValues[0].value.cast_out(type(getattr(boiler._objects[name], "presentValue")))
+        if name in reported and name in increments and abs(float(value) - float(reported[name])) < increments[name] - 1e-6:
+            violations[name] += 1
+        reported[name] = value
+
+    app.do_UnconfirmedCOVNotificationRequest = count_notification
+
+    for process_id, (name, object_id) in enumerate(objects.items(), start=1):
+        if property_increment is not None and name in increments:
+            request = SubscribeCOVPropertyRequest(
+                subscriberProcessIdentifier=process_id, monitoredObjectIdentifier=object_id,
+                issueConfirmedNotifications=False, lifetime=0,
+                monitoredPropertyIdentifier="present-value",
+                covIncrement=property_increment)
+        else:
+            request = SubscribeCOVRequest(subscriberProcessIdentifier=process_id, monitoredObjectIdentifier=object_id,
+                                          issueConfirmedNotifications=False, lifetime=0)
+        request.pduDestination = address
+        await app.request(request)
+
+    reads = Counter()
+    changes = Counter()
+    context = SimulationContext(boiler, INITIALIZE_STATE, 0, 70.0)
+    tasks = [asyncio.create_task(simulate(context, speed_factor, tick_period)),
+             asyncio.create_task(poll(app, address, objects, poll_interval, reads, changes))]
+    await asyncio.sleep(duration)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    service = f"SubscribeCOVProperty, increment {property_increment}" if property_increment is not None else "SubscribeCOV"
+    print(f"{duration:.0f} s at speed {speed_factor}, {service}, polling every {poll_interval} s")
+    print(f"{'point':22} {'increment':>9} {'notified':>9} {'polled':>7} {'changed':>8}")
+    for name in objects:
+        increment = f"{increments[name]:g}" if name in increments else "-"
+        print(f"{name:22} {increment:>9} {notifications[name]:9} {reads[name]:7} {changes[name]:8}")
+    total_reads = sum(reads.values())
+    total_notifications = sum(notifications.values())
+    print(f"notifications {total_notifications}, polled reads {total_reads} "
+          f"({total_reads / max(total_notifications, 1):.1f} reads per notification), "
+          f"reads that saw a change {sum(changes.values())}, increment violations {sum(violations.values())}")
+
+    client.disconnect()
+    await boiler.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="COV notifications against polling on a loopback BACnet link")
+    parser.add_argument("--ip", type=str, default="127.0.0.1/24", help="Local address with mask (default: 127.0.0.1/24)")
+    parser.add_argument("--server_port", type=int, default=47901, help="Port of the simulated boiler (default: 47901)")
+    parser.add_argument("--client_port", type=int, default=47902, help="Port of the subscribing client (default: 47902)")
+    parser.add_argument("--duration", type=float, default=60, help="Wall-clock seconds to run (default: 60)")
+    parser.add_argument("--speed_factor", type=float, default=10, help="Simulated seconds per wall-clock second (default: 10)")
+    parser.add_argument("--tick_period", type=float, default=1, help="Wall-clock seconds between ticks (default: 1)")
+    parser.add_argument("--poll_interval", type=float, default=1, help="Seconds between two polls of every point (default: 1)")
+    parser.add_argument("--property_increment", type=float, default=None,
+                        help="Subscribe the analog points with SubscribeCOVProperty and this increment instead of SubscribeCOV")
+    args = parser.parse_args()
+    asyncio.run(main(args.ip, args.server_port, args.client_port, args.duration, args.speed_factor, args.tick_period,
+                     args.poll_interval, args.property_increment))
@@ -0,0 +1,105 @@
+"""
+Python heap per simulated device for a large in-memory fleet, before and after a change.
+
+Devices and SimulationContexts are measured separately with tracemalloc, right after they are
+created and again after a headless run in which a share of the boilers is disabled, since
+states and timers created while running stay with the devices. --against measures the same
+fleet on another git revision, checked out in a temporary worktree, and prints both.
+
+    python benchmarks/device_memory.py --devices 10000
+    python benchmarks/device_memory.py --devices 10000 --against HEAD~1
+"""
+import argparse
+import gc
+import json
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+MEASURES = ("device", "context", "total", "after_run")
+
+
+def heap() -> int:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def measure(tree: Path, devices: int, duration: float, disabled: float) -> dict:
+    """Bytes per device of the fleet simulated by the DeviceSimulation package of tree."""
+    sys.path.insert(0, str(tree / "DeviceSimulation"))
+    from source.device.memory import InMemoryBoilerDevice
+    from source.simulation import states
+    from source.simulation.simulation import SimulationContext
+
+    # Trees without flyweight states build one InitializeState per device, like their callers did
+    shared_state = getattr(states, "INITIALIZE_STATE", None)
+    disabled_count = round(devices * disabled)
+
+    tracemalloc.start()
+    start = heap()
+    boilers = [InMemoryBoilerDevice(device_id=i) for i in range(1, devices + 1)]
+    after_devices = heap()
+    contexts = [SimulationContext(boiler, shared_state or states.InitializeState(), 0, 70.0) for boiler in boilers]
+    after_contexts = heap()
+    for context in contexts[:disabled_count]:
+        context.device.set_boiler_command(False)
+    for context in contexts:
+        context.run_headless(duration)
+    after_run = heap()
+    tracemalloc.stop()
+    return {
+        "device": (after_devices - start) / devices,
+        "context": (after_contexts - after_devices) / devices,
+        "total": (after_contexts - start) / devices,
+        "after_run": (after_run - start) / devices,
+    }
+
+
+def measure_revision(revision: str, devices: int, duration: float, disabled: float) -> dict:
+    """Runs this script on a temporary worktree of revision, in its own interpreter."""
+    with tempfile.TemporaryDirectory() as directory:
+        worktree = Path(directory) / "tree"
+        subprocess.run(["git", "worktree", "add", "--detach", str(worktree), revision], cwd=ROOT, check=True,
+                       capture_output=True)
+        try:
+            output = subprocess.run([sys.executable, __file__, "--tree", str(worktree), "--json", "--devices", str(devices),
+                                     "--duration", str(duration), "--disabled", str(disabled)],
+                                    check=True, capture_output=True, text=True).stdout
+        finally:
+            subprocess.run(["git", "worktree", "remove", "--force", str(worktree)], cwd=ROOT, check=True, capture_output=True)
+    return json.loads(output)
+
+
+def print_results(results: dict[str, dict], devices: int, duration: float, disabled: float):
+    print(f"{devices} in-memory boilers, {disabled:.0%} disabled, {duration:.0f} simulated s (bytes per device)")
+    print(f"{'tree':12} {'device':>9} {'context':>9} {'total':>9} {'after run':>10}")
+    for label, result in results.items():
+        print(f"{label:12} " + " ".join(f"{result[key]:{10 if key == 'after_run' else 9},.0f}" for key in MEASURES))
+    if len(results) == 2:
+        before, after = results.values()
+        print(f"{'change':12} " + " ".join(f"{after[key] / before[key] - 1 if before[key] else 0.0:{10 if key == 'after_run' else 9}.1%}"
+                                           for key in MEASURES))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory per simulated device")
+    parser.add_argument("--devices", type=int, default=10000)
+    parser.add_argument("--duration", type=float, default=3600, help="Simulated seconds of the headless run (default: 3600)")
+    parser.add_argument("--disabled", type=float, default=0.5, help="Share of boilers disabled before the run (default: 0.5)")
+    parser.add_argument("--against", type=str, default=None, help="Git revision to compare with, e.g. HEAD~1")
+    parser.add_argument("--tree", type=str, default=str(ROOT), help="Checkout whose DeviceSimulation is measured (default: this one)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON only")
+    args = parser.parse_args()
+
+    current = measure(Path(args.tree), args.devices, args.duration, args.disabled)
+    if args.json:
+        print(json.dumps(current))
+    else:
+        results = {}
+        if args.against:
+            results[args.against] = measure_revision(args.against, args.devices, args.duration, args.disabled)
+        results["this tree"] = current
+        print_results(results, args.devices, args.duration, args.disabled)
@@ -0,0 +1,120 @@
+"""
+Startup time of a fleet of BACnet boilers, before and after compiled device types.
+
+Before, every device defined its 21 objects through the BAC0 object factory: a global registry
+cleared for each device, a dynamic class and a full property cast per object. Now the boiler
+type is compiled once from types/boiler.json into prototype objects that every device clones.
+Both variants connect the same number of devices on consecutive local ports.
+
+    python benchmarks/device_startup.py --ip 127.0.0.1/24 --devices 1000
+"""
+import argparse
+import asyncio
+import sys
+import time
+from functools import partial
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "DeviceSimulation"))
+
+from BAC0.core.devices.local.factory import analog_input, analog_output, ObjectFactory, analog_value, multistate_value, \
+    binary_value, make_state_text
+from bacpypes3.local.cov import GenericCriteria
+from bacpypes3.local.multistate import MultiStateValueObject
+from source.device.boiler import BoilerBacnetDevice
+from source.device.cov import enable_cov_property
+from source.simulation.fleet import current_rss_bytes
+
+
+class LegacyBoiler(BoilerBacnetDevice):
+    """Previous object definition: every object built by the BAC0 factory for every device."""
+
+    def _defining_objects(self):
+        ObjectFactory.clear_objects()
+        ao = analog_output(name="Supply Setpoint", description="Water temperature setpoint", properties={"units": "degreesCelsius"}, presentValue=70)
+        analog_input(name="Supply Temp", description="Temperature of the water leaving the boiler", properties={"units": "degreesCelsius"}, presentValue=20)
+        analog_input(name="Return Temp", description="Temperature of the water returning to the boiler", properties={"units": "degreesCelsius"}, presentValue=20)
+        analog_input(name="Stack Temp", description="Temperature of the exhaust gases", properties={"units": "degreesCelsius"}, presentValue=25)
+        analog_input(name="Air Temp", description="Ambient air temperature", properties={"units": "degreesCelsius"}, presentValue=25)
+        analog_input(name="Inlet Pressure", description="Pressione dell'acqua in entrata alla caldaia", properties={"units": "bars"}, presentValue=2)
+        analog_input(name="Outlet Pressure", description="Pressione dell'acqua in uscita dalla caldaia", properties={"units": "bars"}, presentValue=1.5)
+        analog_input(name="Flow Rate", description="Water flow rate", properties={"units": "litersPerMinute"}, presentValue=0)
+        analog_input(name="Fan Speed", description="Fan rotational speed", properties={"units": "revolutionsPerMinute"}, presentValue=0)
+        analog_input(name="Boiler Instant Power", description="Boiler instantaneous power", properties={"units": "kilowatts"}, presentValue=0)
+        analog_value(name="Required Pressure", description="Target pressure requested by the system", properties={"units": "bars"}, presentValue=1.2)
+        analog_value(name="Power On Seconds", description="Total seconds the boiler has been powered on", properties={"units": "seconds"}, presentValue=0)
+        analog_value(name="Burner On Seconds", description="Total seconds the burner has been active", properties={"units": "seconds"}, presentValue=0)
+        analog_value(name="Ignition Starts", description="Total number of burner ignitions", presentValue=0)
+        binary_value(name="Pump", description="Pump status", presentValue=False, inactiveText="Off", activeText="On")
+        binary_value(name="Burner", description="Burner status", presentValue=False, inactiveText="Off", activeText="On")
+        binary_value(name="Boiler Enable", description="Boiler enable command", presentValue=True, inactiveText="Disabled", activeText="Enabled")
+        binary_value(name="Boiler Over Temp", description="Boiler over-temperature alarm", presentValue=False, inactiveText="No", activeText="Yes")
+        multistate_value(name="Operating Status", description="Operational status of the boiler", presentValue=10,
+                         stateText=make_state_text(["Standby", "Purging", "Igniting", "Heating", "Error", "Initialize", "Restart", "Off"]))
+        multistate_value(name="Error Message", description="Boiler Error Message", presentValue=1,
+                         stateText=make_state_text(["None", "Low Water Pressure"]))
+        ob = multistate_value(name="Service Mode", description="Boiler service mode",
+                              stateText=make_state_text(["Normal Operation", "Service Standby", "Restart"]))
+        ob.add_objects_to_application(self._device)
+
+        self._objects = {name: self._device[name] for name in ob.objects}
+        for name, obj in self._objects.items():
+            obj._property_monitors["presentValue"].append(partial(self._on_point_changed, name))
+            if name in self._type.cov_increments:
+                obj.covIncrement = self._type.cov_increments[name]
+            elif isinstance(obj, MultiStateValueObject):
+                obj._cov_criteria = GenericCriteria
+        enable_cov_property(self._device.this_application.app)
+        self.refresh()
+
+
+class TimedBoiler(BoilerBacnetDevice):
+    define_seconds = 0.0
+
+    def _defining_objects(self):
+        start = time.perf_counter()
+        super()._defining_objects()
+        TimedBoiler.define_seconds += time.perf_counter() - start
+
+
+class TimedLegacyBoiler(LegacyBoiler):
+    define_seconds = 0.0
+
+    def _defining_objects(self):
+        start = time.perf_counter()
+        super()._defining_objects()
+        TimedLegacyBoiler.define_seconds += time.perf_counter() - start
+
+
+async def start_fleet(device_class, ip: str, first_port: int, first_device_id: int, devices: int):
+    boilers = []
+    rss_before = current_rss_bytes()
+    start = time.perf_counter()
+    for index in range(devices):
+        boiler = device_class(name=f"Boiler{first_device_id + index}", ip=ip, port=first_port + index,
+                              device_id=first_device_id + index)
+        await boiler.start()
+        boilers.append(boiler)
+    elapsed = time.perf_counter() - start
+    rss = current_rss_bytes() - rss_before
+    for boiler in boilers:
+        await boiler.stop()
+    return elapsed, device_class.define_seconds, rss
+
+
+async def main(ip: str, first_port: int, devices: int):
+    variants = [("before (BAC0 factory)", TimedLegacyBoiler), ("after (prototypes)", TimedBoiler)]
+    for offset, (label, device_class) in enumerate(variants):
+        elapsed, define_seconds, rss = await start_fleet(device_class, ip, first_port + offset * devices,
+                                                         100000 + offset * devices, devices)
+        print(f"{label:22} {devices} devices in {elapsed:7.2f} s ({1000 * elapsed / devices:6.2f} ms/device), "
+              f"objects {1000 * define_seconds / devices:6.2f} ms/device, RSS +{rss / devices / 1024:.0f} KiB/device")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Startup time of BACnet boilers before and after device prototypes")
+    parser.add_argument("--ip", type=str, default="127.0.0.1/24", help="Local address with mask (default: 127.0.0.1/24)")
+    parser.add_argument("--first_port", type=int, default=50000, help="First UDP port, each variant uses --devices ports (default: 50000)")
+    parser.add_argument("--devices", type=int, default=1000, help="Devices started by each variant (default: 1000)")
+    args = parser.parse_args()
+    asyncio.run(main(args.ip, args.first_port, args.devices))
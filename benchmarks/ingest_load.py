@@ -0,0 +1,130 @@
+"""
+Samples per second stored through /device/upload (one sample per request) and
+/device/upload/batch (many samples per request), with 1k simulated devices.
+The server answers 202 once a sample is queued, each measure ends when its ingest queue is drained.
+
+Starts the WebServer app on a local uvicorn instance, unless --url points to a running one.
+
+    python benchmarks/ingest_load.py --devices 1000 --rounds 5 --batch_size 500
+"""
+import argparse
+import asyncio
+import contextlib
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import aiohttp
+import uvicorn
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "WebServer"))
+
+HEADERS = {"Authorization": "EXAMPLE_API_KEY"}
+
+
+def make_sample(device_id: int) -> dict:
+    return {
+        "device_id": device_id,
+        "timestamp": datetime.now().isoformat(),
+        "operation_mode": 4,
+        "supply_temp": 65.2,
+        "return_temp": 38.9,
+        "outlet_pressure": 2.3,
+        "inlet_pressure": 2.5,
+        "instant_power": 210.0,
+        "pump_status": True,
+        "error_message": 1,
+    }
+
+
+@contextlib.contextmanager
+def local_server(port: int):
+    from controller import device_controller
+    from server import app
+
+    # Segments go to a scratch directory, the fsync of every group commit is part of the measure
+    scratch = tempfile.TemporaryDirectory()
+    device_controller.segment_store.directory = scratch.name
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+        scratch.cleanup()
+
+
+async def wait_drained(session, url: str):
+    """Polls /metrics until the ingest workers have processed every accepted sample."""
+    while True:
+        async with session.get(f"{url}/metrics") as response:
+            text = await response.text()
+        queued = next(float(line.split()[1]) for line in text.splitlines()
+                      if line.startswith("webserver_ingest_queued_samples "))
+        if queued == 0:
+            return
+        await asyncio.sleep(0.01)
+
+
+async def single_endpoint(session, url: str, devices: int, rounds: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def post(device_id):
+        async with semaphore:
+            async with session.post(f"{url}/device/upload", json=make_sample(device_id), headers=HEADERS) as response:
+                assert response.status == 202, response.status
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(post(device_id) for device_id in range(devices)))
+    await wait_drained(session, url)
+    return devices * rounds / (time.perf_counter() - start)
+
+
+async def batch_endpoint(session, url: str, devices: int, rounds: int, batch_size: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        samples = [make_sample(device_id) for device_id in range(devices)]
+        for i in range(0, devices, batch_size):
+            async with session.post(f"{url}/device/upload/batch", json=samples[i:i + batch_size], headers=HEADERS) as response:
+                assert response.status == 202, response.status
+    await wait_drained(session, url)
+    return devices * rounds / (time.perf_counter() - start)
+
+
+async def run(url: str, devices: int, rounds: int, batch_size: int, concurrency: int):
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+        single = await single_endpoint(session, url, devices, rounds, concurrency)
+        batch = await batch_endpoint(session, url, devices, rounds, batch_size)
+    return single, batch
+
+
+def main(url: str | None, port: int, devices: int, rounds: int, batch_size: int, concurrency: int):
+    if url:
+        single, batch = asyncio.run(run(url, devices, rounds, batch_size, concurrency))
+    else:
+        with local_server(port) as local_url:
+            single, batch = asyncio.run(run(local_url, devices, rounds, batch_size, concurrency))
+
+    print(f"{devices} devices x {rounds} rounds")
+    print(f"  /device/upload        {single:10,.0f} samples/s")
+    print(f"  /device/upload/batch  {batch:10,.0f} samples/s (batches of {batch_size}), {batch / single:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingestion load test")
+    parser.add_argument("--url", type=str, default=None, help="Running WebServer, e.g. http://localhost:8099")
+    parser.add_argument("--port", type=int, default=8199, help="Port of the local uvicorn instance")
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--batch_size", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+    main(args.url, args.port, args.devices, args.rounds, args.batch_size, args.concurrency)
@@ -0,0 +1,102 @@
+"""
+BACnet property accesses and time per tick on BoilerBacnetDevice, before and after the point image.
+
+Before the image every getter and setter looked the object up by name through BAC0
+and accessed its presentValue. Now handles are resolved once, the image is read in one
+pass at startup and kept current by property monitors, and commit() writes back only
+the points that changed during the tick. Both variants run against a real BAC0 device
+on a local address.
+
+    python benchmarks/point_access.py --ip 127.0.0.1/24 --port 47998 --ticks 2000
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "DeviceSimulation"))
+
+import BAC0
+from bacpypes3.basetypes import BinaryPV
+from source.device.boiler import BoilerBacnetDevice
+from source.simulation.simulation import SimulationContext
+from source.simulation.states import INITIALIZE_STATE
+
+
+class LegacyBoiler(BoilerBacnetDevice):
+    """Previous access path: name lookup and presentValue access on every call."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lookups = 0
+        self.accesses = 0
+
+    def commit(self):
+        pass
+
+    def _read_point(self, name: str):
+        self.lookups += 1
+        self.accesses += 1
+        return self._device[name].presentValue
+
+    def _write_point(self, name: str, value):
+        self.lookups += 1
+        self.accesses += 1
+        self._device[name].presentValue = value
+
+    def _read_binary(self, name: str) -> bool:
+        return self._read_point(name) == BinaryPV.active
+
+
+class ImageBoiler(BoilerBacnetDevice):
+    """Current access path, counting the presentValue accesses of refresh() and commit()."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lookups = 0
+        self.accesses = 0
+
+    def refresh(self):
+        self.accesses += len(self._objects)
+        super().refresh()
+
+    def commit(self):
+        self.accesses += len(self._dirty)
+        super().commit()
+
+
+def run_ticks(boiler, ticks: int):
+    context = SimulationContext(boiler, INITIALIZE_STATE, 0, 70.0)
+    boiler.lookups = boiler.accesses = 0
+    start = time.perf_counter()
+    for tick in range(ticks):
+        context.tick(1)
+        # An upload reads ten points every interval_send_data ticks
+        if tick % context.interval_send_data == 0:
+            context.collect_sample()
+    elapsed = time.perf_counter() - start
+    return elapsed / ticks, boiler.lookups / ticks, boiler.accesses / ticks
+
+
+async def main(ip: str, port: int, ticks: int):
+    BAC0.log_level("silence")
+    # BAC0 keeps track of addresses it has used, so each variant gets its own port
+    for offset, (label, boiler_class) in enumerate((("before", LegacyBoiler), ("after", ImageBoiler))):
+        boiler = boiler_class(name="Boiler1", ip=ip, port=port + offset, device_id=1)
+        await boiler.start()
+        try:
+            per_tick, lookups, accesses = run_ticks(boiler, ticks)
+        finally:
+            await boiler.stop()
+        print(f"{label:>6}: {per_tick * 1e6:7.1f} us/tick, {lookups:5.1f} name lookups/tick, "
+              f"{accesses:5.1f} presentValue accesses/tick")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Point access micro-benchmark")
+    parser.add_argument("--ip", type=str, default="127.0.0.1/24")
+    parser.add_argument("--port", type=int, default=47998)
+    parser.add_argument("--ticks", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.ip, args.port, args.ticks))
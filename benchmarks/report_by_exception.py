@@ -0,0 +1,99 @@
+"""
+Upload volume of full samples against report-by-exception frames, for a mostly idle fleet.
+
+Headless boilers run for --duration simulated seconds: a share of them cycles normally, the rest is
+disabled and sits in OffState once cooled down. Every sample they would upload goes
+through a DeltaEncoder, and the frames through the server's FrameReassembler: besides frames and
+JSON bytes, the benchmark checks that the state the server rebuilds never strays from the simulated
+one by more than the deadband of a field.
+
+    python benchmarks/report_by_exception.py --devices 300 --active 0.1 --duration 86400
+"""
+import argparse
+import json
+import sys
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "DeviceSimulation"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "WebServer"))
+
+from controller.frames import FrameReassembler
+from models.device import ReceivedDeviceFrame
+from source.device.memory import InMemoryBoilerDevice
+from source.simulation.deadband import DEFAULT_DEADBANDS, DEFAULT_HEARTBEAT, FRAME_FIELDS, DeadbandPolicy, DeltaEncoder
+from source.simulation.simulation import SimulationContext
+from source.simulation.states import INITIALIZE_STATE
+
+
+def fleet_groups(devices: int, active: float) -> dict[str, list[SimulationContext]]:
+    """Active boilers cycle normally, the idle rest is disabled."""
+    active_count = round(devices * active)
+    groups = defaultdict(list)
+    for device_id in range(1, devices + 1):
+        group = "active" if device_id <= active_count else "disabled"
+        device = InMemoryBoilerDevice(device_id=device_id)
+        if group == "disabled":
+            device.set_boiler_command(False)
+        groups[group].append(SimulationContext(device, INITIALIZE_STATE, 0, 70.0))
+    return groups
+
+
+def run_group(contexts: list[SimulationContext], policy: DeadbandPolicy, duration: float) -> dict:
+    totals = defaultdict(float)
+    worst = defaultdict(float)      # field -> largest error of the rebuilt state, in deadbands
+    reassembler = FrameReassembler()
+    for context in contexts:
+        encoder = DeltaEncoder(policy)
+        samples = []
+        context.run_headless(duration, on_sample=samples.append, start_time=datetime(2025, 1, 1))
+        rebuilt = None
+        for sample in samples:
+            totals["samples"] += 1
+            totals["sample_bytes"] += len(json.dumps(sample))
+            frame = encoder.frame(sample, context.interval_send_data)
+            if frame is not None:
+                totals["frames"] += 1
+                totals["frame_bytes"] += len(json.dumps(frame))
+                rebuilt = reassembler.apply(ReceivedDeviceFrame.model_validate(frame))
+            for name in FRAME_FIELDS:
+                error = abs(float(sample[name]) - float(getattr(rebuilt, name)))
+                deadband = policy.deadbands.get(name)
+                if deadband:
+                    worst[name] = max(worst[name], error / deadband)
+                elif error:
+                    worst[name] = float("inf")
+    totals["full_frames"] = reassembler.full_frames
+    totals["worst"] = max(worst.values(), default=0.0)
+    return totals
+
+
+def main(devices: int, active: float, duration: float, heartbeat: float):
+    policy = DeadbandPolicy(dict(DEFAULT_DEADBANDS), heartbeat)
+    print(f"{devices} devices for {duration:.0f} simulated s, heartbeat {heartbeat:.0f} s, deadbands {policy.deadbands}")
+    print(f"{'group':9} {'devices':>7} {'samples':>9} {'frames':>8} {'full':>7} {'sample KiB':>11} {'frame KiB':>10} "
+          f"{'reduction':>9} {'max error':>10}")
+    overall = defaultdict(float)
+    for group, contexts in fleet_groups(devices, active).items():
+        totals = run_group(contexts, policy, duration)
+        for key in ("samples", "frames", "full_frames", "sample_bytes", "frame_bytes"):
+            overall[key] += totals[key]
+        overall["worst"] = max(overall["worst"], totals["worst"])
+        print(f"{group:9} {len(contexts):7} {totals['samples']:9.0f} {totals['frames']:8.0f} {totals['full_frames']:7.0f} "
+              f"{totals['sample_bytes'] / 1024:11.0f} {totals['frame_bytes'] / 1024:10.0f} "
+              f"{totals['sample_bytes'] / totals['frame_bytes']:8.1f}x {totals['worst']:9.2f}db")
+    print(f"{'fleet':9} {devices:7} {overall['samples']:9.0f} {overall['frames']:8.0f} {overall['full_frames']:7.0f} "
+          f"{overall['sample_bytes'] / 1024:11.0f} {overall['frame_bytes'] / 1024:10.0f} "
+          f"{overall['sample_bytes'] / overall['frame_bytes']:8.1f}x {overall['worst']:9.2f}db")
+    print("max error: largest gap between the simulated and the rebuilt value of a field, in deadbands (at most 1)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upload volume with report by exception")
+    parser.add_argument("--devices", type=int, default=300)
+    parser.add_argument("--active", type=float, default=0.1, help="Share of normally cycling boilers (default: 0.1)")
+    parser.add_argument("--duration", type=float, default=86400, help="Simulated seconds (default: one day)")
+    parser.add_argument("--heartbeat", type=float, default=DEFAULT_HEARTBEAT, help="Simulated seconds between full frames")
+    args = parser.parse_args()
+    main(args.devices, args.active, args.duration, args.heartbeat)
@@ -0,0 +1,59 @@
+"""
+Trajectories of the headless simulation for several tick lengths, compared with 1 s ticks:
+every state is integrated exactly and split at its thresholds, so the samples should match
+whatever the tick length, while longer ticks and jumps from sample to sample cost less.
+
+    python benchmarks/step_size.py --duration 604800
+"""
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "DeviceSimulation"))
+
+from source.device.memory import InMemoryBoilerDevice
+from source.simulation.simulation import SimulationContext
+from source.simulation.states import INITIALIZE_STATE
+
+SCENARIOS = [(0, 70.0), (1, 60.0), (0, 80.0)]  # (simulation_mode, initial_setpoint)
+TICK_LENGTHS = [0.5, 10, 100, 1000, None]     # None: each tick jumps to the next sample
+
+
+def run(simulation_mode: int, setpoint: float, duration: float, tick_length: float | None):
+    context = SimulationContext(InMemoryBoilerDevice(device_id=1), INITIALIZE_STATE, simulation_mode, setpoint)
+    samples = []
+    start = time.perf_counter()
+    ticks = context.run_headless(duration, tick_length, on_sample=samples.append, start_time=datetime(2025, 1, 1))
+    return samples, ticks, time.perf_counter() - start
+
+
+def max_deviation(reference: list[dict], samples: list[dict]) -> float:
+    deviation = 0.0
+    for expected, actual in zip(reference, samples, strict=True):
+        for key, value in expected.items():
+            if key != "timestamp":
+                deviation = max(deviation, abs(float(value) - float(actual[key])))
+    return deviation
+
+
+def main(duration: float):
+    for simulation_mode, setpoint in SCENARIOS:
+        reference, ticks, elapsed = run(simulation_mode, setpoint, duration, 1)
+        print(f"mode={simulation_mode} setpoint={setpoint}: 1 s ticks, {ticks} ticks in {elapsed:.2f} s")
+        for tick_length in TICK_LENGTHS:
+            samples, ticks, elapsed = run(simulation_mode, setpoint, duration, tick_length)
+            label = f"{tick_length} s ticks" if tick_length else "sample to sample"
+            print(f"  {label:18} {ticks:9} ticks in {elapsed:6.2f} s, max deviation {max_deviation(reference, samples):.2e}")
+
+        context = SimulationContext(InMemoryBoilerDevice(device_id=1), INITIALIZE_STATE, simulation_mode, setpoint)
+        start = time.perf_counter()
+        ticks = context.run_headless(duration)
+        print(f"  {'no samples':18} {ticks:9} ticks in {time.perf_counter() - start:6.2f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trajectory and cost for several tick lengths")
+    parser.add_argument("--duration", type=float, default=2 * 24 * 3600, help="Simulated seconds (default: two days)")
+    main(parser.parse_args().duration)
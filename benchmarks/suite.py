@@ -0,0 +1,276 @@
+"""
+Benchmark suite: state-machine ticks, BACnet point access, HTTP ingestion and memory per device.
+
+Results are written as JSON and compared against a stored baseline: a metric that got worse
+by more than --tolerance is reported as a regression and the exit status is 1. The baseline
+is machine-specific, record it once on the machine that runs the comparisons.
+
+    python benchmarks/suite.py --output results.json --update-baseline
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --cases ticks,memory
+"""
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import aiohttp
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "DeviceSimulation"))
+sys.path.insert(0, str(ROOT / "WebServer"))
+
+from ingest_load import HEADERS, local_server, make_sample, wait_drained
+from source.device.memory import InMemoryBoilerDevice
+from source.simulation import states
+from source.simulation.simulation import SimulationContext
+from source.simulation.uploader import TelemetryUploader
+
+CASES = ("ticks", "points", "upload", "memory")
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+
+def metric(value: float, unit: str, better: str) -> dict:
+    return {"value": value, "unit": unit, "better": better}
+
+
+def percentile(ordered: list, q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# --- CASES ----
+def bench_ticks(ticks: int) -> dict:
+    """Ticks per second with each State subclass kept active, on an in-memory device."""
+    results = {}
+    for name, state in states.STATES.items():
+        context = SimulationContext(InMemoryBoilerDevice(device_id=1), state, 0, 70.0)
+        for _ in range(ticks // 10):  # warm-up
+            context.tick(1)
+            context.state = state
+        start = time.perf_counter()
+        for _ in range(ticks):
+            context.tick(1)
+            # Forced back, so every tick measures this handler and not the ones it leads to
+            context.state = state
+        results[f"ticks.{name}"] = metric(ticks / (time.perf_counter() - start), "ticks/s", "higher")
+    return results
+
+
+async def bench_points(ip: str, port: int, iterations: int) -> dict:
+    """Cost of the BoilerBacnetDevice getters, setters, commit() and refresh() on a real BAC0 device."""
+    import BAC0
+    from source.device.boiler import BoilerBacnetDevice
+
+    BAC0.log_level("silence")
+    boiler = BoilerBacnetDevice(name="Boiler1", ip=ip, port=port, device_id=1)
+    await boiler.start()
+    try:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            boiler.get_supply_temperature()
+        get_cost = (time.perf_counter() - start) / iterations
+
+        start = time.perf_counter()
+        for i in range(iterations):
+            boiler.set_supply_temperature(float(i))
+        set_cost = (time.perf_counter() - start) / iterations
+
+        start = time.perf_counter()
+        for i in range(iterations):
+            boiler.set_supply_temperature(float(i))
+            boiler.commit()
+        commit_cost = (time.perf_counter() - start) / iterations - set_cost
+
+        refresh_iterations = max(iterations // 100, 1)
+        start = time.perf_counter()
+        for _ in range(refresh_iterations):
+            boiler.refresh()
+        refresh_cost = (time.perf_counter() - start) / refresh_iterations
+    finally:
+        await boiler.stop()
+    return {
+        "points.get": metric(get_cost * 1e6, "us", "lower"),
+        "points.set": metric(set_cost * 1e6, "us", "lower"),
+        "points.commit_one_dirty": metric(commit_cost * 1e6, "us", "lower"),
+        "points.refresh": metric(refresh_cost * 1e6, "us", "lower"),
+    }
+
+
+async def bench_upload(url: str, requests: int, concurrency: int, batch_size: int) -> dict:
+    """
+    One sample per POST to /device/upload, the way a device used to send its data, with its latency
+    percentiles, then the same samples through TelemetryUploader to /device/upload/batch.
+    """
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def post(session, device_id):
+        async with semaphore:
+            start = time.perf_counter()
+            async with session.post(f"{url}/device/upload", json=make_sample(device_id), headers=HEADERS) as response:
+                assert response.status == 202, response.status
+            latencies.append(time.perf_counter() - start)
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(post(session, i % 1000) for i in range(requests)))
+        await wait_drained(session, url)
+        single_rate = requests / (time.perf_counter() - start)
+
+        uploader = TelemetryUploader(session, url=f"{url}/device/upload/batch", max_queue=requests, max_batch=batch_size)
+        for i in range(requests):
+            uploader.submit(make_sample(i % 1000))
+        start = time.perf_counter()
+        await uploader.close()
+        await wait_drained(session, url)
+        batch_rate = uploader.sent_samples / (time.perf_counter() - start)
+        assert uploader.sent_samples == requests, uploader.stats()
+
+    latencies.sort()
+    return {
+        "upload.single_throughput": metric(single_rate, "samples/s", "higher"),
+        "upload.single_latency_p50": metric(percentile(latencies, 0.50) * 1000, "ms", "lower"),
+        "upload.single_latency_p99": metric(percentile(latencies, 0.99) * 1000, "ms", "lower"),
+        "upload.batch_throughput": metric(batch_rate, "samples/s", "higher"),
+    }
+
+
+async def bench_bacnet_memory(ip: str, port: int, devices: int) -> float:
+    """Python heap per BoilerBacnetDevice with its SimulationContext, BAC0 stack included."""
+    import BAC0
+    from source.device.boiler import BoilerBacnetDevice
+
+    BAC0.log_level("silence")
+    boilers = []
+    contexts = []
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    try:
+        for i in range(devices):
+            boiler = BoilerBacnetDevice(name="Boiler1", ip=ip, port=port + i, device_id=i + 1)
+            await boiler.start()
+            boilers.append(boiler)
+            contexts.append(SimulationContext(boiler, states.INITIALIZE_STATE, 0, 70.0))
+        used = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+        for boiler in boilers:
+            await boiler.stop()
+    return used / devices
+
+
+def bench_memory(devices: int) -> dict:
+    """Python heap per simulated device (device plus SimulationContext), measured with tracemalloc."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    contexts = [SimulationContext(InMemoryBoilerDevice(device_id=i), states.INITIALIZE_STATE, 0, 70.0)
+                for i in range(devices)]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del contexts
+    return {"memory.in_memory_device": metric(used / devices, "bytes", "lower")}
+
+
+# --- RESULTS ----
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Prints every metric next to its baseline value and returns the names of the regressions."""
+    regressions = []
+    for name, current in sorted(results.items()):
+        reference = baseline.get(name)
+        if reference is None or not reference["value"]:
+            print(f"  {name:34} {current['value']:14,.2f} {current['unit']:9} (no baseline)")
+            continue
+        change = current["value"] / reference["value"] - 1
+        worse = -change if current["better"] == "higher" else change
+        flag = ""
+        if worse > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"  {name:34} {current['value']:14,.2f} {current['unit']:9} {change:+8.1%} vs {reference['value']:,.2f}{flag}")
+    return regressions
+
+
+async def run_cases(cases, args) -> dict:
+    results = {}
+    if "ticks" in cases:
+        results.update(bench_ticks(args.ticks))
+    if "points" in cases:
+        results.update(await bench_points(args.ip, args.bacnet_port, args.iterations))
+    if "memory" in cases:
+        results.update(bench_memory(args.memory_devices))
+        per_device = await bench_bacnet_memory(args.ip, args.bacnet_port + 1, args.bacnet_devices)
+        results["memory.bacnet_device"] = metric(per_device, "bytes", "lower")
+    return results
+
+
+def main(args) -> int:
+    cases = [case.strip() for case in args.cases.split(",")]
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        raise SystemExit(f"Unknown cases {sorted(unknown)}, expected some of {CASES}")
+
+    results = asyncio.run(run_cases(cases, args))
+    if "upload" in cases:
+        # The server runs in its own thread and event loop, outside the measured client loop
+        with local_server(args.http_port) as url:
+            results.update(asyncio.run(bench_upload(url, args.requests, args.concurrency, args.batch_size)))
+
+    report = {
+        "meta": {
+            "time": datetime.now().isoformat(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+        },
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        baseline_path.write_text(json.dumps(report, indent=2))
+        print(f"Baseline written to {baseline_path}")
+
+    baseline = json.loads(baseline_path.read_text())["results"] if baseline_path.exists() else {}
+    if not baseline:
+        print(f"No baseline at {baseline_path}, run with --update-baseline to record one")
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark suite with baseline comparison")
+    parser.add_argument("--cases", type=str, default=",".join(CASES), help=f"Comma-separated cases (default: {','.join(CASES)})")
+    parser.add_argument("--output", type=str, default=None, help="JSON file for the results")
+    parser.add_argument("--baseline", type=str, default=str(DEFAULT_BASELINE), help="Baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Relative worsening reported as a regression (default: 0.10)")
+    parser.add_argument("--ticks", type=int, default=20000, help="Ticks per State subclass")
+    parser.add_argument("--ip", type=str, default="127.0.0.1/24", help="Address of the BACnet devices")
+    parser.add_argument("--bacnet_port", type=int, default=47900, help="First UDP port of the BACnet devices")
+    parser.add_argument("--iterations", type=int, default=20000, help="Calls per point access measure")
+    parser.add_argument("--http_port", type=int, default=8198, help="Port of the local uvicorn instance")
+    parser.add_argument("--requests", type=int, default=5000, help="Samples sent to each upload endpoint")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--batch_size", type=int, default=500)
+    parser.add_argument("--memory_devices", type=int, default=10000, help="In-memory devices for the memory measure")
+    parser.add_argument("--bacnet_devices", type=int, default=10, help="BACnet devices for the memory measure")
+    sys.exit(main(parser.parse_args()))
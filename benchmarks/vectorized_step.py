@@ -0,0 +1,97 @@
+"""
+Time of one vectorized fleet tick for a large fleet, and a check that the vectorized engine
+follows the same trajectories as the per-object State classes.
+A tick is what VectorizedBoilerFleet.run does: pull_commands, step and publish. pull_commands and
+publish loop over the devices in Python and are timed apart from the NumPy step. They run on
+in-memory devices here: BACnet devices make them slower, so the figures are a lower bound.
+
+    python benchmarks/vectorized_step.py --devices 10000 --ticks 600 --verify
+"""
+import argparse
+import math
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "DeviceSimulation"))
+
+from source.device.memory import InMemoryBoilerDevice
+from source.simulation.simulation import SimulationContext
+from source.simulation.states import INITIALIZE_STATE
+from source.simulation.vectorized import VectorizedBoilerFleet, STATE_CODES
+
+# Per-object scenarios: (simulation_mode, initial_setpoint, speed_factor)
+SCENARIOS = [(0, 70.0, 1), (1, 70.0, 1), (0, 55.0, 5), (0, 80.0, 10), (1, 60.0, 3)]
+COMPARED_POINTS = {
+    "supply_temp": "get_supply_temperature",
+    "return_temp": "get_return_temperature",
+    "stack_temp": "get_stack_temperature",
+    "inlet_pressure": "get_inlet_pressure",
+    "outlet_pressure": "get_outlet_pressure",
+    "fan_speed": "get_fan_speed",
+    "operating_status": "get_device_operating_status",
+    "power_seconds": "get_power_seconds",
+    "burner_seconds": "get_burner_seconds",
+    "ignition_starts": "get_ignition_starts",
+}
+
+
+def verify(ticks: int = 3000):
+    """Runs each scenario on both engines, toggling Boiler Enable midway, and compares every tick."""
+    for simulation_mode, setpoint, speed_factor in SCENARIOS:
+        device = InMemoryBoilerDevice(device_id=1)
+        context = SimulationContext(device, INITIALIZE_STATE, simulation_mode, setpoint)
+        fleet = VectorizedBoilerFleet(1, simulation_mode, setpoint)
+
+        for tick in range(ticks):
+            if tick in (ticks * 2 // 3, ticks * 2 // 3 + 100):
+                device.bms_write("Boiler Enable", not device.get_boiler_command())
+            fleet.pull_commands([device])
+            context.tick(speed_factor)
+            fleet.step(speed_factor)
+
+            assert STATE_CODES[type(context.state).__name__] == fleet.state[0], \
+                f"tick {tick}: {type(context.state).__name__} != state code {fleet.state[0]}"
+            for array, getter in COMPARED_POINTS.items():
+                expected = getattr(device, getter)()
+                actual = getattr(fleet, array)[0]
+                assert math.isclose(expected, actual, rel_tol=1e-9, abs_tol=1e-9), \
+                    f"tick {tick}: {array} {actual} != {expected}"
+        print(f"mode={simulation_mode} setpoint={setpoint} speed={speed_factor}: {ticks} ticks identical")
+
+
+def main(devices: int, ticks: int, speed_factor: int, check: bool):
+    if check:
+        verify()
+
+    fleet = VectorizedBoilerFleet(devices, initial_setpoint=70.0)
+    boilers = [InMemoryBoilerDevice(device_id=i) for i in range(1, devices + 1)]
+    elapsed = {"pull_commands": 0.0, "step": 0.0, "publish": 0.0}
+    for _ in range(ticks):
+        start = time.perf_counter()
+        fleet.pull_commands(boilers)
+        pulled = time.perf_counter()
+        fleet.step(speed_factor)
+        stepped = time.perf_counter()
+        fleet.publish(boilers)
+        published = time.perf_counter()
+        elapsed["pull_commands"] += pulled - start
+        elapsed["step"] += stepped - pulled
+        elapsed["publish"] += published - stepped
+
+    print(f"{devices} in-memory boilers, {ticks} ticks (ms/tick)")
+    for part, seconds in elapsed.items():
+        print(f"{part:14} {seconds / ticks * 1000:9.3f}")
+    per_tick = sum(elapsed.values()) / ticks
+    print(f"{'tick':14} {per_tick * 1000:9.3f}  {devices / per_tick:,.0f} device-ticks/s, "
+          f"{per_tick * 100:.2f}% of one core at 1 Hz")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vectorized engine benchmark")
+    parser.add_argument("--devices", type=int, default=10000)
+    parser.add_argument("--ticks", type=int, default=600)
+    parser.add_argument("--speed_factor", type=int, default=1)
+    parser.add_argument("--verify", action="store_true", help="Compare against the per-object state machine first")
+    args = parser.parse_args()
+    main(args.devices, args.ticks, args.speed_factor, args.verify)
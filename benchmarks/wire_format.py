@@ -0,0 +1,99 @@
+"""
+Bytes on the wire and decode cost of an upload batch, JSON against the binary records of wire.py.
+
+The same batches of samples, as SimulationContext.collect_sample produces them, are encoded by
+the simulator side and decoded by the server side in both formats: JSON through the pydantic
+batch validation, binary through the struct decoder. Then TelemetryUploader sends them in each
+format to a local WebServer, or to --url, and the stored samples per second are compared.
+
+    python benchmarks/wire_format.py --devices 1000 --batch_size 500 --rounds 20
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+import aiohttp
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "DeviceSimulation"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "WebServer"))
+
+from ingest_load import local_server, make_sample, wait_drained
+from models.device import ReceivedDeviceStatusBatch
+from models.wire import decode_batch
+from source.simulation.uploader import TelemetryUploader
+from source.simulation.wire import encode_batch
+
+
+def best_of(function, argument, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(argument)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def codec_costs(batch: list[dict], repeat: int) -> dict:
+    json_body = json.dumps(batch).encode()
+    binary_body = encode_batch(batch)
+    assert [sample.model_dump() for sample in decode_batch(binary_body)] == \
+           [sample.model_dump() for sample in ReceivedDeviceStatusBatch.validate_json(json_body)]
+    return {
+        "json": (len(json_body), best_of(lambda samples: json.dumps(samples).encode(), batch, repeat),
+                 best_of(ReceivedDeviceStatusBatch.validate_json, json_body, repeat)),
+        "binary": (len(binary_body), best_of(encode_batch, batch, repeat), best_of(decode_batch, binary_body, repeat)),
+    }
+
+
+async def upload_rate(url: str, wire_format: str, devices: int, rounds: int, batch_size: int) -> float:
+    async with aiohttp.ClientSession() as session:
+        uploader = TelemetryUploader(session, url=f"{url}/device/upload/batch", max_queue=devices * rounds,
+                                     max_batch=batch_size, wire_format=wire_format)
+        for _ in range(rounds):
+            for device_id in range(devices):
+                uploader.submit(make_sample(device_id))
+        start = time.perf_counter()
+        await uploader.close()
+        await wait_drained(session, url)
+        elapsed = time.perf_counter() - start
+        assert uploader.sent_samples == devices * rounds, uploader.stats()
+    return uploader.sent_samples / elapsed
+
+
+async def upload_rates(url: str, devices: int, rounds: int, batch_size: int) -> dict:
+    return {wire_format: await upload_rate(url, wire_format, devices, rounds, batch_size) for wire_format in ("json", "binary")}
+
+
+def main(url: str | None, port: int, devices: int, rounds: int, batch_size: int, repeat: int):
+    batch = [make_sample(device_id) for device_id in range(batch_size)]
+    costs = codec_costs(batch, repeat)
+    if url:
+        rates = asyncio.run(upload_rates(url, devices, rounds, batch_size))
+    else:
+        with local_server(port) as local_url:
+            rates = asyncio.run(upload_rates(local_url, devices, rounds, batch_size))
+
+    print(f"Batches of {batch_size} samples, {devices} devices x {rounds} rounds uploaded")
+    print(f"{'format':8} {'bytes/sample':>12} {'encode us/sample':>17} {'decode us/sample':>17} {'stored samples/s':>17}")
+    for wire_format, (size, encode, decode) in costs.items():
+        print(f"{wire_format:8} {size / batch_size:12.1f} {encode * 1e6 / batch_size:17.2f} "
+              f"{decode * 1e6 / batch_size:17.2f} {rates[wire_format]:17,.0f}")
+    json_size, _, json_decode = costs["json"]
+    binary_size, _, binary_decode = costs["binary"]
+    print(f"binary: {json_size / binary_size:.1f}x fewer bytes, {json_decode / binary_decode:.1f}x faster decode, "
+          f"{rates['binary'] / rates['json']:.2f}x upload throughput")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JSON against binary upload bodies")
+    parser.add_argument("--url", type=str, default=None, help="Running WebServer, e.g. http://localhost:8099")
+    parser.add_argument("--port", type=int, default=8199, help="Port of the local uvicorn instance")
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--batch_size", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20, help="Runs of each codec, the best one is reported")
+    args = parser.parse_args()
+    main(args.url, args.port, args.devices, args.rounds, args.batch_size, args.repeat)